@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backyard_olympics.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from tournaments.asgi import TeamEventStreams  # noqa: E402  (needs the app registry)
+
+# Team notification streams are answered outside Django's request handler
+application = TeamEventStreams(django_application)
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Answers /team-api/ requests itself, skipping the rest of the stack
+    'tournaments.middleware.TeamAPIMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +68,9 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'libraries': {
+                'tournament_tags': 'tournaments.templacetags.tournament_tags',
+            },
         },
     },
 ]
@@ -80,10 +85,57 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=60, cast=int),
+        # WAL lets readers run alongside a writer; IMMEDIATE transactions take
+        # the write lock up front so concurrent writers queue on the timeout
+        # instead of failing when they upgrade a stale read
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Tests and benchmarks use a file: threads sharing an in-memory
+        # database lock whole tables instead of waiting on the timeout
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Caching
+# Tournament pages are cached per tournament version (see tournaments/caching.py).
+# The default local-memory cache is per process; with several workers point
+# CACHE_BACKEND at a shared backend such as
+# django.core.cache.backends.filebased.FileBasedCache or
+# django.core.cache.backends.db.DatabaseCache.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='backyard-olympics'),
+    }
+}
+
+
+# Live notifications
+# Event streams (tournaments/live.py) need the ASGI application, e.g.
+# `uvicorn backyard_olympics.asgi:application`; under WSGI they answer 503.  The in-process broker only
+# reaches streams in the same process; with several workers set
+# NOTIFICATION_BROKER to a tournaments.broker.Broker backed by a shared server.
+
+NOTIFICATION_BROKER = config('NOTIFICATION_BROKER', default='tournaments.broker.InProcessBroker')
+
+
+# Team QR codes
+# Codes point teams at SITE_URL, so set it to the address teams reach the site
+# on.  Rendered PNGs are cached under QR_CACHE_DIR (see tournaments/qr.py);
+# fill it ahead of an event with `manage.py generate_qr_codes`.
+
+SITE_URL = config('SITE_URL', default='http://localhost:8000')
+QR_CACHE_DIR = config('QR_CACHE_DIR', default=str(BASE_DIR / 'qr_cache'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Tournament, Team, Game, Round, Matchup, Wager, Notification
+from .models import Tournament, Team, Game, Round, Matchup, Wager, Notification, TeamStanding, StandingSnapshot
+from .standings import rebuild_standings, with_standings
 
 class TeamInline(admin.TabularInline):
     model = Team
@@ -31,6 +32,15 @@ class TournamentAdmin(admin.ModelAdmin):
     list_display = ['name', 'description', 'team_count', 'game_count', 'round_count']
     search_fields = ['name', 'description']
     inlines = [TeamInline, GameInline, RoundInline]
+    actions = ['rebuild_standings']
+    
+    @admin.action(description="Rebuild standings from the raw results")
+    def rebuild_standings(self, request, queryset):
+        # Saving results here keeps the standings current; this repairs
+        # drift from queryset updates (also: manage.py rebuild_standings)
+        for tournament in queryset:
+            rebuild_standings(tournament)
+        self.message_user(request, f"Rebuilt standings for {queryset.count()} tournament(s)")
     
     def team_count(self, obj):
         return obj.teams.count()
@@ -52,6 +62,9 @@ class TeamAdmin(admin.ModelAdmin):
     search_fields = ['name', 'members']
     inlines = [WagerInline]
     
+    def get_queryset(self, request):
+        return with_standings(super().get_queryset(request))
+    
     def members_short(self, obj):
         if len(obj.members) > 50:
             return f"{obj.members[:50]}..."
@@ -62,6 +75,7 @@ class TeamAdmin(admin.ModelAdmin):
     
     members_short.short_description = 'Members'
     win_count.short_description = 'Wins'
+    win_count.admin_order_field = 'wins'
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
@@ -108,4 +122,16 @@ class WagerAdmin(admin.ModelAdmin):
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ['title', 'tournament', 'team', 'created_at', 'is_read']
     list_filter = ['tournament', 'is_read', 'created_at']
-    search_fields = ['title', 'message', 'team__name']
\ No newline at end of file
+    search_fields = ['title', 'message', 'team__name']
+
+@admin.register(TeamStanding)
+class TeamStandingAdmin(admin.ModelAdmin):
+    """Kept in step with saved results; rebuild from the Tournament admin if it drifts"""
+    list_display = ['team', 'tournament', 'wins', 'losses', 'byes', 'games_played', 'wager_points']
+    list_filter = ['tournament']
+    search_fields = ['team__name']
+
+@admin.register(StandingSnapshot)
+class StandingSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['tournament', 'round_number', 'created_at']
+    list_filter = ['tournament']
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+
+from .live import notification_events
+from .team_api import TEAM_API_PREFIX, resolve_token
+
+EVENTS_SUFFIX = '/events/'
+
+
+class TeamEventStreams:
+    """Serve team event streams ahead of Django's ASGI handler.
+
+    Django runs each ASGI request inside its own thread-sensitive context,
+    which keeps a worker thread parked for as long as the request is open;
+    for long-lived streams that is a thread per phone.  Team streams only
+    need the token in the URL, so they are answered here as plain
+    coroutines and everything else is passed to ``application``.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get('path', '')
+        if scope['type'] != 'http' or not (path.startswith(TEAM_API_PREFIX) and path.endswith(EVENTS_SUFFIX)):
+            return await self.application(scope, receive, send)
+
+        token = path[len(TEAM_API_PREFIX):-len(EVENTS_SUFFIX)]
+        ids = await sync_to_async(resolve_token)(token) if scope['method'] == 'GET' else None
+        if ids is None:
+            status, error = (403, "Invalid token") if scope['method'] == 'GET' else (405, "Method not allowed")
+            return await self.error(send, status, error)
+
+        team_id, tournament_id = ids
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        events = notification_events(tournament_id, team_id, self.last_event_id(scope))
+        stream = asyncio.ensure_future(self.stream(events, send))
+        disconnect = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            await asyncio.wait([stream, disconnect], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stream.cancel()
+            disconnect.cancel()
+            await asyncio.gather(stream, disconnect, return_exceptions=True)
+            await events.aclose()
+
+    @staticmethod
+    async def stream(events, send):
+        async for chunk in events:
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    def last_event_id(scope):
+        for name, value in scope.get('headers', ()):
+            if name == b'last-event-id':
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    async def error(send, status, message):
+        await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': json.dumps({'error': message}).encode()})
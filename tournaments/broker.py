@@ -0,0 +1,98 @@
+"""Publish/subscribe for live notifications.
+
+Views publish with ``get_broker().publish(channel, message)`` from any
+thread; async stream views consume with ``async with broker.subscribe(
+channel) as messages`` and ``await messages.get()``.  The broker class is
+chosen by the ``NOTIFICATION_BROKER`` setting (a dotted path), so a
+deployment with several worker processes can swap the in-process default
+for one backed by a shared server without touching the views.
+"""
+import abc
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'tournaments.broker.InProcessBroker'
+
+# Messages buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Broker(abc.ABC):
+    """Interface every notification broker implements"""
+
+    @abc.abstractmethod
+    def publish(self, channel, message):
+        """Deliver ``message`` to every current subscriber of ``channel``"""
+
+    @abc.abstractmethod
+    def subscribe(self, channel):
+        """Async context manager yielding an ``asyncio.Queue`` of messages"""
+
+
+class InProcessBroker(Broker):
+    """Fan-out to subscribers living in this process's event loops.
+
+    Each subscriber is an ``asyncio.Queue`` owned by the loop it was
+    created on; publishing hands the message to that loop, so publishers
+    may run in any thread.  Slow subscribers lose their oldest messages
+    rather than holding memory.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                pass
+
+    @staticmethod
+    def _deliver(queue, message):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(channel, set())
+                subscribers.discard(entry)
+                if not subscribers:
+                    self._subscribers.pop(channel, None)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured by ``NOTIFICATION_BROKER``"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'NOTIFICATION_BROKER', DEFAULT_BROKER))()
+        return _broker
+
+
+def tournament_channel(tournament_id):
+    return f'tournament:{tournament_id}:notifications'
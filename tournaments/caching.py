@@ -0,0 +1,69 @@
+"""Versioned caching of tournament read models.
+
+Every tournament carries a ``cache_version`` that is bumped whenever one of
+its Matchups, Rounds, Wagers, Teams or Games changes.  Read-heavy views
+cache their computed context under ``(tournament, version, view)``, so a
+write never has to find and delete the entries it invalidates: the next
+read simply misses under the new version and the old entries age out
+through the cache timeout and the backend's culling.
+
+Single-row saves bump the version through signals (see ``signals.py``);
+bulk inserts, updates and cascading deletes call ``bump_version``
+themselves.
+"""
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import Tournament
+
+# Cache alias used for tournament read models
+CACHE_ALIAS = 'default'
+
+# Seconds an entry may live; superseded versions are never read again
+CACHE_TIMEOUT = 60 * 60
+
+_STATS_KEYS = {'hits': 'tournament-cache:hits', 'misses': 'tournament-cache:misses'}
+
+
+def bump_version(tournament_id):
+    """Invalidate every cached read model of a tournament"""
+    Tournament.objects.filter(pk=tournament_id).update(cache_version=F('cache_version') + 1)
+
+
+def _count(cache, outcome):
+    key = _STATS_KEYS[outcome]
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def cached_context(tournament, name, build):
+    """Return ``build()`` cached under the tournament's current version.
+
+    ``build`` must return picklable data, so querysets should be turned
+    into lists with their related objects already loaded.
+    """
+    cache = caches[CACHE_ALIAS]
+    key = f'tournament:{tournament.pk}:v{tournament.cache_version}:{name}'
+    context = cache.get(key)
+    if context is not None:
+        _count(cache, 'hits')
+        return context
+
+    _count(cache, 'misses')
+    context = build()
+    cache.set(key, context, CACHE_TIMEOUT)
+    return context
+
+
+def cache_stats():
+    """Hit and miss counters shared by every process using the cache"""
+    cache = caches[CACHE_ALIAS]
+    counts = cache.get_many(list(_STATS_KEYS.values()))
+    stats = {outcome: counts.get(key, 0) for outcome, key in _STATS_KEYS.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    return stats
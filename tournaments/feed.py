@@ -0,0 +1,123 @@
+"""Keyset-paginated notification feeds.
+
+Feeds are ordered by ``(created_at, id)``.  A page continues from a cursor
+naming the last notification seen instead of an OFFSET, so every page is
+an index seek plus ``limit`` rows however deep the client has scrolled,
+and a polling client asks for what is newer than its cursor and gets only
+the delta.
+
+A team's feed is two index ranges on ``notification_feed_idx``
+(tournament, team, created_at): the team's own notifications and the
+broadcasts.  Each is read in order up to the page size and the two are
+merged, so neither is sorted in the database.
+"""
+import base64
+import heapq
+from datetime import datetime
+
+from .live import notification_payload
+from .models import Notification
+
+FEED_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class FeedError(ValueError):
+    """A bad cursor or page size in a feed request"""
+
+
+def encode_cursor(notification):
+    key = f'{notification.created_at.isoformat()}|{notification.pk}'
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a cursor"""
+    try:
+        key = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = key.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise FeedError(f"Invalid cursor '{cursor}'")
+
+
+def feed_sources(tournament_id, team_id=None):
+    """Querysets whose rows make up a feed, each ordered by an index"""
+    if team_id is None:
+        return [Notification.objects.filter(tournament_id=tournament_id)]
+    return [
+        Notification.objects.filter(tournament_id=tournament_id, team_id=team_id),
+        Notification.objects.filter(tournament_id=tournament_id, team__isnull=True),
+    ]
+
+
+def _older(queryset, cursor):
+    if cursor is not None:
+        created_at, pk = cursor
+        # A range on created_at the index can seek, minus the ties already seen
+        queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, pk__gte=pk)
+    return queryset.order_by('-created_at', '-pk')
+
+
+def _newer(queryset, cursor):
+    created_at, pk = cursor
+    queryset = queryset.filter(created_at__gte=created_at).exclude(created_at=created_at, pk__lte=pk)
+    return queryset.order_by('created_at', 'pk')
+
+
+def _merged(querysets, limit, newest_first):
+    key = lambda notification: (notification.created_at, notification.pk)
+    rows = heapq.merge(*(queryset[:limit] for queryset in querysets), key=key, reverse=newest_first)
+    return [row for _, row in zip(range(limit), rows)]
+
+
+def older_page(sources, before=None, limit=FEED_PAGE_SIZE):
+    """``(notifications, next cursor or None)``, newest first, older than ``before``"""
+    before_key = decode_cursor(before) if before is not None else None
+    rows = _merged([_older(source, before_key) for source in sources], limit + 1, newest_first=True)
+    return rows[:limit], encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+
+
+def newer_page(sources, since, limit=FEED_PAGE_SIZE):
+    """``(notifications, more)``, oldest first, newer than ``since``"""
+    since_key = decode_cursor(since)
+    rows = _merged([_newer(source, since_key) for source in sources], limit + 1, newest_first=False)
+    return rows[:limit], len(rows) > limit
+
+
+def feed_arguments(params):
+    """``before``, ``since`` and ``limit`` keyword arguments from query parameters"""
+    try:
+        limit = int(params.get('limit', FEED_PAGE_SIZE))
+    except ValueError:
+        raise FeedError("limit must be a whole number")
+    return {'before': params.get('before') or None, 'since': params.get('since') or None, 'limit': limit}
+
+
+def notification_feed(sources, before=None, since=None, limit=FEED_PAGE_SIZE):
+    """One page of a feed as a JSON-ready dict.
+
+    Without ``since`` the page holds the newest notifications (older than
+    ``before`` when given), newest first, with ``next`` set to the cursor
+    for the following page while there is one.  With ``since`` it holds
+    the notifications newer than that cursor, oldest first, and ``more``
+    says whether another call would return more.  ``cursor`` is what to
+    pass as ``since`` on the next poll.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if since is not None:
+        page, more = newer_page(sources, since, limit)
+        return {
+            'notifications': [notification_payload(notification) for notification in page],
+            'cursor': encode_cursor(page[-1]) if page else since,
+            'more': more,
+        }
+
+    page, next_cursor = older_page(sources, before, limit)
+    feed = {
+        'notifications': [notification_payload(notification) for notification in page],
+        'next': next_cursor,
+    }
+    if before is None:
+        feed['cursor'] = encode_cursor(page[0]) if page else None
+    return feed
@@ -4,7 +4,7 @@ from .models import Tournament, Team, Game, Round, Matchup, Wager, Notification
 class TournamentForm(forms.ModelForm):
     class Meta:
         model = Tournament
-        fields = ['name', 'description']
+        fields = ['name', 'description', 'format', 'swiss_rounds', 'scoring_rule']
 
 class TeamForm(forms.ModelForm):
     members = forms.CharField(widget=forms.Textarea, help_text="Enter team member names, separated by commas")
@@ -19,10 +19,11 @@ class TeamForm(forms.ModelForm):
 
 class GameForm(forms.ModelForm):
     rules = forms.CharField(widget=forms.Textarea, required=False, help_text="Enter game rules (optional)")
+    capacity = forms.IntegerField(min_value=1, required=False, help_text="Matchups this station can host at once (blank for unlimited)")
     
     class Meta:
         model = Game
-        fields = ['name', 'description', 'rules']
+        fields = ['name', 'description', 'rules', 'capacity']
 
 class RoundForm(forms.ModelForm):
     class Meta:
@@ -44,7 +45,12 @@ class WagerForm(forms.ModelForm):
         
     def __init__(self, *args, **kwargs):
         self.team = kwargs.pop('team', None)
+        # game id -> points of the team's current wagers; pass it in when
+        # validating several forms so it is loaded once, not per form
+        self.committed = kwargs.pop('committed', None)
         super().__init__(*args, **kwargs)
+        if self.team and self.committed is None:
+            self.committed = dict(Wager.objects.filter(team=self.team).values_list('game_id', 'points'))
         
     def clean_points(self):
         points = self.cleaned_data.get('points')
@@ -55,11 +61,13 @@ class WagerForm(forms.ModelForm):
     def clean(self):
         cleaned_data = super().clean()
         if self.team:
-            # Check total wager points for this team
-            points = cleaned_data.get('points', 0)
-            total_existing = Wager.objects.filter(team=self.team).exclude(
-                pk=self.instance.pk if self.instance and self.instance.pk else None
-            ).aggregate(total=models.Sum('points'))['total'] or 0
+            # Check total wager points for this team, in memory
+            points = cleaned_data.get('points') or 0
+            game = cleaned_data.get('game')
+            total_existing = sum(
+                value for game_id, value in self.committed.items()
+                if game is None or game_id != game.pk
+            )
             
             if total_existing + points > 100:
                 self.add_error('points', f"Total points exceed 100. Current total: {total_existing}, adding {points}.")
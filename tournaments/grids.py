@@ -0,0 +1,80 @@
+"""Round grids loaded through one query plan, with a content digest per round.
+
+Rounds come with their matchups, games and teams from two queries however
+many rounds there are.  Each round also gets a digest of everything its
+grid shows; templates cache the rendered grid with ``{% cache %}`` under
+``(round, digest)``, so when the tournament's cached context is rebuilt
+only the rounds whose content changed are rendered again.
+
+Views with many rounds cache just ``grid_index`` (rounds and digests) in
+their context and hand the template ``with_lazy_matchups``: when every
+fragment is cached the matchups are never loaded at all.
+"""
+import hashlib
+from collections import defaultdict
+from functools import partial
+
+from django.db.models import Prefetch
+from django.utils.functional import SimpleLazyObject
+
+from .models import Matchup
+
+# Matchups with everything a grid row shows and nothing more, which also
+# keeps the cached context small and quick to unpickle
+GRID_MATCHUPS = Matchup.objects.select_related('game', 'team1', 'team2').only(
+    'round_id', 'is_bye', 'result', 'conflict_flag',
+    'game__name', 'team1__name', 'team1__team_number', 'team2__name', 'team2__team_number',
+).order_by('pk')
+
+
+def with_matchups(rounds):
+    """``rounds`` with ``grid_matchups`` prefetched in one query"""
+    return rounds.prefetch_related(Prefetch('matchups', queryset=GRID_MATCHUPS, to_attr='grid_matchups'))
+
+
+def _team_key(team):
+    return (team.pk, team.name, team.team_number) if team else None
+
+
+def round_digest(round_obj, matchups):
+    """Short digest of the round and the grid rows of ``matchups``"""
+    content = [(round_obj.round_number, round_obj.start_time and round_obj.start_time.isoformat())]
+    content += [
+        (m.pk, m.game and m.game.name, _team_key(m.team1), _team_key(m.team2), m.is_bye, m.result, m.conflict_flag)
+        for m in matchups
+    ]
+    return hashlib.blake2b(repr(content).encode(), digest_size=8).hexdigest()
+
+
+def grid_data(rounds):
+    """``[{'round', 'matchups', 'digest'}]`` for ``rounds``, in their order"""
+    grids = []
+    for round_obj in with_matchups(rounds):
+        # Off the round, so a cached round does not carry its matchups along
+        matchups = round_obj.__dict__.pop('grid_matchups')
+        grids.append({'round': round_obj, 'matchups': matchups, 'digest': round_digest(round_obj, matchups)})
+    return grids
+
+
+def grid_index(grids):
+    """The cacheable part of ``grid_data``: each round and its digest"""
+    return [{'round': grid['round'], 'digest': grid['digest']} for grid in grids]
+
+
+def with_lazy_matchups(index, loaded=None):
+    """``grid_index`` entries with ``matchups`` read only when used.
+
+    The first round whose matchups are read loads those of every round in
+    the index with one query.  ``loaded`` maps round id to matchups already
+    at hand, such as from the ``grid_data`` that built the index.
+    """
+    state = {'matchups': loaded}
+
+    def matchups_for(round_id):
+        if state['matchups'] is None:
+            state['matchups'] = defaultdict(list)
+            for matchup in GRID_MATCHUPS.filter(round__in=[entry['round'].pk for entry in index]):
+                state['matchups'][matchup.round_id].append(matchup)
+        return state['matchups'].get(round_id, [])
+
+    return [{**entry, 'matchups': SimpleLazyObject(partial(matchups_for, entry['round'].pk))} for entry in index]
@@ -0,0 +1,119 @@
+"""Round-by-round standings history.
+
+After each round closes its cumulative standings table is stored as a
+StandingSnapshot.  A snapshot is built from the previous round's snapshot
+plus the results of that one round, so closing a round costs a single
+round's matchups instead of a replay of the whole tournament, and reading
+the table after any round is one row lookup.  Teams are ranked with the
+same tiebreak chain as the live standings (``tiebreakers``), over the
+results up to that round, so the history and the standings page agree.
+
+Changing a result deletes the snapshots from that round on; they are
+rebuilt forward from the last intact snapshot the next time they are read.
+Only matchup results are tracked, not wins recorded directly on games.
+"""
+from django.db import transaction
+from django.db.models import Subquery
+
+from .models import Round, Matchup, StandingSnapshot
+from .standings import STAT_FIELDS, result_contribution
+from .tiebreakers import tournament_tiebreakers
+
+
+def _rank(stats, tournament, round_number):
+    """Add each team's rank, ordered by the standings tiebreak chain as of the round"""
+    team_ids = [int(team_id) for team_id in stats]
+    order = tournament_tiebreakers(
+        tournament, team_ids, [stats[str(team_id)][0] for team_id in team_ids], through_round=round_number
+    )['order']
+    for rank, index in enumerate(order, start=1):
+        team_id = str(team_ids[index])
+        stats[team_id] = stats[team_id][:len(STAT_FIELDS)] + [rank]
+    return stats
+
+
+def _advance(previous, tournament, round_obj):
+    """Snapshot data for ``round_obj`` given the data of the round before it"""
+    # Teams in team number order, as the tiebreak chain expects
+    stats = {
+        str(team_id): previous.get(str(team_id), [0] * len(STAT_FIELDS))[:len(STAT_FIELDS)]
+        for team_id in tournament.teams.order_by('team_number', 'pk').values_list('pk', flat=True)
+    }
+
+    results = Matchup.objects.filter(round=round_obj).exclude(result='PENDING')
+    for team1_id, team2_id, is_bye, result in results.values_list('team1_id', 'team2_id', 'is_bye', 'result'):
+        for team_id, contribution in result_contribution(team1_id, team2_id, is_bye, result).items():
+            if str(team_id) in stats:
+                stats[str(team_id)] = [a + b for a, b in zip(stats[str(team_id)], contribution)]
+    return _rank(stats, tournament, round_obj.round_number)
+
+
+def snapshot_round(tournament, round_obj):
+    """Store the standings after ``round_obj``, building on earlier snapshots"""
+    with transaction.atomic():
+        snapshots = _build_through(tournament, round_obj.round_number, refresh_last=True)
+    return snapshots[round_obj.round_number]
+
+
+def _build_through(tournament, round_number, refresh_last=False):
+    """Make sure snapshots exist for every round up to ``round_number``.
+
+    Returns a dict of round number to snapshot for the rounds it touched.
+    """
+    start = (
+        StandingSnapshot.objects.filter(tournament=tournament, round_number__lt=round_number)
+        .order_by('-round_number').first()
+    )
+    if not refresh_last:
+        existing = StandingSnapshot.objects.filter(tournament=tournament, round_number=round_number).first()
+        if existing:
+            return {round_number: existing}
+
+    data = start.data if start else {}
+    rounds = Round.objects.filter(
+        tournament=tournament,
+        round_number__gt=start.round_number if start else 0,
+        round_number__lte=round_number
+    ).order_by('round_number')
+
+    snapshots = {}
+    for round_obj in rounds:
+        data = _advance(data, tournament, round_obj)
+        snapshots[round_obj.round_number], _ = StandingSnapshot.objects.update_or_create(
+            tournament=tournament, round_number=round_obj.round_number, defaults={'data': data}
+        )
+    return snapshots
+
+
+def standings_after(tournament, round_number):
+    """The cumulative standings data after a round, or None if there is no such round"""
+    snapshot = StandingSnapshot.objects.filter(tournament=tournament, round_number=round_number).first()
+    if snapshot is None:
+        with transaction.atomic():
+            snapshot = _build_through(tournament, round_number).get(round_number)
+    return snapshot.data if snapshot else None
+
+
+def movers(tournament, round_number):
+    """Rank changes between the previous round and ``round_number``.
+
+    Returns a dict of team id to positions gained (negative when a team
+    dropped); every team counts as unranked-equal before round 1.
+    """
+    current = standings_after(tournament, round_number) or {}
+    previous = standings_after(tournament, round_number - 1) if round_number > 1 else None
+    if previous is None:
+        return {int(team_id): 0 for team_id in current}
+    return {
+        int(team_id): previous[team_id][-1] - values[-1] if team_id in previous else 0
+        for team_id, values in current.items()
+    }
+
+
+def invalidate_from_round(round_id):
+    """Drop the snapshots a result change in this round makes stale"""
+    rounds = Round.objects.filter(pk=round_id)
+    StandingSnapshot.objects.filter(
+        tournament_id=Subquery(rounds.values('tournament_id')),
+        round_number__gte=Subquery(rounds.values('round_number'))
+    ).delete()
@@ -0,0 +1,71 @@
+"""Per-team notification read state.
+
+A broadcast (``team=None``) is a single row however many teams receive it,
+so whether a team has read it cannot live on the row.  Each team instead
+has a high-water mark, ``Team.notifications_read_through``: every
+notification of the team with an id up to the mark is read.  Notifications
+read out of order above the mark get a ``NotificationReceipt``.
+
+Sending writes nothing per team.  Marking reads inserts receipts and then
+moves the mark up to the team's first unread notification, deleting the
+receipts it now covers, so a team holds at most a handful of receipts.
+Unread counts and lists are range scans above the mark on
+``notification_inbox_idx``.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Team, Notification, NotificationReceipt
+
+
+def team_notifications(team):
+    """Notifications addressed to the team or to all teams"""
+    # Spelled as two (tournament, team) terms so each is a range on the index
+    return Notification.objects.filter(
+        Q(tournament_id=team.tournament_id, team_id=team.pk) | Q(tournament_id=team.tournament_id, team__isnull=True)
+    )
+
+
+def unread_notifications(team):
+    """The team's unread notifications"""
+    receipts = NotificationReceipt.objects.filter(team_id=team.pk, notification=OuterRef('pk'))
+    return team_notifications(team).filter(pk__gt=team.notifications_read_through).filter(~Exists(receipts))
+
+
+def unread_count(team):
+    return unread_notifications(team).count()
+
+
+def _advance_mark(team):
+    """Move the team's mark up to just below its first unread notification"""
+    first_unread = unread_notifications(team).order_by('pk').values_list('pk', flat=True).first()
+    if first_unread is None:
+        through = team_notifications(team).order_by('-pk').values_list('pk', flat=True).first() or 0
+    else:
+        through = first_unread - 1
+    if through <= team.notifications_read_through:
+        return
+
+    Team.objects.filter(pk=team.pk, notifications_read_through__lt=through).update(notifications_read_through=through)
+    NotificationReceipt.objects.filter(team_id=team.pk, notification_id__lte=through).delete()
+    team.notifications_read_through = through
+
+
+def mark_read(team, notification_ids):
+    """Mark some of the team's notifications read; other ids are ignored"""
+    with transaction.atomic():
+        unread = unread_notifications(team).filter(pk__in=notification_ids).values_list('pk', flat=True)
+        NotificationReceipt.objects.bulk_create(
+            [NotificationReceipt(team_id=team.pk, notification_id=pk) for pk in unread],
+            ignore_conflicts=True,
+        )
+        _advance_mark(team)
+
+
+def mark_all_read(team):
+    with transaction.atomic():
+        latest = team_notifications(team).order_by('-pk').values_list('pk', flat=True).first() or 0
+        if latest > team.notifications_read_through:
+            Team.objects.filter(pk=team.pk, notifications_read_through__lt=latest).update(notifications_read_through=latest)
+            team.notifications_read_through = latest
+        NotificationReceipt.objects.filter(team_id=team.pk).delete()
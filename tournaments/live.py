@@ -0,0 +1,107 @@
+"""Live notification push over Server-Sent Events.
+
+A saved notification is published to its tournament's broker channel
+(``broker.tournament_channel``) once the transaction commits, and every open
+event stream of the tournament picks it up: organiser streams see them all,
+a team's stream sees the ones addressed to the team or to everyone.
+
+Streams are async generators served by the ASGI application
+(``backyard_olympics.asgi``), so a worker holds open connections as idle
+coroutines in its event loop rather than one thread each.  A reconnecting
+``EventSource`` sends ``Last-Event-ID`` and gets what it missed replayed
+from the database first.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .broker import get_broker, tournament_channel
+from .models import Notification
+
+# Seconds between comment lines that keep idle connections (and proxies) open
+KEEPALIVE_INTERVAL = 15
+
+# Milliseconds a disconnected EventSource waits before reconnecting
+RETRY_INTERVAL = 3000
+
+
+def notification_payload(notification):
+    return {
+        'id': notification.pk,
+        'team': notification.team_id,
+        'title': notification.title,
+        'message': notification.message,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+def publish_notification(notification):
+    """Push a saved notification to the open streams of its tournament"""
+    get_broker().publish(tournament_channel(notification.tournament_id), notification_payload(notification))
+
+
+def missed_notifications(tournament_id, team_id, after_id):
+    """Payloads of the stream's notifications newer than ``after_id``, oldest first"""
+    notifications = Notification.objects.filter(tournament_id=tournament_id, pk__gt=after_id)
+    if team_id is not None:
+        notifications = notifications.filter(Q(team_id=team_id) | Q(team__isnull=True))
+    return [notification_payload(notification) for notification in notifications.order_by('pk')]
+
+
+def format_event(payload):
+    data = json.dumps(payload, separators=(',', ':'))
+    return f"id: {payload['id']}\nevent: notification\ndata: {data}\n\n"
+
+
+async def notification_events(tournament_id, team_id=None, last_event_id=None):
+    """Yield SSE messages for a tournament's (or one team's) notifications"""
+    async with get_broker().subscribe(tournament_channel(tournament_id)) as messages:
+        # Subscribed before replaying, so nothing published meanwhile is lost
+        yield f"retry: {RETRY_INTERVAL}\n\n"
+        last_sent = 0
+        if last_event_id is not None:
+            for payload in await sync_to_async(missed_notifications)(tournament_id, team_id, last_event_id):
+                last_sent = payload['id']
+                yield format_event(payload)
+
+        while True:
+            try:
+                payload = await asyncio.wait_for(messages.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if payload['id'] <= last_sent:
+                continue
+            if team_id is None or payload['team'] in (None, team_id):
+                yield format_event(payload)
+
+
+def last_event_id(request):
+    try:
+        return int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        return None
+
+
+def event_stream(request, tournament_id, team_id=None):
+    """``text/event-stream`` response for a tournament's notifications.
+
+    A stream never ends, so under WSGI (``runserver``) it would hold a
+    worker thread for as long as the page is open; there clients get a 503
+    and should poll the notification feed instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': "Live updates need the ASGI server; poll the feed instead"}, status=503)
+
+    response = StreamingHttpResponse(
+        notification_events(tournament_id, team_id, last_event_id(request)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
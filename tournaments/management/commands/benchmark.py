@@ -0,0 +1,459 @@
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+
+from tournaments.inbox import mark_all_read, mark_read, team_notifications, unread_count, unread_notifications
+from tournaments.pdf import stream_pdf
+from tournaments.printing import PRINTOUTS, tournament_pages
+from tournaments.models import Tournament, Team, Game, Round, Matchup, Wager, Notification, NotificationReceipt
+from tournaments.results import report_winner
+from tournaments.round_robin import num_rounds, round_pairings
+from tournaments.scheduling import ASSIGNMENT_TIME_BUDGET, build_round_robin_plan, exposure_spread, persist_plan
+from tournaments.team_api import TEAM_API_PREFIX, token_cache
+from tournaments.swiss import default_round_count, pair_swiss
+from tournaments.scoring import SCORING_RULES, compute_scores, tournament_scores
+from tournaments.tiebreakers import compute_tiebreakers
+
+
+def make_tournament(num_teams, num_games, name='Benchmark'):
+    """Create a throwaway tournament with numbered teams and games"""
+    tournament = Tournament.objects.create(name=name)
+    Team.objects.bulk_create([
+        Team(tournament=tournament, name=f"Team {i}", members='', team_number=i)
+        for i in range(1, num_teams + 1)
+    ])
+    Game.objects.bulk_create([
+        Game(tournament=tournament, name=f"Game {i}")
+        for i in range(1, num_games + 1)
+    ])
+    return tournament
+
+
+def bench_schedule(command, options):
+    sizes = options['sizes'] or [50, 200, 1000]
+    command.stdout.write(f"{'teams':>6} {'rounds':>7} {'matchups':>9} {'plan (s)':>9} {'insert (s)':>11}")
+    for num_teams in sizes:
+        tournament = make_tournament(num_teams, options['games'])
+        team_ids = list(tournament.teams.order_by('team_number').values_list('pk', flat=True))
+        game_ids = list(tournament.games.order_by('pk').values_list('pk', flat=True))
+
+        started = time.perf_counter()
+        plan = build_round_robin_plan(team_ids, game_ids)
+        planned = time.perf_counter()
+        persist_plan(tournament, plan)
+        persisted = time.perf_counter()
+
+        command.stdout.write(
+            f"{num_teams:>6} {len(plan):>7} {sum(len(r) for r in plan):>9} "
+            f"{planned - started:>9.3f} {persisted - planned:>11.3f}"
+        )
+
+
+def bench_assignment(command, options):
+    sizes = options['sizes'] or [500]
+    num_games = options['games']
+    game_ids = list(range(1, num_games + 1))
+    capacities = [options['capacity']] * num_games
+    command.stdout.write(
+        f"{'teams':>6} {'games':>6} {'assign (s)':>11} {'mean spread':>12} {'max spread':>11} {'modulo mean':>12} {'modulo max':>11}"
+    )
+    for num_teams in sizes:
+        team_ids = list(range(1, num_teams + 1))
+
+        started = time.perf_counter()
+        plan = build_round_robin_plan(team_ids, game_ids, capacities, time_budget=options['budget'])
+        elapsed = time.perf_counter() - started
+
+        # The previous scheme: games[slot % num_games] regardless of history
+        modulo = [
+            [(team1, team2, game_ids[slot % num_games]) for slot, (team1, team2) in enumerate(round_pairings(r, num_teams))]
+            for r in range(1, num_rounds(num_teams) + 1)
+        ]
+        mean, worst = exposure_spread(plan)
+        modulo_mean, modulo_worst = exposure_spread(modulo)
+        command.stdout.write(
+            f"{num_teams:>6} {num_games:>6} {elapsed:>11.3f} {mean:>12.2f} {worst:>11} {modulo_mean:>12.2f} {modulo_worst:>11}"
+        )
+
+
+def bench_swiss(command, options):
+    sizes = options['sizes'] or [1000]
+    command.stdout.write(f"{'teams':>6} {'rounds':>7} {'mean pair (s)':>14} {'max pair (s)':>13} {'rematches':>10}")
+    rng = random.Random(0)
+    for num_teams in sizes:
+        wins = dict.fromkeys(range(1, num_teams + 1), 0)
+        played, had_bye = set(), set()
+        timings, rematches = [], 0
+        rounds = default_round_count(num_teams)
+        for _ in range(rounds):
+            ranked = sorted(wins, key=lambda team: -wins[team])
+            started = time.perf_counter()
+            pairs = pair_swiss(ranked, played, had_bye)
+            timings.append(time.perf_counter() - started)
+
+            # Random results feed the next round's standings
+            for team1, team2 in pairs:
+                if team2 is None:
+                    had_bye.add(team1)
+                    continue
+                pair = frozenset((team1, team2))
+                rematches += pair in played
+                played.add(pair)
+                wins[rng.choice((team1, team2))] += 1
+
+        command.stdout.write(
+            f"{num_teams:>6} {rounds:>7} {sum(timings) / len(timings):>14.4f} {max(timings):>13.4f} {rematches:>10}"
+        )
+
+
+def bench_tiebreakers(command, options):
+    sizes = options['sizes'] or [1000]
+    rng = np.random.default_rng(0)
+    command.stdout.write(f"{'teams':>6} {'matchups':>9} {'rank (ms)':>10}")
+    for num_teams in sizes:
+        # Ten rounds of random pairings and results
+        rounds = [rng.permutation(num_teams)[: num_teams - num_teams % 2].reshape(-1, 2) for _ in range(10)]
+        pairs = np.concatenate(rounds)
+        flip = rng.random(len(pairs)) < 0.5
+        winners = np.where(flip, pairs[:, 0], pairs[:, 1])
+        losers = np.where(flip, pairs[:, 1], pairs[:, 0])
+        wins = np.bincount(winners, minlength=num_teams)
+        wager_scores = compute_scores(num_teams, winners, losers, rng.integers(0, 30, len(pairs)), rng.integers(0, 30, len(pairs)))
+
+        started = time.perf_counter()
+        compute_tiebreakers(wins, winners, losers, wager_scores)
+        elapsed = time.perf_counter() - started
+        command.stdout.write(f"{num_teams:>6} {len(pairs):>9} {elapsed * 1000:>10.2f}")
+
+
+def bench_scoring(command, options):
+    """Score a tournament with every team wagering on every game"""
+    sizes = options['sizes'] or [1000]
+    num_games = options['games']
+    rng = random.Random(0)
+    command.stdout.write(f"{'teams':>6} {'games':>6} {'wagers':>7} {'matchups':>9} {'rule':>10} {'score (ms)':>11}")
+    for num_teams in sizes:
+        tournament = make_tournament(num_teams, num_games)
+        team_ids = list(tournament.teams.order_by('team_number').values_list('pk', flat=True))
+        game_ids = list(tournament.games.order_by('pk').values_list('pk', flat=True))
+
+        # 100 points spread over the games, in whole-game chunks
+        wagers = []
+        for team_id in team_ids:
+            points = dict.fromkeys(game_ids, 0)
+            for _ in range(10):
+                points[rng.choice(game_ids)] += 10
+            wagers += [Wager(team_id=team_id, game_id=game_id, points=value) for game_id, value in points.items()]
+        Wager.objects.bulk_create(wagers, batch_size=5000)
+
+        # Ten rounds of random results
+        plan = build_round_robin_plan(team_ids, game_ids, time_budget=0)[:10]
+        persist_plan(tournament, plan)
+        matchups = list(Matchup.objects.filter(round__tournament=tournament, is_bye=False))
+        for matchup in matchups:
+            matchup.result = rng.choice(('TEAM1_WIN', 'TEAM2_WIN'))
+        Matchup.objects.bulk_update(matchups, ['result'], batch_size=5000)
+
+        for rule in SCORING_RULES:
+            started = time.perf_counter()
+            tournament_scores(tournament, rule)
+            elapsed = time.perf_counter() - started
+            command.stdout.write(
+                f"{num_teams:>6} {num_games:>6} {len(wagers):>7} {len(matchups):>9} {rule:>10} {elapsed * 1000:>11.1f}"
+            )
+
+
+def legacy_report(tournament, matchup_id, side, winner_id):
+    """The baseline report_result view's read-modify-write, kept for comparison.
+
+    Copied as it was, including treating equal reported_win flags as
+    agreement, so the ``wrong`` column also counts its misread results.
+    """
+    matchup = Matchup.objects.get(pk=matchup_id, round__tournament=tournament)
+    if side == 'team1':
+        matchup.team1_reported_win = (winner_id == matchup.team1.id)
+    elif side == 'team2' and matchup.team2:
+        matchup.team2_reported_win = (winner_id == matchup.team2.id)
+
+    if matchup.team1_reported_win is not None and matchup.team2_reported_win is not None:
+        if matchup.team1_reported_win == matchup.team2_reported_win:
+            if matchup.team1_reported_win:
+                matchup.result = 'TEAM1_WIN'
+            else:
+                matchup.result = 'TEAM2_WIN'
+            matchup.conflict_flag = False
+        else:
+            matchup.conflict_flag = True
+            matchup.conflict_notes = "Teams reported different winners"
+
+    matchup.save()
+    return matchup
+
+
+def bench_reporting(command, options):
+    """Both teams of every matchup report at the same instant from separate threads"""
+    sizes = options['sizes'] or [200]
+    reporters = {'atomic': report_winner, 'legacy': legacy_report}
+    command.stdout.write(f"{'mode':>7} {'matchups':>9} {'reports':>8} {'lost':>6} {'wrong':>6} {'time (s)':>9}")
+    rng = random.Random(0)
+    for num_teams in sizes:
+        for mode, report in reporters.items():
+            tournament = make_tournament(num_teams, options['games'], name=f'Reporting benchmark ({mode})')
+            try:
+                teams = list(tournament.teams.order_by('team_number').values_list('pk', flat=True))
+                game = tournament.games.first()
+                round_obj = Round.objects.create(tournament=tournament, round_number=1, is_current=True)
+                matchups = Matchup.objects.bulk_create([
+                    Matchup(round=round_obj, game=game, team1_id=teams[i], team2_id=teams[i + 1])
+                    for i in range(0, len(teams) - 1, 2)
+                ])
+
+                # Each team names a winner; about one in five pairs disagree
+                jobs, expected = [], {}
+                for matchup in matchups:
+                    winner = rng.choice((matchup.team1_id, matchup.team2_id))
+                    other = winner if rng.random() > 0.2 else (matchup.team1_id + matchup.team2_id - winner)
+                    barrier = threading.Barrier(2, timeout=30)
+                    jobs += [(matchup.pk, 'team1', winner, barrier), (matchup.pk, 'team2', other, barrier)]
+                    expected[matchup.pk] = winner == other
+
+                def run(job):
+                    matchup_id, side, winner_id, barrier = job
+                    try:
+                        barrier.wait()
+                        report(tournament, matchup_id, side, winner_id)
+                    finally:
+                        connection.close()
+
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                    list(pool.map(run, jobs))
+                elapsed = time.perf_counter() - started
+
+                lost = wrong = 0
+                for matchup in Matchup.objects.filter(round=round_obj):
+                    if matchup.team1_reported_win is None or matchup.team2_reported_win is None:
+                        lost += 1
+                    elif matchup.conflict_flag == expected[matchup.pk]:
+                        wrong += 1
+                command.stdout.write(
+                    f"{mode:>7} {len(matchups):>9} {len(jobs):>8} {lost:>6} {wrong:>6} {elapsed:>9.3f}"
+                )
+            finally:
+                tournament.delete()
+
+
+def bench_team_api(command, options):
+    """Every team's phone polls its current matchup every ``--interval`` seconds.
+
+    Phones start together and poll at random offsets within the interval,
+    like a field of phones refreshing the same page; latency includes any
+    time spent waiting for the interpreter behind other requests.
+    """
+    sizes = options['sizes'] or [300]
+    polls = 10
+    interval = options['interval']
+    command.stdout.write(f"{'phones':>7} {'requests':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} {'req/s':>8}")
+    for num_teams in sizes:
+        tournament = make_tournament(num_teams, options['games'], name='Team API benchmark')
+        try:
+            persist_plan(tournament, build_round_robin_plan(
+                list(tournament.teams.order_by('team_number').values_list('pk', flat=True)),
+                list(tournament.games.order_by('pk').values_list('pk', flat=True)),
+            )[:1])
+            tokens = list(tournament.teams.values_list('access_token', flat=True))
+            token_cache.clear()
+            barrier = threading.Barrier(len(tokens), timeout=60)
+
+            def poll(token):
+                client = Client()
+                url = f'{TEAM_API_PREFIX}{token}/matchup/'
+                offset = random.random() * interval
+                timings = []
+                try:
+                    barrier.wait()
+                    start = time.perf_counter() + offset
+                    for i in range(polls):
+                        time.sleep(max(0, start + i * interval - time.perf_counter()))
+                        started = time.perf_counter()
+                        response = client.get(url)
+                        timings.append(time.perf_counter() - started)
+                        assert response.status_code == 200
+                finally:
+                    connection.close()
+                return timings
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(tokens)) as pool:
+                timings = sorted(t for result in pool.map(poll, tokens) for t in result)
+            elapsed = time.perf_counter() - started
+
+            def percentile(p):
+                return timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+
+            command.stdout.write(
+                f"{len(tokens):>7} {len(timings):>9} {percentile(0.5):>9.2f} {percentile(0.99):>9.2f} "
+                f"{timings[-1] * 1000:>9.2f} {len(timings) / elapsed:>8.0f}"
+            )
+        finally:
+            tournament.delete()
+
+
+def bench_notifications(command, options):
+    """Per-team unread counts and lists after teams read notifications in random patterns"""
+    sizes = options['sizes'] or [1000]
+    num_notifications = options['notifications']
+    rng = random.Random(0)
+    command.stdout.write(
+        f"{'teams':>6} {'notes':>6} {'receipts':>9} {'fan-out':>8} {'mark (ms)':>10} "
+        f"{'count (ms)':>11} {'p99':>7} {'list (ms)':>10} {'p99':>7}"
+    )
+    for num_teams in sizes:
+        tournament = make_tournament(num_teams, options['games'])
+        teams = list(tournament.teams.order_by('team_number'))
+
+        # Four in five go to every team, the rest to one team each
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                tournament=tournament, title=f"Notice {i}", message='',
+                team=None if rng.random() < 0.8 else rng.choice(teams)
+            )
+            for i in range(num_notifications)
+        ], batch_size=5000)
+        broadcasts = sum(notification.team_id is None for notification in notifications)
+
+        # A third of the teams read nothing, a third read a random half, a third read everything
+        marking = []
+        for i, team in enumerate(teams):
+            visible = list(team_notifications(team).values_list('pk', flat=True))
+            started = time.perf_counter()
+            if i % 3 == 1:
+                mark_read(team, rng.sample(visible, len(visible) // 2))
+            elif i % 3 == 2:
+                mark_all_read(team)
+            marking.append(time.perf_counter() - started)
+
+        counts, lists = [], []
+        for team in teams:
+            started = time.perf_counter()
+            unread_count(team)
+            counts.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            list(unread_notifications(team).order_by('-pk')[:50])
+            lists.append(time.perf_counter() - started)
+
+        def summary(timings):
+            timings = sorted(timings)
+            return sum(timings) / len(timings) * 1000, timings[int(len(timings) * 0.99)] * 1000
+
+        receipts = NotificationReceipt.objects.filter(team__tournament=tournament).count()
+        fan_out = broadcasts * num_teams + num_notifications - broadcasts
+        command.stdout.write(
+            f"{num_teams:>6} {num_notifications:>6} {receipts:>9} {fan_out:>8} {summary(marking)[0]:>10.2f} "
+            f"{summary(counts)[0]:>11.2f} {summary(counts)[1]:>7.2f} {summary(lists)[0]:>10.2f} {summary(lists)[1]:>7.2f}"
+        )
+
+
+def bench_pdf(command, options):
+    """Export every printout for a tournament with ``--rounds`` rounds, inline and on a process pool"""
+    sizes = options['sizes'] or [40]
+    num_rounds = options['rounds']
+    rng = random.Random(0)
+    command.stdout.write(
+        f"{'teams':>6} {'rounds':>7} {'workers':>8} {'pages':>6} {'size (KB)':>10} {'time (s)':>9} {'peak (MB)':>10}"
+    )
+    for num_teams in sizes:
+        tournament = make_tournament(num_teams, options['games'])
+        team_ids = list(tournament.teams.values_list('pk', flat=True))
+        game_ids = list(tournament.games.values_list('pk', flat=True))
+        rounds = Round.objects.bulk_create([
+            Round(tournament=tournament, round_number=n) for n in range(1, num_rounds + 1)
+        ])
+        matchups = []
+        for round_obj in rounds:
+            order = rng.sample(team_ids, len(team_ids) - len(team_ids) % 2)
+            matchups += [
+                Matchup(round=round_obj, game_id=game_ids[i % len(game_ids)], team1_id=order[2 * i], team2_id=order[2 * i + 1],
+                        result=rng.choice(('PENDING', 'TEAM1_WIN', 'TEAM2_WIN')))
+                for i in range(len(order) // 2)
+            ]
+        Matchup.objects.bulk_create(matchups, batch_size=5000)
+
+        for workers in sorted({1, options['workers']}):
+            tracemalloc.start()
+            started = time.perf_counter()
+            pages = size = 0
+            if workers == 1:
+                page_iter = tournament_pages(tournament, PRINTOUTS)
+            else:
+                executor = ProcessPoolExecutor(workers, initializer=django.setup)
+                page_iter = tournament_pages(tournament, PRINTOUTS, executor, workers)
+
+            def counted(page_iter):
+                nonlocal pages
+                for page in page_iter:
+                    pages += 1
+                    yield page
+
+            # The bytes are dropped as they come, like a response being sent
+            for chunk in stream_pdf(counted(page_iter)):
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if workers > 1:
+                executor.shutdown()
+            command.stdout.write(
+                f"{num_teams:>6} {num_rounds:>7} {workers:>8} {pages:>6} {size / 1024:>10.0f} {elapsed:>9.2f} {peak / 2**20:>10.1f}"
+            )
+
+
+BENCHMARKS = {
+    'assignment': bench_assignment,
+    'schedule': bench_schedule,
+    'swiss': bench_swiss,
+    'tiebreakers': bench_tiebreakers,
+    'reporting': bench_reporting,
+    'scoring': bench_scoring,
+    'team_api': bench_team_api,
+    'notifications': bench_notifications,
+    'pdf': bench_pdf,
+}
+
+class Command(BaseCommand):
+    help = "Time tournament hot paths against throwaway data in a scratch database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=sorted(BENCHMARKS))
+        parser.add_argument('--sizes', type=int, nargs='+', help="Team counts to benchmark")
+        parser.add_argument('--games', type=int, default=10, help="Number of games per tournament")
+        parser.add_argument('--capacity', type=int, help="Concurrent matchups per game (default unlimited)")
+        parser.add_argument('--threads', type=int, default=16, help="Concurrent reporting threads")
+        parser.add_argument('--notifications', type=int, default=500, help="Notifications per tournament")
+        parser.add_argument('--rounds', type=int, default=200, help="Rounds per tournament for the PDF export")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes rendering PDF rounds")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between team API polls")
+        parser.add_argument('--budget', type=float, default=ASSIGNMENT_TIME_BUDGET, help="Game assignment time budget in seconds")
+
+    def handle(self, *args, **options):
+        # A freshly migrated database in a temporary directory, like the test
+        # runner's; the configured database is never touched.  Worker threads
+        # and forked PDF processes all see it through the patched settings.
+        with tempfile.TemporaryDirectory() as scratch:
+            connection.settings_dict['TEST']['NAME'] = os.path.join(scratch, 'benchmark.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                BENCHMARKS[options['target']](self, options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
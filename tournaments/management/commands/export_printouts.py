@@ -0,0 +1,47 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.pdf import stream_pdf
+from tournaments.printing import PRINTOUTS, tournament_pages
+
+
+class Command(BaseCommand):
+    help = "Write a tournament's team list, round grids and score sheets to a PDF, rendering rounds in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('path', help="PDF file to write")
+        parser.add_argument('--printouts', nargs='+', choices=PRINTOUTS, default=list(PRINTOUTS))
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes rendering rounds (1 renders inline)")
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Tournament {options['tournament_id']} does not exist")
+
+        workers = max(1, options['workers'])
+        try:
+            with open(options['path'], 'wb') as f:
+                if workers == 1:
+                    size = write_pdf(f, tournament_pages(tournament, options['printouts']))
+                else:
+                    # Spawned workers (macOS, Windows) import the models, so set Django up first
+                    with ProcessPoolExecutor(workers, initializer=django.setup) as executor:
+                        size = write_pdf(f, tournament_pages(tournament, options['printouts'], executor, workers))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {size} bytes to {options['path']}"))
+
+
+def write_pdf(f, pages):
+    size = 0
+    for chunk in stream_pdf(pages):
+        f.write(chunk)
+        size += len(chunk)
+    return size
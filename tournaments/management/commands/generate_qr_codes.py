@@ -0,0 +1,35 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.qr import DEFAULT_SIZE, generate_codes
+
+
+class Command(BaseCommand):
+    help = "Render every team's QR code PNG into the on-disk cache, in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('--size', type=int, nargs='+', default=[DEFAULT_SIZE], help="Pixels per module; one PNG per size")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes rendering codes (1 renders inline)")
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Tournament {options['tournament_id']} does not exist")
+
+        tokens = [str(token) for token in tournament.teams.values_list('access_token', flat=True)]
+        workers = max(1, options['workers'])
+        start = time.perf_counter()
+        try:
+            rendered = sum(generate_codes(tokens, size, workers) for size in options['size'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        cached = len(tokens) * len(options['size']) - rendered
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} codes ({cached} already cached) in {time.perf_counter() - start:.2f}s"
+        ))
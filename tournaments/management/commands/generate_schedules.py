@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from tournaments.models import Tournament, Team, Game
+from tournaments.plans import build_plan
+from tournaments.scheduling import ScheduleError, assign_team_numbers, persist_plan
+from tournaments.standings import rebuild_standings
+
+
+def compute_plan(job):
+    """Build one tournament's plan from plain ids; runs in a worker process"""
+    tournament_id, inputs = job
+    started = time.perf_counter()
+    try:
+        plan = build_plan(**inputs)
+    except ScheduleError as e:
+        return tournament_id, None, str(e), time.perf_counter() - started
+    return tournament_id, plan, None, time.perf_counter() - started
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = "Generate schedules for many tournaments at once, computing plans in a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='*', type=int, help="Tournaments to schedule (default: all without rounds)")
+        parser.add_argument('--replace', action='store_true', help="Regenerate tournaments that already have rounds")
+        parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+
+    def handle(self, *args, **options):
+        tournaments = Tournament.objects.all()
+        if options['tournament_ids']:
+            tournaments = tournaments.filter(pk__in=options['tournament_ids'])
+        if not options['replace']:
+            tournaments = tournaments.filter(rounds__isnull=True)
+        tournaments = {t.pk: t for t in tournaments.distinct()}
+        if not tournaments:
+            raise CommandError("No tournaments to schedule")
+
+        teams, games = {}, {}
+        for team in Team.objects.filter(tournament__in=tournaments).order_by('team_number', 'pk'):
+            teams.setdefault(team.tournament_id, []).append(team)
+        for pk, tournament_id, capacity in Game.objects.filter(tournament__in=tournaments).order_by('pk').values_list('pk', 'tournament_id', 'capacity'):
+            games.setdefault(tournament_id, []).append((pk, capacity))
+
+        jobs = []
+        for tournament_id, tournament in tournaments.items():
+            if len(teams.get(tournament_id, [])) < 2 or not games.get(tournament_id):
+                self.stderr.write(f"Skipping {tournament.name}: need at least 2 teams and 1 game")
+                continue
+            jobs.append((tournament_id, {
+                'swiss': tournament.format == Tournament.SWISS,
+                'team_ids': [team.pk for team in teams[tournament_id]],
+                'game_ids': [pk for pk, _ in games[tournament_id]],
+                'capacities': [capacity for _, capacity in games[tournament_id]],
+            }))
+
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+
+        self.stdout.write(f"{'tournament':<30} {'teams':>6} {'rounds':>7} {'matchups':>9} {'plan (s)':>9} {'write (s)':>10} {'queries':>8}")
+        started = time.perf_counter()
+        # Workers set Django up first: started with spawn (macOS, Windows)
+        # they import this module, and with it the models, from scratch
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = [pool.submit(compute_plan, job) for job in jobs]
+            for future in as_completed(futures):
+                tournament_id, plan, error, compute_time = future.result()
+                tournament = tournaments[tournament_id]
+                if error:
+                    self.stderr.write(f"{tournament.name}: {error}")
+                    continue
+
+                # Writes stay in this process, one transaction per tournament
+                counter = QueryCounter()
+                write_started = time.perf_counter()
+                with connection.execute_wrapper(counter), transaction.atomic():
+                    assign_team_numbers(teams[tournament_id])
+                    tournament.rounds.all().delete()
+                    persist_plan(tournament, plan)
+                    rebuild_standings(tournament)
+                write_time = time.perf_counter() - write_started
+
+                self.stdout.write(
+                    f"{tournament.name[:30]:<30} {len(teams[tournament_id]):>6} {len(plan):>7} "
+                    f"{sum(len(r) for r in plan):>9} {compute_time:>9.3f} {write_time:>10.3f} {counter.count:>8}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"Scheduled {len(jobs)} tournaments in {time.perf_counter() - started:.2f}s"))
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.wagers import IMPORT_BATCH_SIZE, import_wagers
+
+
+class Command(BaseCommand):
+    help = "Import team,game,points wager rows from a CSV file, validating each team's 100-point budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('path', help="CSV file to import, or - for stdin")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Wagers per INSERT")
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Tournament {options['tournament_id']} does not exist")
+
+        if options['path'] == '-':
+            report = import_wagers(tournament, sys.stdin, options['batch_size'])
+        else:
+            try:
+                with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                    report = import_wagers(tournament, f, options['batch_size'])
+            except OSError as e:
+                raise CommandError(str(e))
+
+        for line, error in report['errors']:
+            self.stderr.write(f"line {line}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {report['rows']} rows; imported {report['wagers']} wagers for {report['teams']} teams "
+            f"({len(report['errors'])} errors)"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.standings import check_standings, rebuild_standings
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized standings table from raw matchups, or check it for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='*', type=int, help="Tournaments to process (default: all)")
+        parser.add_argument('--check', action='store_true', help="Only compare against a full recompute; fail on mismatches")
+
+    def handle(self, *args, **options):
+        tournaments = Tournament.objects.order_by('pk')
+        if options['tournament_ids']:
+            tournaments = tournaments.filter(pk__in=options['tournament_ids'])
+
+        drifted = 0
+        for tournament in tournaments:
+            if options['check']:
+                mismatches = check_standings(tournament)
+                for team_id, field, stored, expected in mismatches:
+                    self.stdout.write(f"{tournament.name}: team {team_id} {field} is {stored}, expected {expected}")
+                if mismatches:
+                    drifted += 1
+                else:
+                    self.stdout.write(f"{tournament.name}: consistent")
+            else:
+                rebuild_standings(tournament)
+                self.stdout.write(f"{tournament.name}: rebuilt")
+
+        if drifted:
+            raise CommandError(f"{drifted} tournament(s) have standings that differ from a full recompute")
@@ -0,0 +1,34 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .team_api import TEAM_API_PREFIX, dispatch
+
+
+class TeamAPIMiddleware:
+    """Answer team API requests before the session, auth, CSRF and message middleware.
+
+    Must come first in MIDDLEWARE so the rest of the stack never runs for
+    them; every other request passes straight through.  Works in both sync
+    and async mode, so under ASGI it does not push async views (the event
+    streams) onto a thread each.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path.startswith(TEAM_API_PREFIX):
+            return dispatch(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path.startswith(TEAM_API_PREFIX):
+            return await sync_to_async(dispatch)(request)
+        return await self.get_response(request)
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0007_alter_game_round_number_alter_game_team1_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='date_played',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='rules',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='score_team1',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='score_team2',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='status',
+            field=models.CharField(choices=[('SCHEDULED', 'Scheduled'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed')], default='SCHEDULED', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='games_won', to='tournaments.team'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='email_1',
+            field=models.EmailField(blank=True, max_length=254, null=True),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='email_2',
+            field=models.EmailField(blank=True, max_length=254, null=True),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='phone_number_1',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='phone_number_2',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('is_read', models.BooleanField(default=False)),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='tournaments.team')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='tournaments.tournament')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Round',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.IntegerField()),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('length_minutes', models.IntegerField(default=30)),
+                ('is_current', models.BooleanField(default=False)),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rounds', to='tournaments.tournament')),
+            ],
+            options={
+                'ordering': ['round_number'],
+                'unique_together': {('tournament', 'round_number')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Matchup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result', models.CharField(choices=[('PENDING', 'Pending'), ('TEAM1_WIN', 'Team 1 Win'), ('TEAM2_WIN', 'Team 2 Win')], default='PENDING', max_length=20)),
+                ('conflict_flag', models.BooleanField(default=False)),
+                ('team1_reported_win', models.BooleanField(blank=True, null=True)),
+                ('team2_reported_win', models.BooleanField(blank=True, null=True)),
+                ('conflict_notes', models.TextField(blank=True, null=True)),
+                ('is_bye', models.BooleanField(default=False)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matchups', to='tournaments.game')),
+                ('team1', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matchups_as_team1', to='tournaments.team')),
+                ('team2', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matchups_as_team2', to='tournaments.team')),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matchups', to='tournaments.round')),
+            ],
+            options={
+                'unique_together': {('round', 'team1', 'team2')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Wager',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wagers', to='tournaments.game')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wagers', to='tournaments.team')),
+            ],
+            options={
+                'unique_together': {('team', 'game')},
+            },
+        ),
+    ]
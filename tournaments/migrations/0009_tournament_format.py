@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0008_game_capacity_game_date_played_game_rules_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='format',
+            field=models.CharField(choices=[('ROUND_ROBIN', 'Round Robin'), ('SWISS', 'Swiss')], default='ROUND_ROBIN', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='swiss_rounds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0012_standingsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='matchup',
+            index=models.Index(condition=models.Q(('conflict_flag', True)), fields=['round'], name='matchup_conflict_idx'),
+        ),
+    ]
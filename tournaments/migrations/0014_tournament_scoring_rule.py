@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0013_matchup_conflict_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='scoring_rule',
+            field=models.CharField(choices=[('WINS_ONLY', 'Wager points on wins'), ('WIN_LOSS', 'Wager points on wins, minus wager points on losses')], default='WINS_ONLY', max_length=20),
+        ),
+    ]
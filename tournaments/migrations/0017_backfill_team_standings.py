@@ -0,0 +1,61 @@
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+FIELDS = ('wins', 'losses', 'byes', 'games_played')
+
+
+def backfill_team_standings(apps, schema_editor):
+    """Recompute every TeamStanding row from the stored results.
+
+    0010 created the table empty, so tournaments with results from before
+    it showed zeros and later deltas started from those zeros.  This is the
+    same recompute as ``standings.compute_standings``, on the historical
+    models.
+    """
+    Team = apps.get_model('tournaments', 'Team')
+    Game = apps.get_model('tournaments', 'Game')
+    Matchup = apps.get_model('tournaments', 'Matchup')
+    Wager = apps.get_model('tournaments', 'Wager')
+    TeamStanding = apps.get_model('tournaments', 'TeamStanding')
+
+    teams = dict(Team.objects.values_list('pk', 'tournament_id'))
+    stats = {team_id: Counter() for team_id in teams}
+
+    results = Matchup.objects.exclude(result='PENDING').values_list('team1_id', 'team2_id', 'is_bye', 'result')
+    for team1_id, team2_id, is_bye, result in results.iterator(chunk_size=2000):
+        if is_bye:
+            if team1_id in stats:
+                stats[team1_id].update(byes=1, wins=int(result == 'TEAM1_WIN'))
+            continue
+        winner, loser = (team1_id, team2_id) if result == 'TEAM1_WIN' else (team2_id, team1_id)
+        if winner in stats:
+            stats[winner].update(wins=1, games_played=1)
+        if loser in stats:
+            stats[loser].update(losses=1, games_played=1)
+
+    for team_id, total in Game.objects.filter(winner__isnull=False).values_list('winner').annotate(total=Count('pk')):
+        stats[team_id]['wins'] += total
+    wager_points = dict(Wager.objects.values_list('team').annotate(total=Sum('points')))
+
+    TeamStanding.objects.all().delete()
+    TeamStanding.objects.bulk_create([
+        TeamStanding(
+            team_id=team_id, tournament_id=teams[team_id],
+            wager_points=wager_points.get(team_id) or 0,
+            **{field: counts[field] for field in FIELDS}
+        )
+        for team_id, counts in stats.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0016_notification_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_team_standings, migrations.RunPython.noop),
+    ]
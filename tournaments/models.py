@@ -2,12 +2,44 @@ from django.db import models
 import uuid
 
 class Tournament(models.Model):
+    ROUND_ROBIN = 'ROUND_ROBIN'
+    SWISS = 'SWISS'
+    FORMAT_CHOICES = [
+        (ROUND_ROBIN, 'Round Robin'),
+        (SWISS, 'Swiss'),
+    ]
+    WINS_ONLY = 'WINS_ONLY'
+    WIN_LOSS = 'WIN_LOSS'
+    SCORING_CHOICES = [
+        (WINS_ONLY, 'Wager points on wins'),
+        (WIN_LOSS, 'Wager points on wins, minus wager points on losses'),
+    ]
+
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES, default=ROUND_ROBIN)
+    swiss_rounds = models.PositiveIntegerField(null=True, blank=True)  # Defaults to log2(teams) when blank
+    scoring_rule = models.CharField(max_length=20, choices=SCORING_CHOICES, default=WINS_ONLY)  # See scoring.py
+    cache_version = models.PositiveIntegerField(default=0, editable=False)  # Bumped whenever tournament data changes
 
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        # cache_version only moves through caching.bump_version; never write
+        # back the possibly stale copy held by this instance
+        if self.pk and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'cache_version']
+        super().save(*args, **kwargs)
+    
+    def swiss_round_count(self):
+        """Return the number of rounds to play in Swiss format"""
+        from .swiss import default_round_count
+        return self.swiss_rounds or default_round_count(self.teams.count())
+    
     def current_round(self):
         """Return the current active round, or None if no rounds are active"""
         rounds = self.rounds.filter(is_current=True)
@@ -27,26 +59,28 @@ class Team(models.Model):
     phone_number_2 = models.CharField(max_length=20, blank=True, null=True)
     email_1 = models.EmailField(blank=True, null=True)
     email_2 = models.EmailField(blank=True, null=True)
+    
+    # Every notification up to this id counts as read by the team (see inbox.py)
+    notifications_read_through = models.BigIntegerField(default=0)
 
     def __str__(self):
         return self.name
     
     def get_wins(self):
         """Return the number of wins for this team"""
-        # For backward compatibility, check both Game and Matchup
-        old_wins = self.games_won.count()
+        # Querysets from standings.with_standings already carry the total
+        if hasattr(self, 'wins'):
+            return self.wins
         
-        # New wins from Matchup
-        new_wins_as_team1 = self.matchups_as_team1.filter(result='TEAM1_WIN').count()
-        new_wins_as_team2 = self.matchups_as_team2.filter(result='TEAM2_WIN').count()
-        
-        return old_wins + new_wins_as_team1 + new_wins_as_team2
+        from .standings import team_wins
+        return team_wins(self)
 
 # Original Game model with minimal modifications
 class Game(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     rules = models.TextField(blank=True, null=True)  # New field
+    capacity = models.PositiveIntegerField(null=True, blank=True)  # Max concurrent matchups per round; blank for unlimited
     team1 = models.ForeignKey(Team, related_name='home_games', on_delete=models.CASCADE, null=True, blank=True)
     team2 = models.ForeignKey(Team, related_name='away_games', on_delete=models.CASCADE, null=True, blank=True)
     round_number = models.IntegerField(null=True, blank=True)
@@ -125,11 +159,17 @@ class Matchup(models.Model):
     team2_reported_win = models.BooleanField(null=True, blank=True)
     conflict_notes = models.TextField(blank=True, null=True)
     
-    # BYE handling - if team2 is None, team1 has a bye
+    # BYE handling - if team2 is None, team1 has a bye.  A played matchup
+    # whose team was dropped also has an empty side but is not a bye
+    # (see scheduling.drop_team_from_schedule)
     is_bye = models.BooleanField(default=False)
     
     class Meta:
         unique_together = ['round', 'team1', 'team2']
+        indexes = [
+            # Conflict queue: only flagged rows are indexed, so it stays tiny
+            models.Index(fields=['round'], condition=models.Q(conflict_flag=True), name='matchup_conflict_idx'),
+        ]
     
     def __str__(self):
         if self.is_bye:
@@ -137,8 +177,9 @@ class Matchup(models.Model):
         return f"{self.game.name} - {self.team1.name if self.team1 else 'TBD'} vs {self.team2.name if self.team2 else 'TBD'} - Round {self.round.round_number}"
     
     def save(self, *args, **kwargs):
-        # Set is_bye to True if team2 is None but team1 isn't
-        if self.team1 and not self.team2:
+        # Set is_bye to True if team2 is None but team1 isn't, on new rows
+        # only so a played matchup that lost a team keeps its result
+        if self._state.adding and self.team1 and not self.team2:
             self.is_bye = True
         super().save(*args, **kwargs)
 
@@ -155,11 +196,18 @@ class Wager(models.Model):
     
     def clean(self):
         from django.core.exceptions import ValidationError
-        # Check if team's total wager points equal 100
-        total_points = Wager.objects.filter(team=self.team).exclude(pk=self.pk).aggregate(
+        # A blank points field is reported by the field's own validation
+        if self.points is None:
+            return
+        if not 0 <= self.points <= 100:
+            raise ValidationError("Wager points must be between 0 and 100")
+        if self.team_id is None:
+            return
+        # Check if team's total wager points stay within 100
+        total_points = Wager.objects.filter(team_id=self.team_id).exclude(pk=self.pk).aggregate(
             total=models.Sum('points'))['total'] or 0
         total_points += self.points
-        
+
         if total_points > 100:
             raise ValidationError(f"Total wager points exceed 100. Current total: {total_points}")
 
@@ -173,8 +221,64 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A team's notifications (team or NULL for broadcasts) newer than its read-through mark
+            models.Index(fields=['tournament', 'team', 'id'], name='notification_inbox_idx'),
+            # Keyset feeds (see feed.py): a team's or the broadcasts' rows in (created_at, id) order
+            models.Index(fields=['tournament', 'team', 'created_at'], name='notification_feed_idx'),
+            # The organiser's feed of every notification in the tournament
+            models.Index(fields=['tournament', 'created_at'], name='notification_all_feed_idx'),
+        ]
     
     def __str__(self):
         if self.team:
             return f"{self.title} - {self.team.name}"
-        return f"{self.title} - All Teams"
\ No newline at end of file
+        return f"{self.title} - All Teams"
+
+class NotificationReceipt(models.Model):
+    """A team has read a notification above its read-through mark"""
+    notification = models.ForeignKey(Notification, related_name='receipts', on_delete=models.CASCADE)
+    team = models.ForeignKey(Team, related_name='notification_receipts', on_delete=models.CASCADE)
+    read_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['team', 'notification']
+    
+    def __str__(self):
+        return f"{self.team.name} read {self.notification.title}"
+
+
+class TeamStanding(models.Model):
+    """Denormalized standings row, updated in step with Matchup results.
+
+    Saves of a Matchup or Wager keep it current through signals; queryset
+    ``update()`` and bulk writes must apply their own deltas, and
+    ``manage.py rebuild_standings`` repairs any drift.
+    """
+    team = models.OneToOneField(Team, related_name='standing', on_delete=models.CASCADE)
+    tournament = models.ForeignKey(Tournament, related_name='standings', on_delete=models.CASCADE)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    byes = models.IntegerField(default=0)
+    games_played = models.IntegerField(default=0)
+    wager_points = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-wins', '-wager_points']
+    
+    def __str__(self):
+        return f"{self.team.name}: {self.wins}W {self.losses}L"
+
+class StandingSnapshot(models.Model):
+    """Cumulative standings after a round, stored as {team_id: [wins, losses, byes, games_played, rank]}"""
+    tournament = models.ForeignKey(Tournament, related_name='standing_snapshots', on_delete=models.CASCADE)
+    round_number = models.IntegerField()
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['round_number']
+        unique_together = ['tournament', 'round_number']
+    
+    def __str__(self):
+        return f"Standings after Round {self.round_number} - {self.tournament.name}"
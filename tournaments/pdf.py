@@ -0,0 +1,125 @@
+"""A small PDF writer that emits a document one page at a time.
+
+Only what the printouts need: text in the standard Helvetica faces (which
+every viewer has, so nothing is embedded), lines and rectangles.  Each page
+is drawn on a ``Page`` and turned into compressed content bytes by
+``Page.finish``; pages are independent of one another, so they can be drawn
+in worker processes.  ``stream_pdf`` then wraps an iterable of finished pages into the
+file's bytes as they come: the page tree, catalog and cross-reference table
+are written after the last page, so nothing but one offset per object is
+kept while streaming.
+
+Text is encoded as WinAnsi (Latin-1 for our purposes); other characters
+print as '?'.
+"""
+import zlib
+
+# Letter, in points
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+
+FONTS = {'regular': b'/F1', 'bold': b'/F2'}
+
+# Helvetica advance widths for ' ' through '~', in 1/1000 em
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+# Helvetica-Bold is measured as slightly wider regular text
+_BOLD_SCALE = 1.07
+
+
+def text_width(text, size, bold=False):
+    """Approximate width of ``text`` in points"""
+    units = sum(_HELVETICA_WIDTHS[ord(c) - 32] if ' ' <= c <= '~' else 556 for c in text)
+    return units * size / 1000 * (_BOLD_SCALE if bold else 1)
+
+
+def fit_text(text, size, width, bold=False):
+    """``text`` cut down with an ellipsis until it fits in ``width`` points"""
+    if text_width(text, size, bold) <= width:
+        return text
+    while text and text_width(text + '...', size, bold) > width:
+        text = text[:-1]
+    return text + '...'
+
+
+def _literal(text):
+    raw = text.encode('cp1252', errors='replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class Page:
+    """Drawing operations for one page; origin at the bottom left"""
+
+    def __init__(self):
+        self._ops = []
+
+    def text(self, x, y, text, size=10, bold=False):
+        self._ops.append(b'BT %s %g Tf %.2f %.2f Td %s Tj ET' % (
+            FONTS['bold' if bold else 'regular'], size, x, y, _literal(text)
+        ))
+
+    def centered_text(self, x, y, width, text, size=10, bold=False):
+        self.text(x + (width - text_width(text, size, bold)) / 2, y, text, size, bold)
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        self._ops.append(b'%g w %.2f %.2f m %.2f %.2f l S' % (width, x1, y1, x2, y2))
+
+    def rect(self, x, y, width, height, line_width=0.5, fill_gray=None):
+        if fill_gray is None:
+            self._ops.append(b'%g w %.2f %.2f %.2f %.2f re S' % (line_width, x, y, width, height))
+        else:
+            self._ops.append(b'%g g %.2f %.2f %.2f %.2f re f 0 g' % (fill_gray, x, y, width, height))
+
+    def fill_rects(self, rects, gray=0):
+        """Fill many ``(x, y, width, height)`` rectangles as one path"""
+        self._ops.append(b'%g g %s f 0 g' % (gray, b' '.join(b'%.2f %.2f %.2f %.2f re' % rect for rect in rects)))
+
+    def finish(self):
+        """The page's compressed content stream"""
+        return zlib.compress(b'\n'.join(self._ops))
+
+
+def stream_pdf(pages):
+    """Yield the bytes of a PDF made of ``pages`` (finished content streams).
+
+    Object 1 is the catalog and 2 the page tree, both written last; 3 and 4
+    are the fonts; each page then takes two objects, its content and itself.
+    """
+    offsets = {}
+    position = 0
+
+    def emit(number, body):
+        nonlocal position
+        data = b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        offsets[number] = position
+        position += len(data)
+        return data
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position = len(header)
+    yield header
+    yield emit(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    yield emit(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+    number = 5
+    for content in pages:
+        yield emit(number, b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(content), content))
+        yield emit(number + 1, b'<< /Type /Page /Parent 2 0 R /Contents %d 0 R >>' % number)
+        number += 2
+
+    kids = b' '.join(b'%d 0 R' % page for page in range(6, number, 2))
+    yield emit(2, b'<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 %d %d] '
+                  b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>' % (
+                      kids, (number - 5) // 2, PAGE_WIDTH, PAGE_HEIGHT))
+    yield emit(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+    xref = [b'xref\n0 %d\n0000000000 65535 f \n' % number]
+    xref += [b'%010d 00000 n \n' % offsets[n] for n in range(1, number)]
+    yield b''.join(xref)
+    yield b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (number, position)
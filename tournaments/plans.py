@@ -0,0 +1,95 @@
+"""Schedule previews backed by a content-addressed plan cache.
+
+A plan depends only on the ordered team ids, game ids, game capacities and
+tournament format, so it is stored under a hash of exactly those inputs.
+Organizers can preview a schedule as often as they like without touching
+Rounds or Matchups; committing a previewed plan is a straight bulk insert.
+The cache is per process, so a preview made on another worker is simply
+recomputed on commit.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from .models import Tournament
+from .scheduling import GameAssigner, build_round_robin_plan
+from .swiss import pair_swiss
+
+# Number of plans kept per process
+PLAN_CACHE_SIZE = 32
+
+
+class PlanCache:
+    """Thread-safe LRU mapping of plan keys to plans"""
+
+    def __init__(self, max_size=PLAN_CACHE_SIZE):
+        self.max_size = max_size
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+            return plan
+
+    def put(self, key, plan):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+plan_cache = PlanCache()
+
+
+def build_plan(swiss, team_ids, game_ids, capacities):
+    """Compute a fresh schedule plan from plain ids.
+
+    Swiss tournaments only get their first round, paired in team order;
+    later rounds are paired from the standings as the event progresses.
+    """
+    if swiss:
+        assigner = GameAssigner(game_ids, capacities)
+        return [assigner.assign_round(pair_swiss(team_ids, set()), 1)]
+    return build_round_robin_plan(team_ids, game_ids, capacities)
+
+
+def plan_inputs(tournament):
+    """Everything a plan depends on, in the order the scheduler uses it"""
+    games = list(tournament.games.order_by('pk').values_list('pk', 'capacity'))
+    return {
+        'swiss': tournament.format == Tournament.SWISS,
+        'team_ids': list(tournament.teams.order_by('team_number', 'pk').values_list('pk', flat=True)),
+        'game_ids': [pk for pk, _ in games],
+        'capacities': [capacity for _, capacity in games],
+    }
+
+
+def plan_key(inputs):
+    """Content hash identifying a plan"""
+    encoded = json.dumps(inputs, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def preview_plan(tournament):
+    """Return ``(key, plan, cached)`` for the tournament's current teams and games.
+
+    Nothing is written to the database.
+    """
+    inputs = plan_inputs(tournament)
+    key = plan_key(inputs)
+    plan = plan_cache.get(key)
+    if plan is not None:
+        return key, plan, True
+
+    plan = build_plan(**inputs)
+    plan_cache.put(key, plan)
+    return key, plan, False
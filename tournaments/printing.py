@@ -0,0 +1,249 @@
+"""Printable PDFs of a tournament: team reference list, QR code sheet, round grids and score sheets.
+
+Rows are read from one streamed query and laid out a round at a time by
+``render_round``, a plain function of plain data, so rounds can be handed
+to a process pool; a bounded window of rounds is in flight at once and
+pages leave in order through ``pdf.stream_pdf``.  Memory stays flat however
+many rounds the tournament has.  QR code pages work the same way, a page
+of teams at a time.
+"""
+import collections
+import itertools
+
+import numpy as np
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Matchup
+from .pdf import PAGE_HEIGHT, PAGE_WIDTH, Page, fit_text, stream_pdf
+from .qr import QUIET_ZONE, qr_matrix, team_access_url
+
+PRINTOUTS = ('teams', 'codes', 'grids', 'sheets')
+
+MARGIN = 40
+ROW_HEIGHT = 18
+FONT_SIZE = 10
+TABLE_TOP = PAGE_HEIGHT - 110
+ROWS_PER_PAGE = int((TABLE_TOP - MARGIN - 30) // ROW_HEIGHT) - 1
+
+# (header, width) per column; widths add up to the printable width
+GRID_COLUMNS = [('Game', 170), ('Team 1', 145), ('Team 2', 145), ('Winner', 72)]
+SHEET_COLUMNS = [('Game', 140), ('Team 1', 130), ('Won', 36), ('Team 2', 130), ('Won', 36), ('Initials', 60)]
+
+# QR code sheet: a grid of cells, each a code with the team's name under it
+CODE_COLUMNS = 3
+CODE_ROWS = 4
+CODE_SIZE = 126
+CODE_CELL_WIDTH = (PAGE_WIDTH - 2 * MARGIN) / CODE_COLUMNS
+CODE_CELL_HEIGHT = (TABLE_TOP + ROW_HEIGHT - MARGIN) / CODE_ROWS
+
+# Rounds being rendered ahead of the one being written, per worker
+WINDOW_PER_WORKER = 2
+
+
+def _team_label(number, name):
+    if name is None:
+        return ''
+    return f"{number} ({name})" if number is not None else name
+
+
+def _page_header(page, title, heading, subheading=None, page_label=None):
+    page.text(MARGIN, PAGE_HEIGHT - MARGIN - 16, fit_text(title, 16, PAGE_WIDTH - 2 * MARGIN, bold=True), size=16, bold=True)
+    page.text(MARGIN, PAGE_HEIGHT - MARGIN - 38, heading, size=13, bold=True)
+    if subheading:
+        page.text(MARGIN, PAGE_HEIGHT - MARGIN - 54, subheading, size=FONT_SIZE)
+    if page_label:
+        page.text(MARGIN, MARGIN - 16, page_label, size=8)
+
+
+def _table(page, columns, rows, checkbox_columns=()):
+    """Draw a header row and ``rows`` of cell strings from ``TABLE_TOP`` down"""
+    y = TABLE_TOP
+    page.rect(MARGIN, y - ROW_HEIGHT, PAGE_WIDTH - 2 * MARGIN, ROW_HEIGHT, fill_gray=0.9)
+    for row_index, cells in enumerate([[header for header, _ in columns]] + rows):
+        x = MARGIN
+        for column, ((_, width), cell) in enumerate(zip(columns, cells)):
+            page.rect(x, y - ROW_HEIGHT, width, ROW_HEIGHT)
+            if row_index and column in checkbox_columns:
+                page.rect(x + (width - 10) / 2, y - ROW_HEIGHT + 4, 10, 10)
+            else:
+                page.text(x + 4, y - ROW_HEIGHT + 5, fit_text(cell, FONT_SIZE, width - 8, bold=not row_index),
+                          size=FONT_SIZE, bold=not row_index)
+            x += width
+        y -= ROW_HEIGHT
+
+
+def _chunks(rows, size):
+    rows = list(rows)
+    return [rows[i:i + size] for i in range(0, len(rows), size)] or [[]]
+
+
+def render_round(title, kinds, round_number, start, matchups):
+    """Finished pages for one round.
+
+    ``matchups`` are ``(game, team1 number, team1 name, team2 number,
+    team2 name, is_bye, result)`` tuples; ``start`` is preformatted.
+    """
+    pages = []
+    subheading = f"Scheduled start: {start}" if start else None
+
+    if 'grids' in kinds:
+        rows = []
+        for game, number1, name1, number2, name2, is_bye, result in matchups:
+            winner = {'TEAM1_WIN': number1, 'TEAM2_WIN': number2}.get(result)
+            rows.append([
+                game or '', _team_label(number1, name1),
+                'BYE' if is_bye else _team_label(number2, name2),
+                '' if winner is None else str(winner),
+            ])
+        chunks = _chunks(rows, ROWS_PER_PAGE)
+        for i, chunk in enumerate(chunks, start=1):
+            page = Page()
+            _page_header(page, title, f"Round {round_number}", subheading,
+                         f"Round {round_number} grid - page {i} of {len(chunks)}")
+            _table(page, GRID_COLUMNS, chunk)
+            pages.append(page.finish())
+
+    if 'sheets' in kinds:
+        rows = [
+            [game or '', _team_label(number1, name1), '', _team_label(number2, name2), '', '']
+            for game, number1, name1, number2, name2, is_bye, result in matchups
+            if not is_bye
+        ]
+        chunks = _chunks(rows, ROWS_PER_PAGE)
+        for i, chunk in enumerate(chunks, start=1):
+            page = Page()
+            _page_header(page, title, f"Round {round_number} Score Sheet",
+                         "Tick the winning team and initial the row.",
+                         f"Round {round_number} score sheet - page {i} of {len(chunks)}")
+            _table(page, SHEET_COLUMNS, chunk, checkbox_columns=(2, 4))
+            pages.append(page.finish())
+
+    return pages
+
+
+def render_team_list(title, teams):
+    """Finished pages of ``(team number, name)`` in two columns"""
+    pages = []
+    per_column = ROWS_PER_PAGE + 1
+    column_width = (PAGE_WIDTH - 2 * MARGIN) / 2
+    for chunk in _chunks(teams, per_column * 2):
+        page = Page()
+        _page_header(page, title, "Team Reference List")
+        for i, (number, name) in enumerate(chunk):
+            x = MARGIN + column_width * (i // per_column)
+            y = TABLE_TOP - ROW_HEIGHT * (i % per_column) - 12
+            label = f"Team {number}: {name}" if number is not None else name
+            page.text(x, y, fit_text(label, FONT_SIZE, column_width - 10), size=FONT_SIZE)
+        pages.append(page.finish())
+    return pages
+
+
+def _draw_code(page, x, y, matrix, size):
+    """``matrix`` as a ``size`` point square with its bottom left at ``(x, y)``"""
+    module = size / (len(matrix) + 2 * QUIET_ZONE)
+    x += QUIET_ZONE * module
+    top = y + size - QUIET_ZONE * module
+    # One filled rectangle per run of dark modules: edges of the runs in each row
+    edges = np.diff(np.pad(matrix.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    page.fill_rects([
+        (x + start * module, top - (row + 1) * module, (end - start) * module, module)
+        for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist())
+    ])
+
+
+def render_code_page(title, teams, page_label=None):
+    """A finished page of QR codes for ``(team number, name, token)`` tuples"""
+    page = Page()
+    _page_header(page, title, "Team Access Codes", "Scan to see your matchups and report results.", page_label)
+    for i, (number, name, token) in enumerate(teams):
+        x = MARGIN + CODE_CELL_WIDTH * (i % CODE_COLUMNS)
+        y = TABLE_TOP + ROW_HEIGHT - CODE_CELL_HEIGHT * (i // CODE_COLUMNS + 1)
+        _draw_code(page, x + (CODE_CELL_WIDTH - CODE_SIZE) / 2, y + 24, qr_matrix(team_access_url(token)), CODE_SIZE)
+        label = fit_text(_team_label(number, name), FONT_SIZE, CODE_CELL_WIDTH - 8, bold=True)
+        page.centered_text(x, y + 12, CODE_CELL_WIDTH, label, size=FONT_SIZE, bold=True)
+    return [page.finish()]
+
+
+def code_jobs(tournament):
+    """``render_code_page`` arguments for every page of teams, read as one streamed query"""
+    per_page = CODE_COLUMNS * CODE_ROWS
+    count = tournament.teams.count()
+    pages = max(1, -(-count // per_page))
+    teams = (
+        tournament.teams.order_by('team_number', 'name')
+        .values_list('team_number', 'name', 'access_token')
+        .iterator(chunk_size=2000)
+    )
+    for i in range(pages):
+        chunk = [(number, name, str(token)) for number, name, token in itertools.islice(teams, per_page)]
+        yield (tournament.name, chunk, f"Access codes - page {i + 1} of {pages}")
+
+
+def round_jobs(tournament, kinds):
+    """``render_round`` arguments for every round, read as one streamed query"""
+    rounds = list(tournament.rounds.order_by('round_number').values_list('pk', 'round_number', 'start_time'))
+    matchups = (
+        Matchup.objects.filter(round__tournament=tournament)
+        .order_by('round__round_number', 'pk')
+        .values_list(
+            'round_id', 'game__name', 'team1__team_number', 'team1__name',
+            'team2__team_number', 'team2__name', 'is_bye', 'result',
+        )
+        .iterator(chunk_size=2000)
+    )
+    by_round = itertools.groupby(matchups, key=lambda row: row[0])
+    current = next(by_round, (None, iter(())))
+
+    for round_id, round_number, start_time in rounds:
+        rows = []
+        if current[0] == round_id:
+            rows = [row[1:] for row in current[1]]
+            current = next(by_round, (None, iter(())))
+        start = timezone.localtime(start_time).strftime('%a %b %d, %I:%M %p') if start_time else None
+        yield (tournament.name, kinds, round_number, start, rows)
+
+
+def _in_order(executor, function, jobs, window):
+    """``function(*job)`` for each job, at most ``window`` ahead, in order"""
+    if executor is None:
+        for job in jobs:
+            yield function(*job)
+        return
+
+    pending = collections.deque()
+    for job in jobs:
+        pending.append(executor.submit(function, *job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def tournament_pages(tournament, kinds=PRINTOUTS, executor=None, workers=1):
+    """Finished pages of the chosen printouts, rounds rendered on ``executor`` if given"""
+    if 'teams' in kinds:
+        teams = tournament.teams.order_by('team_number', 'name').values_list('team_number', 'name')
+        yield from render_team_list(tournament.name, list(teams))
+
+    window = max(1, workers) * WINDOW_PER_WORKER
+    if 'codes' in kinds:
+        for pages in _in_order(executor, render_code_page, code_jobs(tournament), window):
+            yield from pages
+
+    if 'grids' in kinds or 'sheets' in kinds:
+        for pages in _in_order(executor, render_round, round_jobs(tournament, kinds), window):
+            yield from pages
+
+
+def pdf_response(tournament, kinds=PRINTOUTS, executor=None, workers=1):
+    """The printouts as a streamed PDF download"""
+    response = StreamingHttpResponse(
+        stream_pdf(tournament_pages(tournament, kinds, executor, workers)),
+        content_type='application/pdf'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{slugify(tournament.name) or "tournament"}-printouts.pdf"'
+    return response
@@ -0,0 +1,381 @@
+"""QR codes for team access tokens, cached on disk.
+
+A team's code carries ``team_access_url(token)``.  Codes are encoded here
+(byte mode, error correction level M, versions 1-10, which covers any
+URL we produce) and written as 1-bit PNGs, so printing a tournament's
+codes needs nothing outside the standard library and numpy.
+
+PNGs live in a content-addressed cache under ``QR_CACHE_DIR``: the file
+name is a digest of what the code says and its module size, so a file
+never changes once written and can be served with long-lived cache
+headers, and an entry is only orphaned, never stale, when a token or
+``SITE_URL`` changes.  ``generate_codes`` fills the cache for many teams
+at once on a process pool.
+"""
+import functools
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+import numpy as np
+from django.conf import settings
+
+from .team_api import TEAM_API_PREFIX
+
+# Pixels per module; the URL's ?size= is clamped to MIN_SIZE..MAX_SIZE
+DEFAULT_SIZE = 8
+MIN_SIZE = 1
+MAX_SIZE = 40
+
+# Light modules around the code, as the standard requires
+QUIET_ZONE = 4
+
+# Bumped whenever the rendering changes, so old cache entries are not reused
+RENDER_VERSION = 1
+
+# version -> (error correction codewords per block, [(blocks, data codewords per block), ...]) at level M
+_BLOCKS = {
+    1: (10, [(1, 16)]),
+    2: (16, [(1, 28)]),
+    3: (26, [(1, 44)]),
+    4: (18, [(2, 32)]),
+    5: (24, [(2, 43)]),
+    6: (16, [(4, 27)]),
+    7: (18, [(4, 31)]),
+    8: (22, [(2, 38), (2, 39)]),
+    9: (22, [(3, 36), (2, 37)]),
+    10: (26, [(4, 43), (1, 44)]),
+}
+_ALIGNMENT = {
+    1: [], 2: [6, 18], 3: [6, 22], 4: [6, 26], 5: [6, 30], 6: [6, 34],
+    7: [6, 22, 38], 8: [6, 24, 42], 9: [6, 26, 46], 10: [6, 28, 50],
+}
+_LEVEL_M = 0b00
+
+
+class QRError(ValueError):
+    """Data too long for the versions this encoder supports"""
+
+
+# Reed-Solomon arithmetic over GF(256) with the QR polynomial 0x11D
+
+_EXP = [0] * 512
+_LOG = [0] * 256
+_value = 1
+for _i in range(255):
+    _EXP[_i] = _value
+    _LOG[_value] = _i
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+for _i in range(255, 512):
+    _EXP[_i] = _EXP[_i - 255]
+
+
+def _generator(degree):
+    poly = [1]
+    for i in range(degree):
+        # Multiply by (x - a^i)
+        poly = [
+            (poly[j] if j < len(poly) else 0) ^ (_EXP[_LOG[poly[j - 1]] + i] if j and poly[j - 1] else 0)
+            for j in range(len(poly) + 1)
+        ]
+    return poly
+
+
+def _error_correction(data, degree):
+    generator = _generator(degree)
+    remainder = list(data) + [0] * degree
+    for i in range(len(data)):
+        factor = remainder[i]
+        if factor:
+            for j, coefficient in enumerate(generator):
+                if coefficient:
+                    remainder[i + j] ^= _EXP[_LOG[coefficient] + _LOG[factor]]
+    return remainder[len(data):]
+
+
+# Encoding
+
+def _capacity(version):
+    return sum(blocks * size for blocks, size in _BLOCKS[version][1])
+
+
+def _pick_version(length):
+    for version in _BLOCKS:
+        count_bits = 8 if version < 10 else 16
+        if 4 + count_bits + 8 * length <= 8 * _capacity(version):
+            return version
+    raise QRError(f"{length} bytes do not fit in a version {max(_BLOCKS)} code")
+
+
+def _data_codewords(data, version):
+    bits = '0100' + format(len(data), '08b' if version < 10 else '016b') + ''.join(format(b, '08b') for b in data)
+    capacity = 8 * _capacity(version)
+    bits += '0' * min(4, capacity - len(bits))
+    bits += '0' * (-len(bits) % 8)
+    codewords = [int(bits[i:i + 8], 2) for i in range(0, len(bits), 8)]
+    padding = [0xEC, 0x11]
+    codewords += [padding[i % 2] for i in range(capacity // 8 - len(codewords))]
+    return codewords
+
+
+def _interleave(codewords, version):
+    degree, groups = _BLOCKS[version]
+    blocks, position = [], 0
+    for count, size in groups:
+        for _ in range(count):
+            blocks.append(codewords[position:position + size])
+            position += size
+    ecc = [_error_correction(block, degree) for block in blocks]
+    result = [block[i] for i in range(max(map(len, blocks))) for block in blocks if i < len(block)]
+    result += [block[i] for i in range(degree) for block in ecc]
+    return result
+
+
+def _bch(value, generator, degree):
+    remainder = value << degree
+    for shift in range(remainder.bit_length() - 1, degree - 1, -1):
+        if remainder >> shift & 1:
+            remainder ^= generator << (shift - degree)
+    return value << degree | remainder
+
+
+class _Symbol:
+    """Module grid under construction; ``function`` marks the fixed patterns"""
+
+    def __init__(self, version):
+        self.version = version
+        self.size = 17 + 4 * version
+        self.dark = np.zeros((self.size, self.size), dtype=bool)
+        self.function = np.zeros((self.size, self.size), dtype=bool)
+        self._draw_function_patterns()
+
+    def set(self, row, col, dark):
+        self.dark[row, col] = dark
+        self.function[row, col] = True
+
+    def _draw_function_patterns(self):
+        size = self.size
+        for i in range(size):
+            self.set(6, i, i % 2 == 0)
+            self.set(i, 6, i % 2 == 0)
+        for row, col in ((3, 3), (3, size - 4), (size - 4, 3)):
+            for dr in range(-4, 5):
+                for dc in range(-4, 5):
+                    r, c = row + dr, col + dc
+                    if 0 <= r < size and 0 <= c < size:
+                        self.set(r, c, max(abs(dr), abs(dc)) not in (2, 4))
+        positions = _ALIGNMENT[self.version]
+        last = len(positions) - 1
+        for i, row in enumerate(positions):
+            for j, col in enumerate(positions):
+                if (i, j) in ((0, 0), (0, last), (last, 0)):
+                    continue
+                for dr in range(-2, 3):
+                    for dc in range(-2, 3):
+                        self.set(row + dr, col + dc, max(abs(dr), abs(dc)) != 1)
+        # Reserve the format areas; the real bits go in once the mask is chosen
+        self.draw_format(0)
+        if self.version >= 7:
+            bits = _bch(self.version, 0x1F25, 12)
+            for i in range(18):
+                dark = bool(bits >> i & 1)
+                self.set(i // 3, size - 11 + i % 3, dark)
+                self.set(size - 11 + i % 3, i // 3, dark)
+
+    def draw_format(self, mask):
+        size = self.size
+        bits = _bch(_LEVEL_M << 3 | mask, 0x537, 10) ^ 0x5412
+        bit = [bool(bits >> i & 1) for i in range(15)]
+        for i in range(6):
+            self.set(i, 8, bit[i])
+        self.set(7, 8, bit[6])
+        self.set(8, 8, bit[7])
+        self.set(8, 7, bit[8])
+        for i in range(9, 15):
+            self.set(8, 14 - i, bit[i])
+        for i in range(8):
+            self.set(8, size - 1 - i, bit[i])
+        for i in range(8, 15):
+            self.set(size - 15 + i, 8, bit[i])
+        self.set(size - 8, 8, True)
+
+    def place(self, codewords):
+        size = self.size
+        bits = [codeword >> (7 - i) & 1 for codeword in codewords for i in range(8)]
+        index = 0
+        right = size - 1
+        while right >= 1:
+            if right == 6:
+                right = 5
+            upward = (right + 1) & 2 == 0
+            for vertical in range(size):
+                row = size - 1 - vertical if upward else vertical
+                for col in (right, right - 1):
+                    if not self.function[row, col] and index < len(bits):
+                        self.dark[row, col] = bits[index]
+                        index += 1
+            right -= 2
+
+
+@functools.lru_cache(maxsize=None)
+def _mask_patterns(size):
+    rows, cols = np.indices((size, size))
+    return [
+        (rows + cols) % 2 == 0,
+        rows % 2 == 0,
+        cols % 3 == 0,
+        (rows + cols) % 3 == 0,
+        (rows // 2 + cols // 3) % 2 == 0,
+        (rows * cols) % 2 + (rows * cols) % 3 == 0,
+        ((rows * cols) % 2 + (rows * cols) % 3) % 2 == 0,
+        ((rows + cols) % 2 + (rows * cols) % 3) % 2 == 0,
+    ]
+
+
+_FINDER_LIKE = (
+    np.array([1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0], dtype=bool),
+    np.array([0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1], dtype=bool),
+)
+
+
+def _penalty(dark):
+    """Mask penalty score (rules N1-N4 of the standard)"""
+    score = 0
+    for lines in (dark, dark.T):
+        # Runs of five or more of the same colour; a separator column of 2
+        # keeps runs from continuing onto the next line
+        flat = np.pad(lines.astype(np.int8), ((0, 0), (0, 1)), constant_values=2).ravel()
+        changes = np.flatnonzero(np.diff(flat)) + 1
+        runs = np.diff(np.concatenate(([0], changes, [len(flat)])))
+        score += int(np.sum(runs[runs >= 5] - 2))
+        # Finder-like 1:1:3:1:1 patterns with four light modules beside them
+        windows = np.lib.stride_tricks.sliding_window_view(lines, 11, axis=1)
+        score += 40 * sum(int(np.all(windows == pattern, axis=2).sum()) for pattern in _FINDER_LIKE)
+    blocks = dark[:-1, :-1] == dark[1:, :-1]
+    blocks &= dark[:-1, :-1] == dark[:-1, 1:]
+    blocks &= dark[:-1, :-1] == dark[1:, 1:]
+    score += 3 * int(blocks.sum())
+    percent = dark.mean() * 100
+    score += 10 * int(abs(percent - 50) // 5)
+    return score
+
+
+def qr_matrix(text, mask=None):
+    """Boolean module matrix (True is dark) of a QR code for ``text``.
+
+    The mask pattern with the lowest penalty is used unless ``mask`` (0-7)
+    is given.
+    """
+    data = text.encode('utf-8')
+    version = _pick_version(len(data))
+    symbol = _Symbol(version)
+    symbol.place(_interleave(_data_codewords(data, version), version))
+
+    best = None
+    for mask in range(8) if mask is None else [mask]:
+        symbol.draw_format(mask)
+        masked = symbol.dark ^ (_mask_patterns(symbol.size)[mask] & ~symbol.function)
+        score = _penalty(masked)
+        if best is None or score < best[0]:
+            best = (score, mask, masked)
+    _, mask, masked = best
+    symbol.draw_format(mask)
+    # The format bits of the winning mask, over the masked data
+    masked[symbol.function] = symbol.dark[symbol.function]
+    return masked
+
+
+# PNG output
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def png_bytes(matrix, size=DEFAULT_SIZE):
+    """A 1-bit grayscale PNG of ``matrix`` with ``size`` pixels per module"""
+    light = ~np.pad(matrix, QUIET_ZONE, constant_values=False)
+    pixels = np.repeat(np.repeat(light, size, axis=0), size, axis=1)
+    height, width = pixels.shape
+    rows = np.packbits(pixels, axis=1)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows]).tobytes()
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0))
+        + _chunk(b'IDAT', zlib.compress(raw, 9))
+        + _chunk(b'IEND', b'')
+    )
+
+
+# Cache
+
+def team_access_url(token):
+    """What a team's QR code says: its matchup page on the team API"""
+    return f"{settings.SITE_URL.rstrip('/')}{TEAM_API_PREFIX}{token}/matchup/"
+
+
+def clamp_size(size):
+    return max(MIN_SIZE, min(MAX_SIZE, int(size)))
+
+
+def code_digest(token, size):
+    """Cache key of a code: digest of what it says and how it is drawn"""
+    key = f'{team_access_url(token)}\n{size}\n{RENDER_VERSION}'
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def cache_path(digest):
+    return Path(settings.QR_CACHE_DIR) / digest[:2] / f'{digest}.png'
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so readers never see a partial file
+    fd, temp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.replace(temp, path)
+
+
+def _render(text, size, path):
+    _write(Path(path), png_bytes(qr_matrix(text), size))
+    return path
+
+
+def cached_code(token, size=DEFAULT_SIZE):
+    """``(path, digest)`` of the team's PNG, rendering it on a cache miss"""
+    size = clamp_size(size)
+    digest = code_digest(token, size)
+    path = cache_path(digest)
+    if not path.exists():
+        _render(team_access_url(token), size, path)
+    return path, digest
+
+
+def generate_codes(tokens, size=DEFAULT_SIZE, workers=None):
+    """Render every missing code among ``tokens`` on a process pool.
+
+    Returns the number of codes rendered; cached ones are skipped.
+    """
+    size = clamp_size(size)
+    missing = []
+    for token in tokens:
+        path = cache_path(code_digest(token, size))
+        if not path.exists():
+            missing.append((team_access_url(token), size, str(path)))
+    if not missing:
+        return 0
+    if workers == 1 or len(missing) == 1:
+        for job in missing:
+            _render(*job)
+    else:
+        # Spawned workers (macOS, Windows) import this module and the models, so set Django up first
+        with ProcessPoolExecutor(workers, initializer=django.setup) as executor:
+            list(executor.map(_render, *zip(*missing), chunksize=16))
+    return len(missing)
@@ -0,0 +1,177 @@
+"""Batched result ingestion.
+
+Incoming winners are diffed against the stored results and only the
+matchups whose result actually changes are written, with one bulk UPDATE
+inside a single transaction.  Standings, the page cache version and the
+standings history are brought up to date in the same transaction, so a
+whole round commits in a handful of queries however many matchups it has.
+
+Team reports are decided in the database: a report sets the reporting
+team's column and, in the same UPDATE, compares it with the other team's
+column to settle the result or raise a conflict.  Two teams reporting at
+once therefore can never overwrite each other's report.
+
+Conflicts are resolved in batches the same way results are ingested: one
+read of the flagged matchups and one bulk UPDATE for all the decisions.
+"""
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Case, F, TextField, Value, When
+
+from .caching import bump_version
+from .history import invalidate_from_round
+from .models import Round, Matchup
+from .standings import apply_result_changes, record_result
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+UNKNOWN_MATCHUP = 'unknown_matchup'
+INVALID_WINNER = 'invalid_winner'
+NOT_IN_CONFLICT = 'not_in_conflict'
+
+CONFLICT_NOTE = "Teams reported different winners"
+
+
+def result_for_winner(matchup, winner_id):
+    """The result value for ``winner_id`` winning ``matchup``, or None if it did not play"""
+    if winner_id == matchup.team1_id:
+        return 'TEAM1_WIN'
+    if winner_id == matchup.team2_id and winner_id is not None:
+        return 'TEAM2_WIN'
+    return None
+
+
+def ingest_results(tournament, round_obj, winners):
+    """Record the winners of a round's matchups.
+
+    ``winners`` maps matchup ids to the winning team's id.  Returns a dict
+    of matchup id to outcome: ``updated``, ``unchanged``, ``unknown_matchup``
+    (not in this round) or ``invalid_winner`` (the team did not play it).
+    """
+    report = {}
+    with transaction.atomic():
+        matchups = {
+            matchup.pk: matchup for matchup in
+            Matchup.objects.select_for_update()
+            .filter(round=round_obj, pk__in=list(winners))
+            .only('pk', 'round_id', 'team1_id', 'team2_id', 'is_bye', 'result')
+        }
+
+        changed, changes = [], []
+        for matchup_id, winner_id in winners.items():
+            matchup = matchups.get(matchup_id)
+            if matchup is None:
+                report[matchup_id] = UNKNOWN_MATCHUP
+                continue
+            result = result_for_winner(matchup, winner_id)
+            if result is None:
+                report[matchup_id] = INVALID_WINNER
+            elif result == matchup.result:
+                report[matchup_id] = UNCHANGED
+            else:
+                changes.append((matchup.team1_id, matchup.team2_id, matchup.is_bye, matchup.result, result))
+                matchup.result = result
+                changed.append(matchup)
+                report[matchup_id] = UPDATED
+
+        if changed:
+            Matchup.objects.bulk_update(changed, ['result'])
+            apply_result_changes(tournament, changes)
+            invalidate_from_round(round_obj.pk)
+            bump_version(tournament.pk)
+
+    return report
+
+
+def report_winner(tournament, matchup_id, side, winner_id):
+    """Record one team's report of who won a matchup.
+
+    ``side`` is ``'team1'`` or ``'team2'``.  When the other team has already
+    reported, agreement sets the result and disagreement flags a conflict;
+    both are decided inside the UPDATE itself.  Returns the refreshed
+    Matchup, or None if ``winner_id`` did not play in it.
+    """
+    other = 'team2' if side == 'team1' else 'team1'
+    with transaction.atomic():
+        # Locks the row where the database supports it; SQLite serializes
+        # writers through IMMEDIATE transactions instead (see settings)
+        matchup = Matchup.objects.select_for_update().get(pk=matchup_id, round__tournament=tournament)
+        reporter_id = getattr(matchup, f'{side}_id')
+        if reporter_id is None or winner_id not in (matchup.team1_id, matchup.team2_id):
+            return None
+
+        old_result = matchup.result
+        claims_win = winner_id == reporter_id
+        winner = side if claims_win else other
+        other_report = f'{other}_reported_win'
+        Matchup.objects.filter(pk=matchup.pk).update(**{
+            f'{side}_reported_win': claims_win,
+            'result': Case(
+                When(**{other_report: not claims_win}, then=Value('TEAM1_WIN' if winner == 'team1' else 'TEAM2_WIN')),
+                default=F('result')
+            ),
+            'conflict_flag': Case(
+                When(**{other_report: claims_win}, then=Value(True)),
+                When(**{other_report: not claims_win}, then=Value(False)),
+                default=F('conflict_flag')
+            ),
+            'conflict_notes': Case(
+                When(**{other_report: claims_win}, then=Value(CONFLICT_NOTE)),
+                default=F('conflict_notes'),
+                output_field=TextField()
+            ),
+        })
+
+        matchup.refresh_from_db()
+        if matchup.result != old_result:
+            record_result(tournament, matchup, old_result)
+            invalidate_from_round(matchup.round_id)
+        bump_version(tournament.pk)
+
+    return matchup
+
+
+def resolve_conflicts(tournament, decisions):
+    """Settle flagged matchups by admin decision.
+
+    ``decisions`` maps matchup ids to ``'team1'`` or ``'team2'``, the side
+    the admin rules won.  Returns a dict of matchup id to outcome:
+    ``updated``, ``not_in_conflict`` (unknown or no longer flagged) or
+    ``invalid_winner``.
+    """
+    report = {}
+    note = f"Resolved by admin on {timezone.now()}"
+    with transaction.atomic():
+        matchups = {
+            matchup.pk: matchup for matchup in
+            Matchup.objects.select_for_update()
+            .filter(round__tournament=tournament, conflict_flag=True, pk__in=list(decisions))
+            .only('pk', 'round_id', 'team1_id', 'team2_id', 'is_bye', 'result', 'conflict_flag', 'conflict_notes')
+        }
+
+        resolved, changes = [], []
+        for matchup_id, side in decisions.items():
+            matchup = matchups.get(matchup_id)
+            if matchup is None:
+                report[matchup_id] = NOT_IN_CONFLICT
+                continue
+            if side not in ('team1', 'team2') or getattr(matchup, f'{side}_id') is None:
+                report[matchup_id] = INVALID_WINNER
+                continue
+            result = 'TEAM1_WIN' if side == 'team1' else 'TEAM2_WIN'
+            changes.append((matchup.team1_id, matchup.team2_id, matchup.is_bye, matchup.result, result))
+            matchup.result = result
+            matchup.conflict_flag = False
+            matchup.conflict_notes = note
+            resolved.append(matchup)
+            report[matchup_id] = UPDATED
+
+        if resolved:
+            Matchup.objects.bulk_update(resolved, ['result', 'conflict_flag', 'conflict_notes'])
+            apply_result_changes(tournament, changes)
+            # Snapshots from the earliest affected round on are stale
+            rounds = Round.objects.filter(pk__in={matchup.round_id for matchup in resolved})
+            invalidate_from_round(rounds.order_by('round_number').values_list('pk', flat=True).first())
+            bump_version(tournament.pk)
+
+    return report
@@ -0,0 +1,91 @@
+"""Closed-form lookups for the round-robin circle method.
+
+Teams are identified by their team number (1..num_teams).  Team 1 stays
+fixed and every other team moves one position per round, so the seat of
+any team in any round follows from modular arithmetic and each lookup is
+O(1).  With an odd number of teams a phantom team ``num_teams + 1`` is
+added and whoever meets it has the bye.
+"""
+
+
+def num_rounds(num_teams):
+    """Number of rounds needed for every team to meet every other team once"""
+    return num_teams - 1 if num_teams % 2 == 0 else num_teams
+
+
+def _check(team_number, round_number, num_teams):
+    if not 1 <= round_number <= num_rounds(num_teams):
+        raise ValueError(f"Round {round_number} is outside 1..{num_rounds(num_teams)}")
+    if team_number is not None and not 1 <= team_number <= num_teams:
+        raise ValueError(f"Team number {team_number} is outside 1..{num_teams}")
+
+
+def _seat(team_number, round_number, size):
+    """Rotating seat of a team, or None for the fixed team"""
+    if team_number == 1:
+        return None
+    return (team_number - 2 + round_number - 1) % (size - 1)
+
+
+def _team_at(seat, round_number, size):
+    """Team number sitting in a rotating seat"""
+    return (seat - (round_number - 1)) % (size - 1) + 2
+
+
+def _partner(team_number, round_number, size):
+    seat = _seat(team_number, round_number, size)
+    if seat == 0:
+        return 1
+    if seat is None:
+        return _team_at(0, round_number, size)
+    return _team_at(size - 1 - seat, round_number, size)
+
+
+def opponent(team_number, round_number, num_teams):
+    """Team number of the opponent in a round, or None when the team has a bye"""
+    _check(team_number, round_number, num_teams)
+    size = num_teams + num_teams % 2
+    partner = _partner(team_number, round_number, size)
+    return None if partner > num_teams else partner
+
+
+def bye_team(round_number, num_teams):
+    """Team number sitting out a round, or None when the team count is even"""
+    _check(None, round_number, num_teams)
+    if num_teams % 2 == 0:
+        return None
+    return _partner(num_teams + 1, round_number, num_teams + 1)
+
+
+def slot(team_number, round_number, num_teams):
+    """Position of the team's matchup within the round (0-based)"""
+    _check(team_number, round_number, num_teams)
+    size = num_teams + num_teams % 2
+    seat = _seat(team_number, round_number, size)
+    if not seat:
+        return 0
+    return min(seat, size - 1 - seat)
+
+
+def game_index(team_number, round_number, num_teams, num_games):
+    """Index into the ordered game list for the team's matchup in a round"""
+    return slot(team_number, round_number, num_teams) % num_games
+
+
+def round_pairings(round_number, num_teams):
+    """All pairings of a round in slot order.
+
+    Returns a list of ``(team_number, opponent_number)`` tuples where the
+    opponent is None for a bye; the bye team is always listed first.
+    """
+    _check(None, round_number, num_teams)
+    size = num_teams + num_teams % 2
+    pairs = [(1, _team_at(0, round_number, size))]
+    pairs.extend(
+        (_team_at(seat, round_number, size), _team_at(size - 1 - seat, round_number, size))
+        for seat in range(1, size // 2)
+    )
+    return [
+        (team2, None) if team1 > num_teams else (team1, None if team2 > num_teams else team2)
+        for team1, team2 in pairs
+    ]
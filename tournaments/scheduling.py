@@ -0,0 +1,313 @@
+"""Round-robin schedule construction.
+
+A schedule is computed in memory as a plan of plain ids and then written
+with bulk inserts, so generating every round costs a couple of INSERT
+batches instead of one query per matchup.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import Team, Round, Matchup
+from .round_robin import num_rounds, round_pairings
+
+# Seconds the balancing pass may spend before falling back to rotation
+ASSIGNMENT_TIME_BUDGET = 2.0
+
+_UNLIMITED = float('inf')
+
+
+class ScheduleError(Exception):
+    """Raised when a schedule cannot be built from the given teams and games"""
+
+
+class GameAssigner:
+    """Assign each round's matchups to game stations.
+
+    A game hosts at most ``capacity`` matchups per round (None for
+    unlimited).  Within those limits every matchup goes to the game its two
+    teams have played least, ties going to the least busy station, so each
+    team's exposure evens out over the tournament.  Once ``time_budget``
+    seconds have been spent the remaining rounds use a cheap rotation that
+    still respects capacity: a pair gets the game of its slot.  In
+    ``round_robin`` slot order every team moves through the slots as the
+    rounds go by, so the rotation keeps exposure even; only the first slot,
+    where team 1 always sits, rotates with the round number instead.  Byes
+    are given a game but use no capacity.
+    """
+
+    def __init__(self, game_ids, capacities=None, time_budget=ASSIGNMENT_TIME_BUDGET):
+        if not game_ids:
+            raise ScheduleError("At least one game is required")
+        self.game_ids = list(game_ids)
+        self._columns = {game_id: i for i, game_id in enumerate(self.game_ids)}
+        capacities = capacities or [None] * len(self.game_ids)
+        self.capacities = [_UNLIMITED if c is None else c for c in capacities]
+        self.time_budget = time_budget
+        self.exposure = {}
+        self._spent = 0.0
+
+    def _exposure(self, team_id):
+        counts = self.exposure.get(team_id)
+        if counts is None:
+            counts = self.exposure[team_id] = [0] * len(self.game_ids)
+        return counts
+
+    def record(self, team1_id, team2_id, game_id):
+        """Count an already scheduled matchup towards both teams' exposure"""
+        if game_id not in self._columns:
+            return
+        index = self._columns[game_id]
+        self._exposure(team1_id)[index] += 1
+        self._exposure(team2_id)[index] += 1
+
+    def assign_round(self, pairs, round_number=1):
+        """Return ``(team1_id, team2_id, game_id)`` tuples for a round's pairs"""
+        started = time.perf_counter()
+        balanced = self.time_budget is None or self._spent < self.time_budget
+        matches = sum(1 for _, team2 in pairs if team2 is not None)
+        if matches > sum(self.capacities):
+            raise ScheduleError(
+                f"Round {round_number} has {matches} matchups but the games can only host {sum(self.capacities)}"
+            )
+
+        num_games = len(self.game_ids)
+        load = [0] * num_games
+        assigned = []
+        for slot, (team1, team2) in enumerate(pairs):
+            first = self._exposure(team1)
+            if team2 is None:
+                index = first.index(min(first))
+                assigned.append((team1, None, self.game_ids[index]))
+                continue
+
+            second = self._exposure(team2)
+            if balanced:
+                # Exposure dominates, current station load breaks ties
+                keys = [
+                    (a + b) * len(pairs) + used if used < cap else _UNLIMITED
+                    for a, b, used, cap in zip(first, second, load, self.capacities)
+                ]
+                index = keys.index(min(keys))
+            else:
+                index = (slot or round_number) % num_games
+                while load[index] >= self.capacities[index]:
+                    index = (index + 1) % num_games
+
+            load[index] += 1
+            first[index] += 1
+            second[index] += 1
+            assigned.append((team1, team2, self.game_ids[index]))
+
+        self._spent += time.perf_counter() - started
+        return assigned
+
+
+def tournament_assigner(tournament):
+    """A ``GameAssigner`` for the tournament's games that knows every matchup scheduled so far"""
+    games = list(tournament.games.order_by('pk').values_list('pk', 'capacity'))
+    assigner = GameAssigner([pk for pk, _ in games], [capacity for _, capacity in games])
+    scheduled = Matchup.objects.filter(
+        round__tournament=tournament, is_bye=False, team1__isnull=False, team2__isnull=False
+    ).values_list('team1_id', 'team2_id', 'game_id')
+    for team1_id, team2_id, game_id in scheduled.iterator(chunk_size=2000):
+        assigner.record(team1_id, team2_id, game_id)
+    return assigner
+
+
+def exposure_spread(plan):
+    """Balance metric for a plan: mean and worst per-team game spread.
+
+    A team's spread is how many more times it plays its most frequent game
+    than its least frequent one; 0 or 1 means perfectly balanced.
+    """
+    game_ids = sorted({game_id for round_plan in plan for _, _, game_id in round_plan})
+    column = {game_id: i for i, game_id in enumerate(game_ids)}
+    counts = {}
+    for round_plan in plan:
+        for team1, team2, game_id in round_plan:
+            if team2 is None:
+                continue
+            for team in (team1, team2):
+                counts.setdefault(team, [0] * len(game_ids))[column[game_id]] += 1
+    spreads = [max(c) - min(c) for c in counts.values()] or [0]
+    return sum(spreads) / len(spreads), max(spreads)
+
+
+def build_round_robin_plan(team_ids, game_ids, capacities=None, time_budget=ASSIGNMENT_TIME_BUDGET):
+    """Return the full round-robin plan for the given teams and games.
+
+    ``team_ids`` must be ordered by team number and ``capacities`` lines up
+    with ``game_ids``.  The plan is a list of rounds; each round is a list of
+    ``(team1_id, team2_id, game_id)`` tuples where ``team2_id`` is None for a
+    bye.  Pairings come from the closed-form circle method in ``round_robin``
+    and games from ``GameAssigner``.
+    """
+    teams = list(team_ids)
+    assigner = GameAssigner(game_ids, capacities, time_budget)
+    return [
+        build_round_plan(teams, assigner, round_number)
+        for round_number in range(1, num_rounds(len(teams)) + 1)
+    ]
+
+
+def build_round_plan(teams, assigner, round_number):
+    """Return the ``(team1_id, team2_id, game_id)`` tuples for a single round"""
+    pairs = [
+        (teams[team1 - 1], teams[team2 - 1] if team2 else None)
+        for team1, team2 in round_pairings(round_number, len(teams))
+    ]
+    return assigner.assign_round(pairs, round_number)
+
+
+def assign_team_numbers(teams):
+    """Number teams 1..n in list order, saving only the ones that changed.
+
+    Team numbers must match list positions for the closed-form lookups in
+    ``round_robin``.
+    """
+    renumbered = []
+    for number, team in enumerate(teams, start=1):
+        if team.team_number != number:
+            team.team_number = number
+            renumbered.append(team)
+    Team.objects.bulk_update(renumbered, ['team_number'])
+
+
+def persist_plan(tournament, plan):
+    """Write a plan as Rounds and Matchups in a single transaction.
+
+    The first round is marked current.  Returns the created Round objects.
+    """
+    with transaction.atomic():
+        rounds = Round.objects.bulk_create([
+            Round(
+                tournament=tournament,
+                round_number=index + 1,
+                start_time=timezone.now() if index == 0 else None,
+                is_current=(index == 0),
+            )
+            for index in range(len(plan))
+        ])
+
+        Matchup.objects.bulk_create([
+            Matchup(
+                round=round_obj,
+                game_id=game_id,
+                team1_id=team1_id,
+                team2_id=team2_id,
+                is_bye=team2_id is None,
+            )
+            for round_obj, round_plan in zip(rounds, plan)
+            for team1_id, team2_id, game_id in round_plan
+        ])
+        bump_version(tournament.pk)
+
+    return rounds
+
+
+def _unplayed_rounds(tournament):
+    """Rounds after the current one; every round if none has started"""
+    rounds = tournament.rounds.all()
+    current = tournament.current_round()
+    if current:
+        rounds = rounds.filter(round_number__gt=current.round_number)
+    return list(rounds.values_list('pk', flat=True))
+
+
+def drop_team_from_schedule(team):
+    """Delete a team and repair the rounds that have not been played yet.
+
+    In unplayed rounds the team's opponents get byes, and byes in the same
+    round are paired up when those teams never meet elsewhere.  Played
+    rounds are left alone: the team is detached from their matchups so the
+    delete does not cascade away its opponents' results.  Returns the number
+    of matchups rewritten.
+
+    A detached matchup keeps ``is_bye=False`` and its result, so the
+    remaining team keeps the win or loss it earned: standings, history and
+    Swiss records count it like any other result, while head-to-head,
+    Buchholz, wager scoring and game exposure skip it for want of an
+    opponent.  The team's own byes, played or not, are deleted with it.
+    """
+    with transaction.atomic():
+        unplayed = _unplayed_rounds(team.tournament)
+        matchups = Matchup.objects.filter(Q(team1=team) | Q(team2=team), is_bye=False)
+
+        Matchup.objects.filter(team1=team, is_bye=False).exclude(round_id__in=unplayed).update(team1=None)
+        Matchup.objects.filter(team2=team, is_bye=False).exclude(round_id__in=unplayed).update(team2=None)
+
+        # Opponents in unplayed rounds are moved to a bye
+        changed = {}
+        for matchup in matchups.filter(round_id__in=unplayed):
+            opponent = matchup.team2_id if matchup.team1_id == team.pk else matchup.team1_id
+            matchup.team1_id, matchup.team2_id, matchup.is_bye = opponent, None, True
+            changed[matchup.pk] = matchup
+
+        # Pair up byes in the same round when the two teams never meet
+        met = set(
+            frozenset(pair) for pair in
+            Matchup.objects.filter(round__tournament=team.tournament, is_bye=False)
+            .exclude(pk__in=changed).values_list('team1_id', 'team2_id')
+        )
+        byes = {}
+        for matchup in Matchup.objects.filter(round_id__in=unplayed, is_bye=True).exclude(team1=team).exclude(pk__in=changed):
+            byes.setdefault(matchup.round_id, []).append(matchup)
+        for matchup in changed.values():
+            byes.setdefault(matchup.round_id, []).append(matchup)
+
+        removed = []
+        for round_byes in byes.values():
+            while len(round_byes) > 1:
+                first = round_byes.pop(0)
+                partner = next((m for m in round_byes if frozenset((first.team1_id, m.team1_id)) not in met), None)
+                if partner is None:
+                    continue
+                round_byes.remove(partner)
+                met.add(frozenset((first.team1_id, partner.team1_id)))
+                first.team2_id, first.is_bye = partner.team1_id, False
+                changed[first.pk] = first
+                changed.pop(partner.pk, None)
+                removed.append(partner.pk)
+
+        Matchup.objects.filter(pk__in=removed).delete()
+        Matchup.objects.bulk_update(changed.values(), ['team1', 'team2', 'is_bye'])
+        team.delete()
+
+    return len(changed) + len(removed)
+
+
+def add_team_to_schedule(team):
+    """Fit a newly added team into the rounds that have not been played yet.
+
+    The team gets the next team number, takes over an existing bye in each
+    unplayed round where there is one and otherwise gets a bye of its own.
+    Returns the number of matchups written.
+    """
+    tournament = team.tournament
+    with transaction.atomic():
+        team.team_number = (tournament.teams.exclude(pk=team.pk).aggregate(Max('team_number'))['team_number__max'] or 0) + 1
+        team.save(update_fields=['team_number'])
+
+        unplayed = _unplayed_rounds(tournament)
+        byes = {}
+        for matchup in Matchup.objects.filter(round_id__in=unplayed, is_bye=True).order_by('pk'):
+            byes.setdefault(matchup.round_id, matchup)
+
+        first_game = tournament.games.order_by('pk').values_list('pk', flat=True).first()
+        filled, created = [], []
+        for round_id in unplayed:
+            if round_id in byes:
+                matchup = byes[round_id]
+                matchup.team2_id, matchup.is_bye = team.pk, False
+                filled.append(matchup)
+            elif first_game is not None:
+                created.append(Matchup(round_id=round_id, game_id=first_game, team1=team, is_bye=True))
+
+        Matchup.objects.bulk_update(filled, ['team2', 'is_bye'])
+        Matchup.objects.bulk_create(created)
+
+    return len(filled) + len(created)
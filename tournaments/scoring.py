@@ -0,0 +1,89 @@
+"""Wager-weighted scoring.
+
+Before the event each team spreads 100 wager points across the games.  A
+team's wager-weighted score is built from the points it wagered on the
+games of its decided matchups, under the tournament's scoring rule:
+
+``WINS_ONLY``
+    the points wagered on each game the team won
+``WIN_LOSS``
+    the same, minus the points wagered on each game the team lost
+
+Every decided matchup is read together with both teams' wagers on its game
+in one query, and the scores for the whole tournament are two weighted
+bincounts over those rows.
+"""
+import numpy as np
+from django.db.models import IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Tournament, Matchup, Wager
+
+# rule -> (multiplier for points wagered on a win, multiplier on a loss)
+SCORING_RULES = {
+    Tournament.WINS_ONLY: (1, 0),
+    Tournament.WIN_LOSS: (1, -1),
+}
+
+
+def _wager_on_game(team_field):
+    points = Wager.objects.filter(team=OuterRef(team_field), game=OuterRef('game')).values('points')[:1]
+    return Coalesce(Subquery(points, output_field=IntegerField()), Value(0))
+
+
+def decided_matchups(tournament, through_round=None):
+    """``(team1_id, team2_id, team1_won, team1_points, team2_points)`` rows.
+
+    One row per decided matchup between two teams, with the points each
+    team wagered on the matchup's game (0 when it placed no wager).  With
+    ``through_round`` only rounds up to that number are included.
+    """
+    matchups = Matchup.objects.filter(
+        round__tournament=tournament, is_bye=False, team1__isnull=False, team2__isnull=False
+    ).exclude(result='PENDING')
+    if through_round is not None:
+        matchups = matchups.filter(round__round_number__lte=through_round)
+    return (
+        matchups
+        .annotate(team1_points=_wager_on_game('team1'), team2_points=_wager_on_game('team2'))
+        .values_list('team1_id', 'team2_id', 'result', 'team1_points', 'team2_points')
+    )
+
+
+def matchup_arrays(rows, positions):
+    """Turn ``decided_matchups`` rows into winner/loser index and points arrays.
+
+    ``positions`` maps an array of team ids to their indices.  Returns
+    ``(winners, losers, winner_points, loser_points)``.
+    """
+    matchups = np.array(
+        [(t1, t2, result == 'TEAM1_WIN', p1, p2) for t1, t2, result, p1, p2 in rows],
+        dtype=np.int64
+    ).reshape(-1, 5)
+    team1, team2 = positions(matchups[:, 0]), positions(matchups[:, 1])
+    team1_won = matchups[:, 2] == 1
+    return (
+        np.where(team1_won, team1, team2),
+        np.where(team1_won, team2, team1),
+        np.where(team1_won, matchups[:, 3], matchups[:, 4]),
+        np.where(team1_won, matchups[:, 4], matchups[:, 3]),
+    )
+
+
+def compute_scores(num_teams, winners, losers, winner_points, loser_points, rule=Tournament.WINS_ONLY):
+    """Wager-weighted score per team index from matchup arrays"""
+    win, loss = SCORING_RULES[rule]
+    scores = win * np.bincount(winners, weights=winner_points, minlength=num_teams)
+    if loss:
+        scores += loss * np.bincount(losers, weights=loser_points, minlength=num_teams)
+    return scores.astype(np.int64)
+
+
+def tournament_scores(tournament, rule=None):
+    """Wager-weighted score of every team, as a dict of team id to score"""
+    team_ids = np.array(sorted(tournament.teams.values_list('pk', flat=True)), dtype=np.int64)
+    if not len(team_ids):
+        return {}
+    arrays = matchup_arrays(decided_matchups(tournament), lambda ids: np.searchsorted(team_ids, ids))
+    scores = compute_scores(len(team_ids), *arrays, rule=rule or tournament.scoring_rule)
+    return dict(zip(team_ids.tolist(), scores.tolist()))
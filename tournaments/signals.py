@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_version
+from .history import invalidate_from_round
+from .live import publish_notification
+from .standings import apply_result_changes, record_legacy_win, refresh_wager_points
+from .team_api import token_cache
+from .models import Tournament, Team, Game, Round, Matchup, Wager, Notification, TeamStanding
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=Round)
+@receiver(post_delete, sender=Team)
+@receiver(post_delete, sender=Game)
+def bump_for_tournament_row(sender, instance, **kwargs):
+    bump_version(instance.tournament_id)
+
+
+@receiver(post_delete, sender=Team)
+def forget_team_token(sender, instance, **kwargs):
+    token_cache.discard(instance.access_token)
+
+
+@receiver(post_save, sender=Tournament)
+def bump_for_tournament(sender, instance, created, **kwargs):
+    # Settings such as the scoring rule change how pages are computed
+    if not created:
+        bump_version(instance.pk)
+
+
+@receiver(pre_save, sender=Game)
+def remember_game_winner(sender, instance, update_fields=None, **kwargs):
+    # The winner as stored before this save, for track_game_winner
+    if update_fields is not None and 'winner' not in update_fields:
+        instance._stored_winner_id = instance.winner_id
+    else:
+        instance._stored_winner_id = instance.pk and Game.objects.filter(pk=instance.pk).values_list('winner_id', flat=True).first()
+
+
+@receiver(post_save, sender=Game)
+def track_game_winner(sender, instance, raw=False, **kwargs):
+    # Legacy wins count in the standings table like matchup wins do
+    if not raw:
+        record_legacy_win(instance.tournament_id, instance._stored_winner_id, instance.winner_id)
+
+
+@receiver(post_delete, sender=Game)
+def drop_game_winner(sender, instance, **kwargs):
+    record_legacy_win(instance.tournament_id, instance.winner_id, None)
+
+
+@receiver(post_save, sender=Matchup)
+def bump_for_matchup(sender, instance, **kwargs):
+    Tournament.objects.filter(rounds=instance.round_id).update(cache_version=F('cache_version') + 1)
+    invalidate_from_round(instance.round_id)
+
+
+RESULT_FIELDS = ('team1', 'team2', 'is_bye', 'result')
+
+
+@receiver(pre_save, sender=Matchup)
+def remember_matchup_result(sender, instance, update_fields=None, **kwargs):
+    # The result as stored before this save, for track_matchup_result
+    instance._stored_result = None
+    if instance.pk and (update_fields is None or set(RESULT_FIELDS) & set(update_fields)):
+        instance._stored_result = (
+            Matchup.objects.filter(pk=instance.pk).values_list('team1_id', 'team2_id', 'is_bye', 'result').first()
+        )
+
+
+@receiver(post_save, sender=Matchup)
+def track_matchup_result(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Results saved anywhere, the admin included, move the standings table;
+    # queryset updates and bulk writes apply their own deltas instead
+    if raw or update_fields is not None and not set(RESULT_FIELDS) & set(update_fields):
+        return
+    stored = instance._stored_result
+    current = (instance.team1_id, instance.team2_id, instance.is_bye, instance.result)
+    if stored == current or current[3] == 'PENDING' and (stored is None or stored[3] == 'PENDING'):
+        return
+
+    changes = [current[:3] + ('PENDING', current[3])]
+    if stored:
+        changes.append(stored[:3] + (stored[3], 'PENDING'))
+    apply_result_changes(Tournament.objects.get(rounds=instance.round_id), changes)
+
+
+@receiver(post_save, sender=Wager)
+def track_wager_points(sender, instance, raw=False, **kwargs):
+    # Bulk wager writes refresh the totals themselves
+    if not raw:
+        refresh_wager_points(Tournament.objects.get(teams=instance.team_id), [instance.team_id])
+
+
+@receiver(post_delete, sender=Wager)
+def drop_wager_points(sender, instance, **kwargs):
+    # Only touches an existing row, so deleting the team with its wagers
+    # does not bring its standing back
+    TeamStanding.objects.filter(team_id=instance.team_id).update(wager_points=F('wager_points') - instance.points)
+
+
+@receiver(post_save, sender=Wager)
+@receiver(post_delete, sender=Wager)
+def bump_for_wager(sender, instance, **kwargs):
+    Tournament.objects.filter(teams=instance.team_id).update(cache_version=F('cache_version') + 1)
+
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: publish_notification(instance))
@@ -0,0 +1,266 @@
+"""Tournament standings.
+
+Live standings are computed in the database: every count is a correlated
+subquery on an indexed foreign key, so the whole table comes back in one
+query no matter how many teams there are.
+
+The TeamStanding table holds the same numbers precomputed for pages that
+are read far more often than results change.  Result changes are applied
+to it as deltas in the same transaction: bulk writers call
+``apply_result_changes`` themselves, while a plain ``save()`` of a Matchup
+or Wager (the admin's, say) and wins set on the legacy ``Game.winner`` are
+caught by signals.  ``rebuild_standings`` / ``check_standings`` recompute
+it from the raw Matchups, for writes that bypass both.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .caching import bump_version
+from .models import Team, Game, Matchup, Wager, TeamStanding
+
+STAT_FIELDS = ('wins', 'losses', 'byes', 'games_played')
+
+
+def _count(queryset, team_field):
+    """Per-team row count of ``queryset`` as a subquery expression"""
+    counts = (
+        queryset.filter(**{team_field: OuterRef('pk')})
+        .order_by()
+        .values(team_field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def with_standings(queryset):
+    """Annotate a Team queryset with legacy_wins, matchup_wins, wins and wager_points"""
+    wager_points = (
+        Wager.objects.filter(team=OuterRef('pk'))
+        .order_by()
+        .values('team')
+        .annotate(total=Sum('points'))
+        .values('total')
+    )
+    return queryset.annotate(
+        legacy_wins=_count(Game.objects.all(), 'winner'),
+        matchup_wins=(
+            _count(Matchup.objects.filter(result='TEAM1_WIN'), 'team1')
+            + _count(Matchup.objects.filter(result='TEAM2_WIN'), 'team2')
+        ),
+        wager_points=Coalesce(Subquery(wager_points, output_field=IntegerField()), Value(0)),
+    ).annotate(wins=Coalesce('legacy_wins', 0) + Coalesce('matchup_wins', 0))
+
+
+def team_standings(tournament):
+    """Return the standings table for a tournament, best team first.
+
+    Each row is a dict with ``team``, ``wins``, ``legacy_wins`` and
+    ``wager_points``.  Ties on wins are broken by total wager points.
+    """
+    teams = with_standings(tournament.teams.all()).order_by('-wins', '-wager_points', 'team_number')
+    return [
+        {
+            'team': team,
+            'wins': team.wins,
+            'legacy_wins': team.legacy_wins,
+            'wager_points': team.wager_points,
+        }
+        for team in teams
+    ]
+
+
+def team_wins(team):
+    """Total wins for a single team, in one query"""
+    return with_standings(Team.objects.filter(pk=team.pk)).values_list('wins', flat=True).get()
+
+
+def result_contribution(team1_id, team2_id, is_bye, result):
+    """What one matchup result adds to each team's standing.
+
+    Returns a dict of team id to a ``(wins, losses, byes, games_played)``
+    tuple.  Pending matchups contribute nothing; a scored bye counts as a
+    bye and, like any TEAM1_WIN, as a win.
+    """
+    if result == 'PENDING' or team1_id is None and team2_id is None:
+        return {}
+    if is_bye:
+        return {team1_id: (int(result == 'TEAM1_WIN'), 0, 1, 0)}
+
+    winner, loser = (team1_id, team2_id) if result == 'TEAM1_WIN' else (team2_id, team1_id)
+    contribution = {}
+    if winner is not None:
+        contribution[winner] = (1, 0, 0, 1)
+    if loser is not None:
+        contribution[loser] = (0, 1, 0, 1)
+    return contribution
+
+
+def apply_result_changes(tournament, changes):
+    """Update TeamStanding rows for a batch of result changes.
+
+    ``changes`` is an iterable of ``(team1_id, team2_id, is_bye, old_result,
+    new_result)`` tuples.  Deltas are summed per team and teams sharing the
+    same delta are updated together with F() expressions, so a whole round
+    costs a handful of UPDATEs and concurrent writers cannot lose updates.
+    """
+    deltas = {}
+    for team1_id, team2_id, is_bye, old_result, new_result in changes:
+        if old_result == new_result:
+            continue
+        for team_id, stats in result_contribution(team1_id, team2_id, is_bye, new_result).items():
+            deltas.setdefault(team_id, Counter()).update(dict(zip(STAT_FIELDS, stats)))
+        for team_id, stats in result_contribution(team1_id, team2_id, is_bye, old_result).items():
+            deltas.setdefault(team_id, Counter()).subtract(dict(zip(STAT_FIELDS, stats)))
+
+    groups = {}
+    for team_id, delta in deltas.items():
+        key = tuple(delta[field] for field in STAT_FIELDS)
+        if any(key):
+            groups.setdefault(key, []).append(team_id)
+    if not groups:
+        return
+
+    with transaction.atomic():
+        ensure_standings(tournament, deltas)
+        for key, team_ids in groups.items():
+            TeamStanding.objects.filter(team_id__in=team_ids).update(**{
+                field: F(field) + amount for field, amount in zip(STAT_FIELDS, key) if amount
+            })
+
+
+def record_result(tournament, matchup, old_result):
+    """Apply a single matchup's result change to the standings table"""
+    apply_result_changes(
+        tournament,
+        [(matchup.team1_id, matchup.team2_id, matchup.is_bye, old_result, matchup.result)]
+    )
+
+
+def record_legacy_win(tournament_id, old_winner_id, new_winner_id):
+    """Move a win recorded on ``Game.winner`` from one team's standing to another's"""
+    if old_winner_id == new_winner_id:
+        return
+    with transaction.atomic():
+        if old_winner_id is not None:
+            TeamStanding.objects.filter(team_id=old_winner_id).update(wins=F('wins') - 1)
+        if new_winner_id is not None:
+            TeamStanding.objects.bulk_create(
+                [TeamStanding(team_id=new_winner_id, tournament_id=tournament_id)], ignore_conflicts=True
+            )
+            TeamStanding.objects.filter(team_id=new_winner_id).update(wins=F('wins') + 1)
+
+
+def refresh_wager_points(tournament, team_ids):
+    """Recompute the stored wager totals for the given teams"""
+    totals = (
+        Wager.objects.filter(team=OuterRef('team'))
+        .order_by()
+        .values('team')
+        .annotate(total=Sum('points'))
+        .values('total')
+    )
+    with transaction.atomic():
+        ensure_standings(tournament, team_ids)
+        TeamStanding.objects.filter(team_id__in=team_ids).update(
+            wager_points=Coalesce(Subquery(totals, output_field=IntegerField()), Value(0))
+        )
+
+
+def ensure_standings(tournament, team_ids):
+    """Create missing TeamStanding rows for the given teams"""
+    TeamStanding.objects.bulk_create(
+        [TeamStanding(team_id=team_id, tournament=tournament) for team_id in team_ids],
+        ignore_conflicts=True
+    )
+
+
+def compute_standings(tournament):
+    """Recompute every team's standing from the raw rows.
+
+    Returns a dict of team id to a dict of TeamStanding field values.
+    """
+    rows = {
+        team_id: dict.fromkeys(STAT_FIELDS + ('wager_points',), 0)
+        for team_id in tournament.teams.values_list('pk', flat=True)
+    }
+
+    results = Matchup.objects.filter(round__tournament=tournament).exclude(result='PENDING')
+    for team1_id, team2_id, is_bye, result in results.values_list('team1_id', 'team2_id', 'is_bye', 'result'):
+        for team_id, stats in result_contribution(team1_id, team2_id, is_bye, result).items():
+            if team_id in rows:
+                for field, amount in zip(STAT_FIELDS, stats):
+                    rows[team_id][field] += amount
+
+    # Wins recorded on games directly, from before matchups existed
+    legacy_wins = Game.objects.filter(winner__tournament=tournament).values('winner').annotate(total=Count('pk'))
+    for row in legacy_wins.values_list('winner', 'total'):
+        rows[row[0]]['wins'] += row[1]
+
+    wager_points = Wager.objects.filter(team__tournament=tournament).values('team').annotate(total=Sum('points'))
+    for team_id, total in wager_points.values_list('team', 'total'):
+        rows[team_id]['wager_points'] = total or 0
+
+    return rows
+
+
+def rebuild_standings(tournament):
+    """Replace the tournament's standings table with a full recompute"""
+    rows = compute_standings(tournament)
+    with transaction.atomic():
+        TeamStanding.objects.filter(tournament=tournament).delete()
+        TeamStanding.objects.bulk_create([
+            TeamStanding(team_id=team_id, tournament=tournament, **values)
+            for team_id, values in rows.items()
+        ])
+        bump_version(tournament.pk)
+
+
+def check_standings(tournament):
+    """Compare the standings table against a full recompute.
+
+    Returns a list of ``(team_id, field, stored, expected)`` mismatches; a
+    missing row counts as all zeros.
+    """
+    expected = compute_standings(tournament)
+    fields = STAT_FIELDS + ('wager_points',)
+    stored = {
+        row['team_id']: row
+        for row in TeamStanding.objects.filter(tournament=tournament).values('team_id', *fields)
+    }
+
+    mismatches = []
+    for team_id, values in expected.items():
+        row = stored.get(team_id, {})
+        for field in fields:
+            if row.get(field, 0) != values[field]:
+                mismatches.append((team_id, field, row.get(field, 0), values[field]))
+    return mismatches
+
+
+def materialized_standings(tournament):
+    """Standings read straight from the TeamStanding table, best team first.
+
+    Rows have the same shape as ``team_standings``; teams without a stored
+    row yet are listed with zeros.
+    """
+    teams = tournament.teams.select_related('standing').order_by(
+        F('standing__wins').desc(nulls_last=True),
+        F('standing__wager_points').desc(nulls_last=True),
+        'team_number'
+    )
+    table = []
+    for team in teams:
+        standing = getattr(team, 'standing', None) or TeamStanding(team=team, tournament=tournament)
+        table.append({
+            'team': team,
+            'wins': standing.wins,
+            'losses': standing.losses,
+            'byes': standing.byes,
+            'games_played': standing.games_played,
+            'wager_points': standing.wager_points,
+        })
+    return table
@@ -0,0 +1,109 @@
+"""Swiss-system pairing.
+
+Only the next round is generated, from the standings so far.  Teams are
+sorted by wins, a bye counting as a win, and paired top-down with the
+nearest team they have not met yet; when a team cannot be placed the
+previous pairings are undone one step at a time, up to a fixed number of
+backtracks, after which that team is allowed a rematch instead of
+searching further.
+"""
+import math
+
+from .models import Matchup
+from .scheduling import GameAssigner
+
+# Undo steps allowed per round before rematches are accepted
+MAX_BACKTRACKS = 200
+
+
+def default_round_count(num_teams):
+    """Rounds needed to separate a single unbeaten team"""
+    return max(1, math.ceil(math.log2(num_teams))) if num_teams > 1 else 0
+
+
+def pair_swiss(ranked, played, had_bye=(), max_backtracks=MAX_BACKTRACKS):
+    """Pair teams for one Swiss round.
+
+    ``ranked`` is the list of team ids best first, ``played`` a set of
+    ``frozenset({team1, team2})`` pairs already contested and ``had_bye`` the
+    teams that already sat out a round.  Returns ``(team1, team2)`` tuples in
+    rank order with ``(team, None)`` for the bye.
+    """
+    ranked = list(ranked)
+    bye = None
+    if len(ranked) % 2:
+        # The lowest ranked team without a previous bye sits out
+        bye = next((team for team in reversed(ranked) if team not in had_bye), ranked[-1])
+        ranked.remove(bye)
+
+    n = len(ranked)
+    used = [False] * n
+    stack = []
+    backtracks = 0
+    allow_rematch = False
+    i, start = 0, 1
+    while len(stack) < n // 2:
+        partner = None
+        for j in range(start, n):
+            if not used[j] and (allow_rematch or frozenset((ranked[i], ranked[j])) not in played):
+                partner = j
+                break
+
+        if partner is not None:
+            # A rematch is only allowed for the team that could not be placed
+            allow_rematch = False
+            used[i] = used[partner] = True
+            stack.append((i, partner))
+            while i < n and used[i]:
+                i += 1
+            start = i + 1
+        elif stack and backtracks < max_backtracks:
+            # Undo the last pairing and try its top team with a later partner
+            backtracks += 1
+            i, previous = stack.pop()
+            used[i] = used[previous] = False
+            start = previous + 1
+        else:
+            allow_rematch = True
+            start = i + 1
+
+    pairs = [(ranked[a], ranked[b]) for a, b in sorted(stack)]
+    if bye is not None:
+        pairs.append((bye, None))
+    return pairs
+
+
+def build_swiss_round(tournament, round_number):
+    """Return the ``(team1_id, team2_id, game_id)`` tuples for the next Swiss round"""
+    teams = list(tournament.teams.order_by('team_number', 'pk').values_list('pk', flat=True))
+    games = list(tournament.games.order_by('pk').values_list('pk', 'capacity'))
+    assigner = GameAssigner([pk for pk, _ in games], [capacity for _, capacity in games])
+
+    wins = dict.fromkeys(teams, 0)
+    played = set()
+    had_bye = set()
+    history = Matchup.objects.filter(round__tournament=tournament).values_list(
+        'team1_id', 'team2_id', 'game_id', 'is_bye', 'result'
+    )
+    for team1, team2, game_id, is_bye, result in history:
+        if is_bye:
+            # A bye counts as a win, scored or not, so the team is paired
+            # with the teams on the same record
+            had_bye.add(team1)
+            if team1 in wins:
+                wins[team1] += 1
+            continue
+
+        if result == 'TEAM1_WIN' and team1 in wins:
+            wins[team1] += 1
+        elif result == 'TEAM2_WIN' and team2 in wins:
+            wins[team2] += 1
+        # A dropped team leaves its played matchups with one side empty;
+        # the result still counts but there is no pairing to avoid
+        if team1 is not None and team2 is not None:
+            played.add(frozenset((team1, team2)))
+            assigner.record(team1, team2, game_id)
+
+    # sorted() is stable, so equal records stay in team number order
+    ranked = sorted(teams, key=lambda team: -wins[team])
+    return assigner.assign_round(pair_swiss(ranked, played, had_bye), round_number)
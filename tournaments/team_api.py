@@ -0,0 +1,299 @@
+"""Slim JSON API for team phones.
+
+Teams reach the app by scanning their QR code, which carries
+``Team.access_token``.  Requests under ``TEAM_API_PREFIX`` are answered by
+``TeamAPIMiddleware`` before sessions, authentication, CSRF and messages
+run: the token in the URL is the only credential, it is resolved through a
+small in-process cache, and responses are compact JSON.  The matchup
+poll, by far the most frequent request, is served from a per-process board
+of pre-encoded responses that is rebuilt only when the tournament's
+``cache_version`` moves.
+
+    GET  <prefix><token>/matchup/       the team's matchup in the current round
+    POST <prefix><token>/report/        {"winner": <team id>, "matchup": <id, optional>}
+    GET  <prefix><token>/wagers/        the team's wagers per game
+    POST <prefix><token>/wagers/        {"wagers": {"<game id>": <points>, ...}}
+    GET  <prefix><token>/notifications/ the team's unread notifications and count
+    POST <prefix><token>/read/          {"notifications": [<id>, ...]} or {"all": true}
+    GET  <prefix><token>/feed/          the team's notifications, keyset paginated (see feed.py)
+    GET  <prefix><token>/events/        the team's notifications as Server-Sent Events
+"""
+import json
+import threading
+import time
+import uuid
+
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+
+from .feed import FeedError, feed_arguments, feed_sources, notification_feed
+from .inbox import mark_all_read, mark_read, unread_count, unread_notifications
+from .live import event_stream, notification_payload
+from .models import Tournament, Team, Game, Matchup, Wager
+from .results import report_winner
+from .wagers import save_wagers, wager_errors
+
+TEAM_API_PREFIX = '/team-api/'
+
+# Seconds a resolved token stays cached
+TOKEN_CACHE_TIMEOUT = 5 * 60
+
+
+class TokenCache:
+    """Thread-safe map of access token to ``(team_id, tournament_id)``"""
+
+    def __init__(self, timeout=TOKEN_CACHE_TIMEOUT):
+        self.timeout = timeout
+        self._teams = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, token):
+        """Resolve a token, hitting the database only on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._teams.get(token)
+        if entry and entry[2] > now:
+            return entry[:2]
+
+        ids = Team.objects.filter(access_token=token).values_list('pk', 'tournament_id').first()
+        if ids is None:
+            return None
+        with self._lock:
+            self._teams[token] = (*ids, now + self.timeout)
+        return ids
+
+    def discard(self, token):
+        with self._lock:
+            self._teams.pop(str(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._teams.clear()
+
+
+token_cache = TokenCache()
+
+
+class BoardCache:
+    """Per-process current-round board of each tournament.
+
+    A board maps team id to its encoded matchup response and is reused for
+    as long as the tournament's ``cache_version`` is unchanged, so a poll
+    costs one primary-key lookup.
+    """
+
+    def __init__(self):
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def get(self, tournament_id):
+        version = Tournament.objects.filter(pk=tournament_id).values_list('cache_version', flat=True).first()
+        with self._lock:
+            entry = self._boards.get(tournament_id)
+        if entry and entry[0] == version:
+            return entry[1]
+
+        # Built after reading the version, so a concurrent write can only
+        # make the board newer than its tag and cause one extra rebuild
+        board = _build_board(tournament_id)
+        with self._lock:
+            self._boards[tournament_id] = (version, board)
+        return board
+
+    def clear(self):
+        with self._lock:
+            self._boards.clear()
+
+
+board_cache = BoardCache()
+
+
+def compact(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'separators': (',', ':')})
+
+
+def _encode(data):
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+NO_MATCHUP = _encode({'matchup': None})
+
+
+def _current_matchup(team_id, tournament_id):
+    return (
+        Matchup.objects.filter(round__tournament_id=tournament_id, round__is_current=True)
+        .filter(Q(team1_id=team_id) | Q(team2_id=team_id))
+        .values('pk', 'team1_id')
+        .first()
+    )
+
+
+def _build_board(tournament_id):
+    """Encoded matchup responses for every team playing the current round"""
+    rows = Matchup.objects.filter(round__tournament_id=tournament_id, round__is_current=True).values(
+        'pk', 'round__round_number', 'game_id', 'game__name', 'team1_id', 'team1__name',
+        'team2_id', 'team2__name', 'is_bye', 'result', 'conflict_flag',
+    )
+    board = {}
+    for row in rows:
+        for side, opponent in (('team1', 'team2'), ('team2', 'team1')):
+            if row[f'{side}_id'] is None:
+                continue
+            board[row[f'{side}_id']] = _encode({'matchup': {
+                'id': row['pk'],
+                'round': row['round__round_number'],
+                'game': {'id': row['game_id'], 'name': row['game__name']},
+                'opponent': None if row['is_bye'] else {'id': row[f'{opponent}_id'], 'name': row[f'{opponent}__name']},
+                'bye': row['is_bye'],
+                'result': row['result'],
+                'conflict': row['conflict_flag'],
+            }})
+    return board
+
+
+def matchup(request, team_id, tournament_id):
+    """The team's matchup in the current round"""
+    content = board_cache.get(tournament_id).get(team_id, NO_MATCHUP)
+    return HttpResponse(content, content_type='application/json')
+
+
+def report(request, team_id, tournament_id, body):
+    """Report the winner of the team's current (or given) matchup"""
+    try:
+        winner_id = int(body['winner'])
+        matchup_id = None if body.get('matchup') is None else int(body['matchup'])
+    except (KeyError, TypeError, ValueError):
+        return compact({'error': "Expected the winning team's id and an optional matchup id"}, status=400)
+
+    if matchup_id is not None:
+        # Only a matchup the team plays in, so no team can report for another
+        row = (
+            Matchup.objects.filter(pk=matchup_id, round__tournament_id=tournament_id)
+            .filter(Q(team1_id=team_id) | Q(team2_id=team_id))
+            .values('pk', 'team1_id')
+            .first()
+        )
+    else:
+        row = _current_matchup(team_id, tournament_id)
+    if row is None:
+        return compact({'error': "No matchup to report"}, status=404)
+
+    tournament = Tournament.objects.get(pk=tournament_id)
+    side = 'team1' if row['team1_id'] == team_id else 'team2'
+    result = report_winner(tournament, row['pk'], side, winner_id)
+    if result is None:
+        return compact({'error': "That team did not play in this matchup"}, status=400)
+    return compact({'matchup': result.pk, 'result': result.result, 'conflict': result.conflict_flag})
+
+
+def wagers(request, team_id, tournament_id, body=None):
+    """List the team's wagers, or replace them when ``body`` is given"""
+    games = list(Game.objects.filter(tournament_id=tournament_id).order_by('pk').values_list('pk', 'name'))
+    if body is not None:
+        try:
+            points = {int(game_id): int(value) for game_id, value in body['wagers'].items()}
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return compact({'error': "Expected points per game id"}, status=400)
+        errors = wager_errors(points, [pk for pk, _ in games])
+        if errors:
+            return compact({'error': '; '.join(errors)}, status=400)
+        points = {pk: points.get(pk, 0) for pk, _ in games}
+        save_wagers(Tournament.objects.get(pk=tournament_id), team_id, points)
+
+    stored = dict(Wager.objects.filter(team_id=team_id).values_list('game_id', 'points'))
+    return compact({
+        'wagers': [{'game': pk, 'name': name, 'points': stored.get(pk, 0)} for pk, name in games],
+        'total': sum(stored.values()),
+    })
+
+
+# Unread notifications returned per request, newest first
+INBOX_LIMIT = 50
+
+
+def _inbox(team):
+    unread = unread_notifications(team).order_by('-pk')[:INBOX_LIMIT]
+    return compact({
+        'unread': unread_count(team),
+        'notifications': [notification_payload(notification) for notification in unread],
+    })
+
+
+def notifications(request, team_id, tournament_id):
+    """The team's unread notifications, newest first, and how many there are"""
+    return _inbox(Team.objects.only('pk', 'tournament_id', 'notifications_read_through').get(pk=team_id))
+
+
+def read(request, team_id, tournament_id, body):
+    """Mark the given notifications, or all of them, read for the team"""
+    team = Team.objects.only('pk', 'tournament_id', 'notifications_read_through').get(pk=team_id)
+    if body.get('all'):
+        mark_all_read(team)
+        return _inbox(team)
+    try:
+        ids = [int(pk) for pk in body['notifications']]
+    except (KeyError, TypeError, ValueError):
+        return compact({'error': "Expected a list of notification ids"}, status=400)
+    mark_read(team, ids)
+    return _inbox(team)
+
+
+def feed(request, team_id, tournament_id):
+    """A page of the team's notifications; ``?since=<cursor>`` for new ones only"""
+    try:
+        return compact(notification_feed(feed_sources(tournament_id, team_id), **feed_arguments(request.GET)))
+    except FeedError as e:
+        return compact({'error': str(e)}, status=400)
+
+
+def events(request, team_id, tournament_id):
+    """Stream notifications for the team and for all teams"""
+    return event_stream(request, tournament_id, team_id)
+
+
+# action -> {method: (handler, takes_body)}
+ROUTES = {
+    'matchup': {'GET': (matchup, False)},
+    'report': {'POST': (report, True)},
+    'wagers': {'GET': (wagers, False), 'POST': (wagers, True)},
+    'notifications': {'GET': (notifications, False)},
+    'read': {'POST': (read, True)},
+    'feed': {'GET': (feed, False)},
+    'events': {'GET': (events, False)},
+}
+
+
+def resolve_token(token):
+    """``(team_id, tournament_id)`` for a token from a URL, or None"""
+    try:
+        token = str(uuid.UUID(token))
+    except ValueError:
+        return None
+    return token_cache.lookup(token)
+
+
+def dispatch(request):
+    """Answer a team API request; ``request.path`` starts with the prefix"""
+    parts = request.path[len(TEAM_API_PREFIX):].strip('/').split('/')
+    if len(parts) != 2 or parts[1] not in ROUTES:
+        return compact({'error': "Not found"}, status=404)
+    token, action = parts
+
+    ids = resolve_token(token)
+    if ids is None:
+        return compact({'error': "Invalid token"}, status=403)
+
+    route = ROUTES[action].get(request.method)
+    if route is None:
+        return compact({'error': "Method not allowed"}, status=405)
+    handler, takes_body = route
+    if not takes_body:
+        return handler(request, *ids)
+
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return compact({'error': "Invalid JSON"}, status=400)
+    if not isinstance(body, dict):
+        return compact({'error': "Expected a JSON object"}, status=400)
+    return handler(request, *ids, body)
@@ -1,3 +1,1261 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import importlib
+import io
+import struct
+import tempfile
+import threading
+import unittest
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+import numpy as np
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+try:
+    import zxingcpp
+except ImportError:
+    zxingcpp = None
+
+from .broker import Broker, get_broker, tournament_channel
+from .caching import bump_version
+from .feed import feed_sources, notification_feed
+from .grids import grid_data
+from .history import movers, snapshot_round, standings_after
+from .inbox import mark_all_read, mark_read, unread_count, unread_notifications
+from .live import notification_events
+from .models import Tournament, Team, Game, Round, Matchup, Wager, Notification, NotificationReceipt, StandingSnapshot, TeamStanding
+from .plans import PlanCache, plan_cache
+from .printing import tournament_pages
+from .qr import QUIET_ZONE, _bch, _error_correction, cache_path, code_digest, generate_codes, png_bytes, qr_matrix
+from .results import CONFLICT_NOTE, ingest_results, report_winner, resolve_conflicts
+from .round_robin import bye_team, num_rounds, opponent, round_pairings, slot
+from .scheduling import (
+    GameAssigner, add_team_to_schedule, build_round_plan, build_round_robin_plan, drop_team_from_schedule,
+    exposure_spread, persist_plan,
+)
+from .scoring import tournament_scores
+from .standings import check_standings, materialized_standings, rebuild_standings, team_standings
+from .swiss import build_swiss_round, pair_swiss
+from .tiebreakers import apply_tiebreakers, compute_tiebreakers
+from .views import generate_matchups_for_round
+from .wagers import import_wagers, save_wagers, wager_errors
+
+
+class ScheduleBuilderTests(TestCase):
+    def test_every_pair_meets_once_and_the_bye_rotates(self):
+        user = User.objects.create_user('admin', password='pw')
+        self.client.force_login(user)
+        tournament = Tournament.objects.create(name="Round robin")
+        Game.objects.bulk_create([Game(tournament=tournament, name=f"Game {i}") for i in range(3)])
+        teams = Team.objects.bulk_create([
+            Team(tournament=tournament, name=f"Team {i}", members='') for i in range(7)
+        ])
+
+        # Generating twice replaces the schedule rather than adding to it
+        for _ in range(2):
+            response = self.client.post(reverse('generate_matchups', args=[tournament.pk]))
+            self.assertRedirects(response, reverse('review_entries', args=[tournament.pk]))
+
+        self.assertEqual(tournament.rounds.count(), 7)
+        matchups = Matchup.objects.filter(round__tournament=tournament)
+        pairs = [frozenset(pair) for pair in matchups.filter(is_bye=False).values_list('team1_id', 'team2_id')]
+        self.assertEqual(len(pairs), 21)
+        self.assertEqual(set(pairs), {frozenset((a.pk, b.pk)) for i, a in enumerate(teams) for b in teams[i + 1:]})
+        byes = sorted(matchups.filter(is_bye=True).values_list('team1_id', flat=True))
+        self.assertEqual(byes, sorted(team.pk for team in teams))
+        self.assertEqual(tournament.rounds.filter(is_current=True).get().round_number, 1)
+
+
+class RoundRobinTests(TestCase):
+    def test_lookups_agree_with_the_round_pairings(self):
+        for num_teams in (2, 6, 7):
+            met, byes = [], []
+            for round_number in range(1, num_rounds(num_teams) + 1):
+                pairings = round_pairings(round_number, num_teams)
+                for position, (team1, team2) in enumerate(pairings):
+                    if team2 is None:
+                        byes.append(team1)
+                        self.assertEqual(bye_team(round_number, num_teams), team1)
+                        self.assertIsNone(opponent(team1, round_number, num_teams))
+                        continue
+                    met.append(frozenset((team1, team2)))
+                    for team, other in ((team1, team2), (team2, team1)):
+                        self.assertEqual(opponent(team, round_number, num_teams), other)
+                        self.assertEqual(slot(team, round_number, num_teams), position)
+                if num_teams % 2 == 0:
+                    self.assertIsNone(bye_team(round_number, num_teams))
+
+            teams = range(1, num_teams + 1)
+            self.assertEqual(len(met), len(set(met)))
+            self.assertEqual(set(met), {frozenset((a, b)) for a in teams for b in teams if a < b})
+            self.assertEqual(sorted(byes), list(teams) if num_teams % 2 else [])
+
+    def test_out_of_range_lookups_are_rejected(self):
+        with self.assertRaises(ValueError):
+            opponent(1, 8, 7)
+        with self.assertRaises(ValueError):
+            opponent(8, 1, 7)
+        with self.assertRaises(ValueError):
+            round_pairings(0, 6)
+
+
+class GameAssignmentTests(TestCase):
+    def test_game_spread_stays_small_when_the_budget_runs_out(self):
+        teams, games = list(range(1, 42)), list(range(1, 7))
+        self.assertLessEqual(exposure_spread(build_round_robin_plan(teams, games, time_budget=None))[1], 2)
+        self.assertLessEqual(exposure_spread(build_round_robin_plan(teams, games, time_budget=0))[1], 4)
+
+        # Balanced for half the rounds, then the rotation
+        assigner = GameAssigner(games, time_budget=None)
+        plan = []
+        for round_number in range(1, num_rounds(len(teams)) + 1):
+            if round_number > num_rounds(len(teams)) // 2:
+                assigner.time_budget = 0
+            plan.append(build_round_plan(teams, assigner, round_number))
+        self.assertLessEqual(exposure_spread(plan)[1], 4)
+
+    def test_rounds_generated_one_at_a_time_keep_exposure_even(self):
+        tournament = Tournament.objects.create(name="One at a time")
+        Game.objects.bulk_create([Game(tournament=tournament, name=f"Game {i}") for i in range(4)])
+        Team.objects.bulk_create([
+            Team(tournament=tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, 9)
+        ])
+        for round_number in range(1, num_rounds(8) + 1):
+            round_obj = Round.objects.create(tournament=tournament, round_number=round_number)
+            generate_matchups_for_round(tournament, round_obj)
+
+        plan = [list(Matchup.objects.filter(round=round_obj).values_list('team1_id', 'team2_id', 'game_id'))
+                for round_obj in tournament.rounds.all()]
+        self.assertLessEqual(exposure_spread(plan)[1], 2)
+
+
+class SwissTests(TestCase):
+    def make_tournament(self, num_teams):
+        tournament = Tournament.objects.create(name="Swiss", format=Tournament.SWISS)
+        Game.objects.create(tournament=tournament, name="Cornhole")
+        teams = Team.objects.bulk_create([
+            Team(tournament=tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, num_teams + 1)
+        ])
+        return tournament, [team.pk for team in teams]
+
+    def play_round(self, tournament, round_number):
+        round_obj = Round.objects.create(tournament=tournament, round_number=round_number)
+        plan = build_swiss_round(tournament, round_number)
+        Matchup.objects.bulk_create([
+            Matchup(round=round_obj, game_id=game_id, team1_id=team1, team2_id=team2,
+                    is_bye=team2 is None, result='PENDING' if team2 is None else 'TEAM1_WIN')
+            for team1, team2, game_id in plan
+        ])
+        return [(team1, team2) for team1, team2, _ in plan]
+
+    def test_no_rematches_while_avoidable(self):
+        tournament, _ = self.make_tournament(10)
+        pairs = [frozenset(pair) for n in range(1, 5) for pair in self.play_round(tournament, n) if pair[1]]
+        self.assertEqual(len(pairs), len(set(pairs)))
+
+    def test_only_the_team_that_needs_a_rematch_gets_one(self):
+        a, b, c, d, e, f = 'ABCDEF'
+        played = {frozenset((a, other)) for other in 'BCDEF'} | {frozenset((c, d))}
+
+        pairs = pair_swiss([a, b, c, d, e, f], played, max_backtracks=0)
+
+        self.assertEqual(pairs, [(a, b), (c, e), (d, f)])
+
+    def test_bye_counts_as_a_win(self):
+        tournament, teams = self.make_tournament(7)
+        first = self.play_round(tournament, 1)
+        self.assertEqual(first[-1], (teams[6], None))
+
+        # Team 7 sits with the round 1 winners, not with the losers
+        self.assertIn((teams[4], teams[6]), self.play_round(tournament, 2))
+
+    def test_dropped_opponent_is_not_a_bye(self):
+        tournament, teams = self.make_tournament(8)
+        self.play_round(tournament, 1)
+        # Team 2 beat team 1 and then leaves; team 1 keeps its loss
+        Matchup.objects.filter(team1=teams[0], team2=teams[1]).update(result='TEAM2_WIN')
+        tournament.rounds.update(is_current=True)
+        drop_team_from_schedule(Team.objects.get(pk=teams[1]))
+
+        pairs = [(team1, team2) for team1, team2, _ in build_swiss_round(tournament, 2)]
+        self.assertEqual(pairs, [(teams[2], teams[4]), (teams[6], teams[0]), (teams[3], teams[5]), (teams[7], None)])
+
+
+class ScheduleRepairTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name="Repairs")
+        game = Game.objects.create(tournament=self.tournament, name="Cornhole")
+        self.teams = Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=name, members='', team_number=i)
+            for i, name in enumerate("ABCDE", start=1)
+        ])
+        a, b, c, d, e = (team.pk for team in self.teams)
+        self.rounds = persist_plan(self.tournament, [
+            [(a, b, game.pk), (c, d, game.pk), (e, None, game.pk)],
+            [(a, e, game.pk), (b, c, game.pk), (d, None, game.pk)],
+            [(a, d, game.pk), (b, e, game.pk), (c, None, game.pk)],
+        ])
+        Matchup.objects.filter(round=self.rounds[0], team1_id=a).update(result='TEAM1_WIN')
+        rebuild_standings(self.tournament)
+
+    def round_pairs(self, round_obj):
+        return {
+            (self.name(team1), self.name(team2))
+            for team1, team2 in Matchup.objects.filter(round=round_obj).values_list('team1_id', 'team2_id')
+        }
+
+    def name(self, team_id):
+        return Team.objects.get(pk=team_id).name if team_id else None
+
+    def test_dropped_team_leaves_byes_that_are_paired_when_possible(self):
+        drop_team_from_schedule(self.teams[0])
+
+        self.assertFalse(Team.objects.filter(pk=self.teams[0].pk).exists())
+        # The played round keeps B's result without A
+        self.assertEqual(self.round_pairs(self.rounds[0]), {(None, 'B'), ('C', 'D'), ('E', None)})
+        self.assertEqual(Matchup.objects.get(round=self.rounds[0], team2=self.teams[1]).result, 'TEAM1_WIN')
+        # D and E never meet, so their byes become a matchup
+        self.assertEqual(self.round_pairs(self.rounds[1]), {('D', 'E'), ('B', 'C')})
+        # C and D met in round 1, so both keep a bye
+        self.assertEqual(self.round_pairs(self.rounds[2]), {('D', None), ('B', 'E'), ('C', None)})
+        self.assertEqual(check_standings(self.tournament), [])
+
+    def test_detached_matchups_keep_their_result_everywhere(self):
+        # A beat B in the played round; B leaving must not turn A's win into a bye
+        drop_team_from_schedule(self.teams[1])
+        detached = Matchup.objects.get(round=self.rounds[0], team1=self.teams[0])
+
+        # Saving it again, as the admin does, must not either
+        detached.save()
+        detached.refresh_from_db()
+        self.assertEqual((detached.team2_id, detached.is_bye, detached.result), (None, False, 'TEAM1_WIN'))
+
+        standing = TeamStanding.objects.get(team=self.teams[0])
+        self.assertEqual((standing.wins, standing.losses, standing.byes), (1, 0, 0))
+        # wins, losses, byes, games played, rank
+        self.assertEqual(standings_after(self.tournament, 1)[str(self.teams[0].pk)][:4], [1, 0, 0, 1])
+        self.assertEqual(check_standings(self.tournament), [])
+
+    def test_dropped_team_takes_its_byes_with_it(self):
+        Matchup.objects.filter(round=self.rounds[0], is_bye=True).update(result='TEAM1_WIN')
+        rebuild_standings(self.tournament)
+        drop_team_from_schedule(self.teams[4])
+
+        self.assertFalse(Matchup.objects.filter(round=self.rounds[0], is_bye=True).exists())
+        self.assertEqual(self.round_pairs(self.rounds[0]), {('A', 'B'), ('C', 'D')})
+        self.assertEqual(check_standings(self.tournament), [])
+
+    def test_added_team_takes_over_a_bye_or_gets_its_own(self):
+        drop_team_from_schedule(self.teams[0])
+        team = Team.objects.create(tournament=self.tournament, name="F", members='')
+        add_team_to_schedule(team)
+
+        team.refresh_from_db()
+        self.assertEqual(team.team_number, 6)
+        self.assertEqual(self.round_pairs(self.rounds[0]), {(None, 'B'), ('C', 'D'), ('E', None)})
+        self.assertEqual(self.round_pairs(self.rounds[1]), {('D', 'E'), ('B', 'C'), ('F', None)})
+        self.assertEqual(self.round_pairs(self.rounds[2]), {('D', 'F'), ('B', 'E'), ('C', None)})
+
+
+class GenerateSchedulesTests(TransactionTestCase):
+    def make_tournament(self, name, num_teams):
+        tournament = Tournament.objects.create(name=name)
+        Game.objects.bulk_create([Game(tournament=tournament, name=f"Game {i}") for i in range(1, 3)])
+        Team.objects.bulk_create([Team(tournament=tournament, name=f"Team {i}", members='') for i in range(1, num_teams + 1)])
+        return tournament
+
+    def generate(self, *args):
+        call_command('generate_schedules', *args, '--workers', '2', stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_regenerating_replaces_the_schedule(self):
+        tournament = self.make_tournament("Division A", 6)
+        other = self.make_tournament("Division B", 4)
+        self.generate()
+        old_rounds = set(tournament.rounds.values_list('pk', flat=True))
+        old_matchups = set(Matchup.objects.filter(round__tournament=tournament).values_list('pk', flat=True))
+        untouched = list(Matchup.objects.filter(round__tournament=other).values_list('pk', 'team1_id', 'team2_id'))
+        Matchup.objects.filter(pk=min(old_matchups)).update(result='TEAM1_WIN')
+
+        # Without --replace a scheduled tournament is left alone
+        with self.assertRaises(CommandError):
+            self.generate(str(tournament.pk))
+
+        Team.objects.create(tournament=tournament, name="Team 7", members='')
+        self.generate(str(tournament.pk), '--replace')
+
+        rounds = list(tournament.rounds.order_by('round_number'))
+        self.assertEqual([r.round_number for r in rounds], list(range(1, num_rounds(7) + 1)))
+        self.assertEqual([r.is_current for r in rounds], [True] + [False] * (len(rounds) - 1))
+        self.assertFalse(old_rounds & {r.pk for r in rounds})
+        self.assertFalse(Matchup.objects.filter(pk__in=old_matchups).exists())
+
+        # Every team once per round and every pair exactly once: no duplicates
+        team_ids = set(tournament.teams.values_list('pk', flat=True))
+        pairs = []
+        for round_obj in rounds:
+            matchups = list(round_obj.matchups.values_list('team1_id', 'team2_id', 'is_bye', 'result'))
+            self.assertEqual(sorted(t for m in matchups for t in m[:2] if t), sorted(team_ids))
+            self.assertEqual([m[2] for m in matchups].count(True), 1)
+            self.assertEqual({m[3] for m in matchups}, {'PENDING'})
+            pairs += [frozenset(m[:2]) for m in matchups if not m[2]]
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertEqual(len(pairs), len(team_ids) * (len(team_ids) - 1) // 2)
+
+        self.assertEqual(
+            list(Matchup.objects.filter(round__tournament=other).values_list('pk', 'team1_id', 'team2_id')), untouched
+        )
+        self.assertEqual(Matchup.objects.count(), len(pairs) + len(rounds) + len(untouched))
+        self.assertEqual(check_standings(tournament), [])
+
+
+class SchedulePreviewTests(TestCase):
+    def setUp(self):
+        plan_cache.clear()
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        self.tournament = Tournament.objects.create(name="Preview")
+        Game.objects.bulk_create([Game(tournament=self.tournament, name=f"Game {i}") for i in range(2)])
+        Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, 6)
+        ])
+
+    def preview(self):
+        response = self.client.get(reverse('schedule_preview', args=[self.tournament.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_preview_is_cached_until_the_inputs_change(self):
+        first = self.preview()
+        second = self.preview()
+        self.assertEqual((first['cached'], second['cached']), (False, True))
+        self.assertEqual(first['plan_key'], second['plan_key'])
+        self.assertEqual(len(first['rounds']), 5)
+        self.assertFalse(self.tournament.rounds.exists())
+
+        Game.objects.create(tournament=self.tournament, name="Horseshoes")
+        third = self.preview()
+        self.assertFalse(third['cached'])
+        self.assertNotEqual(third['plan_key'], first['plan_key'])
+
+    def test_commit_writes_the_previewed_plan(self):
+        preview = self.preview()
+        self.client.post(reverse('generate_matchups', args=[self.tournament.pk]), {'plan_key': preview['plan_key']})
+
+        for round_data in preview['rounds']:
+            matchups = Matchup.objects.filter(round__tournament=self.tournament, round__round_number=round_data['round_number'])
+            self.assertEqual(
+                sorted(matchups.values_list('team1_id', 'team2_id', 'game_id'), key=str),
+                sorted(((m['team1'], m['team2'], m['game']) for m in round_data['matchups']), key=str),
+            )
+
+    def test_least_recently_used_plan_is_evicted(self):
+        cache = PlanCache(max_size=2)
+        cache.put('a', [1])
+        cache.put('b', [2])
+        cache.get('a')
+        cache.put('c', [3])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), ([1], [3]))
+
+
+class StandingsTests(TestCase):
+    def make_tournament(self, num_teams):
+        tournament = Tournament.objects.create(name=f"Standings {num_teams}")
+        game = Game.objects.create(tournament=tournament, name="Cornhole")
+        teams = Team.objects.bulk_create([
+            Team(tournament=tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, num_teams + 1)
+        ])
+        round_obj = Round.objects.create(tournament=tournament, round_number=1)
+        Matchup.objects.bulk_create([
+            Matchup(round=round_obj, game=game, team1=teams[i], team2=teams[i + 1], result='TEAM1_WIN')
+            for i in range(0, num_teams, 2)
+        ])
+        Wager.objects.bulk_create([Wager(team=team, game=game, points=team.team_number) for team in teams])
+        Game.objects.filter(pk=game.pk).update(winner=teams[0])
+        return tournament, teams
+
+    def test_standings_take_one_query_for_any_team_count(self):
+        for num_teams in (10, 100):
+            tournament, teams = self.make_tournament(num_teams)
+            with self.assertNumQueries(1):
+                standings = team_standings(tournament)
+
+            self.assertEqual(len(standings), num_teams)
+            self.assertEqual((standings[0]['team'], standings[0]['wins'], standings[0]['legacy_wins']), (teams[0], 2, 1))
+            # Ties on wins go to the team with more wager points
+            self.assertEqual([row['team'] for row in standings[1:3]], [teams[-2], teams[-4]])
+
+    def test_backfill_migration_matches_a_full_recompute(self):
+        tournament, teams = self.make_tournament(10)
+        Matchup.objects.filter(team1=teams[8]).update(team2=None, is_bye=True)
+        self.assertNotEqual(check_standings(tournament), [])
+
+        backfill = importlib.import_module('tournaments.migrations.0017_backfill_team_standings')
+        backfill.backfill_team_standings(apps, None)
+
+        self.assertEqual(check_standings(tournament), [])
+
+    def test_legacy_game_winner_keeps_the_table_in_step(self):
+        tournament, teams = self.make_tournament(4)
+        game = Game.objects.create(tournament=tournament, name="Horseshoes")
+        rebuild_standings(tournament)
+
+        game.team1, game.team2 = teams[1], teams[2]
+        game.score_team1, game.score_team2 = 21, 15
+        game.determine_winner()
+        self.assertEqual(check_standings(tournament), [])
+        game.winner = teams[2]
+        game.save()
+        self.assertEqual(check_standings(tournament), [])
+        self.assertEqual(TeamStanding.objects.get(team=teams[2]).wins, 2)
+        game.save(update_fields=['status'])
+        self.assertEqual(check_standings(tournament), [])
+        game.delete()
+        self.assertEqual(check_standings(tournament), [])
+
+    def test_saved_results_and_wagers_keep_the_table_in_step(self):
+        tournament, teams = self.make_tournament(4)
+        rebuild_standings(tournament)
+        matchup = Matchup.objects.get(team1=teams[0])
+
+        # As the admin would: flip the result, then move it to other teams
+        matchup.result = 'TEAM2_WIN'
+        matchup.save()
+        self.assertEqual(check_standings(tournament), [])
+        matchup.team1 = teams[2]
+        matchup.save()
+        self.assertEqual(check_standings(tournament), [])
+        Matchup.objects.create(round=matchup.round, game=matchup.game, team1=teams[3], result='TEAM1_WIN')
+        self.assertEqual(check_standings(tournament), [])
+        self.assertEqual(TeamStanding.objects.get(team=teams[3]).byes, 1)
+
+        wager = Wager.objects.get(team=teams[1])
+        wager.points = 40
+        wager.save()
+        self.assertEqual(check_standings(tournament), [])
+        wager.delete()
+        self.assertEqual(check_standings(tournament), [])
+        teams[1].delete()
+        self.assertFalse(TeamStanding.objects.filter(team_id=teams[1].pk).exists())
+
+    def test_admin_action_rebuilds_drifted_standings(self):
+        tournament, teams = self.make_tournament(4)
+        rebuild_standings(tournament)
+        Matchup.objects.filter(team1=teams[0]).update(result='TEAM2_WIN')
+        self.assertNotEqual(check_standings(tournament), [])
+
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        self.client.post(reverse('admin:tournaments_tournament_changelist'), {
+            'action': 'rebuild_standings', '_selected_action': [tournament.pk],
+        })
+        self.assertEqual(check_standings(tournament), [])
+
+
+class TiebreakerTests(TestCase):
+    def test_tiebreak_chain(self):
+        # 0 and 1 tie on wins and 1 won their meeting, though 0 has the
+        # stronger opponents; 2 and 3 tie all the way down to wagers
+        winners, losers = np.array([1, 0, 0, 1, 2, 3]), np.array([0, 2, 3, 4, 4, 4])
+        scores = compute_tiebreakers([2, 2, 1, 1, 0], winners, losers, [0, 0, 5, 10, 0])
+
+        self.assertEqual(scores['order'].tolist(), [1, 0, 3, 2, 4])
+        self.assertEqual(scores['head_to_head'].tolist(), [0, 1, 0, 0, 0])
+        self.assertEqual(scores['buchholz'].tolist(), [4, 2, 2, 2, 4])
+
+    def test_three_way_tie_falls_through_to_wagers_then_team_number(self):
+        winners, losers = np.array([0, 1, 2]), np.array([1, 2, 0])
+        self.assertEqual(compute_tiebreakers([1, 1, 1], winners, losers, [0, 0, 0])['order'].tolist(), [0, 1, 2])
+        self.assertEqual(compute_tiebreakers([1, 1, 1], winners, losers, [0, 0, 3])['order'].tolist(), [2, 0, 1])
+
+    def test_standings_page_shows_the_tiebreak_columns(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        tournament = Tournament.objects.create(name="Standings page")
+        game = Game.objects.create(tournament=tournament, name="Cornhole")
+        a, b, c = Team.objects.bulk_create([
+            Team(tournament=tournament, name=name, members='', team_number=i) for i, name in enumerate("ABC", start=1)
+        ])
+        round_obj = Round.objects.create(tournament=tournament, round_number=1)
+        Matchup.objects.create(round=round_obj, game=game, team1=b, team2=c, result='TEAM1_WIN')
+        Matchup.objects.create(round=round_obj, game=game, team1=a, is_bye=True, result='TEAM1_WIN')
+        rebuild_standings(tournament)
+
+        response = self.client.get(reverse('tournament_standings', args=[tournament.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        for column in ("Head-to-Head", "Buchholz", "Wager Score", "Wager Points"):
+            self.assertContains(response, f"<th>{column}</th>")
+        # A's bye and B's win over winless C leave them level on every
+        # tiebreak, so team number decides
+        self.assertEqual([row['team'].name for row in response.context['team_stats']], ["A", "B", "C"])
+
+
+class StandingsHistoryTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name="History")
+        game = Game.objects.create(tournament=self.tournament, name="Cornhole")
+        self.a, self.b, self.c, self.d = Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=name, members='', team_number=i)
+            for i, name in enumerate("ABCD", start=1)
+        ])
+        self.rounds = [
+            Round.objects.create(tournament=self.tournament, round_number=number) for number in (1, 2)
+        ]
+        self.first = Matchup.objects.create(round=self.rounds[0], game=game, team1=self.a, team2=self.b, result='TEAM1_WIN')
+        Matchup.objects.create(round=self.rounds[0], game=game, team1=self.c, team2=self.d, result='TEAM1_WIN')
+        Matchup.objects.create(round=self.rounds[1], game=game, team1=self.a, team2=self.c, result='TEAM1_WIN')
+        Matchup.objects.create(round=self.rounds[1], game=game, team1=self.b, team2=self.d, result='TEAM2_WIN')
+
+    def table(self, round_number):
+        data = standings_after(self.tournament, round_number)
+        return {team.name: data[str(team.pk)] for team in (self.a, self.b, self.c, self.d)}
+
+    def test_snapshots_accumulate_round_by_round(self):
+        # wins, losses, byes, games played, rank
+        # Ties on wins go to the standings tiebreaks, then team number
+        self.assertEqual(self.table(1), {
+            'A': [1, 0, 0, 1, 1], 'B': [0, 1, 0, 1, 3], 'C': [1, 0, 0, 1, 2], 'D': [0, 1, 0, 1, 4],
+        })
+        # C and D are level on wins; C beat D in round 1
+        self.assertEqual(self.table(2), {
+            'A': [2, 0, 0, 2, 1], 'B': [0, 2, 0, 2, 4], 'C': [1, 1, 0, 2, 2], 'D': [1, 1, 0, 2, 3],
+        })
+        self.assertEqual(StandingSnapshot.objects.filter(tournament=self.tournament).count(), 2)
+        self.assertEqual(
+            movers(self.tournament, 2),
+            {self.a.pk: 0, self.b.pk: -1, self.c.pk: 0, self.d.pk: 1},
+        )
+        self.assertIsNone(standings_after(self.tournament, 3))
+
+    def test_history_ranks_like_the_live_standings(self):
+        rebuild_standings(self.tournament)
+        live = [row['team'].pk for row in apply_tiebreakers(self.tournament, materialized_standings(self.tournament))]
+        data = standings_after(self.tournament, 2)
+        self.assertEqual(sorted(data, key=lambda team_id: data[team_id][-1]), [str(team_id) for team_id in live])
+
+    def test_only_an_advancing_round_is_snapshotted(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        Round.objects.filter(pk=self.rounds[1].pk).update(is_current=True)
+        self.client.post(reverse('next_round', args=[self.tournament.pk]))
+        self.assertFalse(StandingSnapshot.objects.filter(tournament=self.tournament).exists())
+
+        Round.objects.filter(pk=self.rounds[1].pk).update(is_current=False)
+        Round.objects.filter(pk=self.rounds[0].pk).update(is_current=True)
+        self.client.post(reverse('next_round', args=[self.tournament.pk]))
+        self.assertEqual(
+            list(StandingSnapshot.objects.filter(tournament=self.tournament).values_list('round_number', flat=True)), [1]
+        )
+
+    def test_changed_result_rebuilds_later_snapshots(self):
+        snapshot_round(self.tournament, self.rounds[1])
+        self.first.result = 'TEAM2_WIN'
+        self.first.save()
+
+        self.assertFalse(StandingSnapshot.objects.filter(tournament=self.tournament).exists())
+        # Every team is now 1-1 and level on every tiebreak, so team number decides
+        self.assertEqual(self.table(2), {name: [1, 1, 0, 2, rank] for rank, name in enumerate("ABCD", start=1)})
+
+
+class CacheVersionTests(TestCase):
+    def test_saving_a_stale_tournament_does_not_roll_the_version_back(self):
+        tournament = Tournament.objects.create(name="Cached")
+        stale = Tournament.objects.get(pk=tournament.pk)
+        bump_version(tournament.pk)
+        bump_version(tournament.pk)
+
+        stale.name = "Renamed"
+        stale.save()
+        stale.save(update_fields=['name', 'cache_version'])
+
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.name, "Renamed")
+        self.assertGreater(tournament.cache_version, 2)
+
+
+class ResultIngestionTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name="Results")
+        game = Game.objects.create(tournament=self.tournament, name="Cornhole")
+        self.teams = Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, 9)
+        ])
+        self.round, later = (
+            Round.objects.create(tournament=self.tournament, round_number=number) for number in (1, 2)
+        )
+        self.pending, self.decided, self.other = (
+            Matchup.objects.create(round=self.round, game=game, team1=self.teams[i], team2=self.teams[i + 1])
+            for i in (0, 2, 4)
+        )
+        self.later = Matchup.objects.create(round=later, game=game, team1=self.teams[6], team2=self.teams[7])
+        ingest_results(self.tournament, self.round, {self.decided.pk: self.teams[3].pk})
+
+    def test_only_changed_results_are_written(self):
+        winners = {
+            self.pending.pk: self.teams[0].pk,
+            self.decided.pk: self.teams[3].pk,
+            self.other.pk: self.teams[0].pk,
+            self.later.pk: self.teams[6].pk,
+        }
+        report = ingest_results(self.tournament, self.round, winners)
+
+        self.assertEqual(report, {
+            self.pending.pk: 'updated',
+            self.decided.pk: 'unchanged',
+            self.other.pk: 'invalid_winner',
+            self.later.pk: 'unknown_matchup',
+        })
+        results = dict(Matchup.objects.values_list('pk', 'result'))
+        self.assertEqual(
+            [results[m.pk] for m in (self.pending, self.decided, self.other, self.later)],
+            ['TEAM1_WIN', 'TEAM2_WIN', 'PENDING', 'PENDING'],
+        )
+        self.assertEqual(check_standings(self.tournament), [])
+
+        # Nothing changes the second time, so nothing is written
+        with CaptureQueriesContext(connection) as queries:
+            report = ingest_results(self.tournament, self.round, winners)
+        self.assertEqual(report[self.pending.pk], 'unchanged')
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+    def test_changed_winner_moves_the_standings(self):
+        ingest_results(self.tournament, self.round, {self.decided.pk: self.teams[2].pk})
+
+        self.decided.refresh_from_db()
+        self.assertEqual(self.decided.result, 'TEAM1_WIN')
+        standings = dict(TeamStanding.objects.values_list('team_id', 'wins'))
+        self.assertEqual((standings[self.teams[2].pk], standings[self.teams[3].pk]), (1, 0))
+        self.assertEqual(check_standings(self.tournament), [])
+
+    def test_malformed_payloads_are_rejected(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        url = reverse('submit_results', args=[self.tournament.pk])
+        results = [{'matchup': self.pending.pk, 'winner': self.teams[0].pk}]
+        for payload in ({'round': 'first', 'results': results}, {'round': [1], 'results': results}, {'round': 1}):
+            response = self.client.post(url, payload, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+        self.assertEqual(Matchup.objects.get(pk=self.pending.pk).result, 'PENDING')
+
+        response = self.client.post(url, {'round': '1', 'results': results}, content_type='application/json')
+        self.assertEqual(response.json()['results'], [{'matchup': self.pending.pk, 'outcome': 'updated'}])
+
+
+class ResultReportingTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name="Reports")
+        game = Game.objects.create(tournament=self.tournament, name="Cornhole")
+        self.team1, self.team2, self.outsider = Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, 4)
+        ])
+        round_obj = Round.objects.create(tournament=self.tournament, round_number=1, is_current=True)
+        self.matchup = Matchup.objects.create(round=round_obj, game=game, team1=self.team1, team2=self.team2)
+
+    def report(self, side, winner):
+        return report_winner(self.tournament, self.matchup.pk, side, winner.pk)
+
+    def test_single_report_waits_for_the_other_team(self):
+        matchup = self.report('team1', self.team1)
+        self.assertEqual((matchup.result, matchup.team1_reported_win, matchup.conflict_flag), ('PENDING', True, False))
+
+    def test_claim_and_concession_settle_the_result(self):
+        self.report('team1', self.team2)
+        matchup = self.report('team2', self.team2)
+
+        self.assertEqual(matchup.result, 'TEAM2_WIN')
+        self.assertEqual((matchup.team1_reported_win, matchup.team2_reported_win), (False, True))
+        self.assertFalse(matchup.conflict_flag)
+        self.assertEqual(check_standings(self.tournament), [])
+
+    def test_two_claims_are_a_conflict(self):
+        # Both flags equal used to count as agreement and gave team 1 the win
+        self.report('team1', self.team1)
+        matchup = self.report('team2', self.team2)
+
+        self.assertEqual(matchup.result, 'PENDING')
+        self.assertTrue(matchup.conflict_flag)
+        self.assertEqual(matchup.conflict_notes, CONFLICT_NOTE)
+
+    def test_two_concessions_are_a_conflict(self):
+        self.report('team1', self.team2)
+        matchup = self.report('team2', self.team1)
+
+        self.assertEqual(matchup.result, 'PENDING')
+        self.assertTrue(matchup.conflict_flag)
+
+    def test_winner_outside_the_matchup_is_ignored(self):
+        self.assertIsNone(self.report('team1', self.outsider))
+        self.matchup.refresh_from_db()
+        self.assertIsNone(self.matchup.team1_reported_win)
+
+
+class ConcurrentReportingTests(TransactionTestCase):
+    def test_simultaneous_reports_are_never_lost(self):
+        tournament = Tournament.objects.create(name="Concurrent reports")
+        game = Game.objects.create(tournament=tournament, name="Cornhole")
+        teams = Team.objects.bulk_create([
+            Team(tournament=tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, 17)
+        ])
+        round_obj = Round.objects.create(tournament=tournament, round_number=1, is_current=True)
+        matchups = [
+            Matchup.objects.create(round=round_obj, game=game, team1=teams[i], team2=teams[i + 1])
+            for i in range(0, len(teams), 2)
+        ]
+
+        # Both teams of every matchup report at once; every other pair disagrees
+        jobs = []
+        for i, matchup in enumerate(matchups):
+            barrier = threading.Barrier(2, timeout=30)
+            claims = (matchup.team1_id, matchup.team1_id if i % 2 else matchup.team2_id)
+            jobs += [(matchup.pk, side, winner, barrier) for side, winner in zip(('team1', 'team2'), claims)]
+
+        def run(job):
+            matchup_id, side, winner_id, barrier = job
+            try:
+                barrier.wait()
+                report_winner(tournament, matchup_id, side, winner_id)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            list(pool.map(run, jobs))
+
+        stored = Matchup.objects.filter(round=round_obj).order_by('pk')
+        self.assertEqual(
+            [(m.team1_reported_win, m.team2_reported_win, m.result, m.conflict_flag) for m in stored],
+            [(True, True, 'PENDING', True), (True, False, 'TEAM1_WIN', False)] * (len(matchups) // 2),
+        )
+        self.assertEqual(check_standings(tournament), [])
+
+
+class TeamAPITests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name="Team API")
+        game = Game.objects.create(tournament=self.tournament, name="Cornhole")
+        self.a, self.b, self.c, self.d = Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=name, members='') for name in 'ABCD'
+        ])
+        round_obj = Round.objects.create(tournament=self.tournament, round_number=1, is_current=True)
+        self.ab = Matchup.objects.create(round=round_obj, game=game, team1=self.a, team2=self.b)
+        self.cd = Matchup.objects.create(round=round_obj, game=game, team1=self.c, team2=self.d)
+
+    def post(self, team, action, body):
+        return self.client.post(f'/team-api/{team.access_token}/{action}/', body, content_type='application/json')
+
+    def test_agreeing_reports_settle_the_result(self):
+        self.assertEqual(self.post(self.a, 'report', {'winner': self.a.pk}).json()['result'], 'PENDING')
+        response = self.post(self.b, 'report', {'winner': self.a.pk})
+        self.assertEqual(response.json(), {'matchup': self.ab.pk, 'result': 'TEAM1_WIN', 'conflict': False})
+
+    def test_team_cannot_report_a_matchup_it_does_not_play(self):
+        response = self.post(self.a, 'report', {'winner': self.d.pk, 'matchup': self.cd.pk})
+        self.assertEqual(response.status_code, 404)
+        self.post(self.c, 'report', {'winner': self.d.pk, 'matchup': self.cd.pk})
+
+        self.cd.refresh_from_db()
+        self.assertEqual(self.cd.result, 'PENDING')
+        self.assertIsNone(self.cd.team2_reported_win)
+
+    def test_malformed_bodies_are_rejected(self):
+        for body in ({'winner': self.a.pk, 'matchup': 'abc'}, {'winner': 'abc'}, {}, ['winner']):
+            self.assertEqual(self.post(self.a, 'report', body).status_code, 400, body)
+        response = self.client.post(f'/team-api/{self.a.access_token}/report/', 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post(self.a, 'report', {'winner': self.c.pk}).status_code, 400)
+
+    def test_unknown_token_is_forbidden(self):
+        for token in (uuid.uuid4(), 'not-a-token'):
+            response = self.client.get(f'/team-api/{token}/matchup/')
+            self.assertEqual(response.status_code, 403)
+
+
+class ConflictResolutionTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name="Conflicts")
+        game = Game.objects.create(tournament=self.tournament, name="Cornhole")
+        teams = Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=f"Team {i}", members='', team_number=i)
+            for i in range(1, 201)
+        ])
+        round_obj = Round.objects.create(tournament=self.tournament, round_number=1, is_current=True)
+        self.matchups = Matchup.objects.bulk_create([
+            Matchup(
+                round=round_obj, game=game, team1=teams[i], team2=teams[i + 1],
+                conflict_flag=True, team1_reported_win=True, team2_reported_win=True
+            )
+            for i in range(0, 200, 2)
+        ])
+
+    def test_resolving_100_conflicts_takes_constant_queries(self):
+        decisions = {matchup.pk: 'team1' if i % 2 else 'team2' for i, matchup in enumerate(self.matchups)}
+        # One read and one bulk UPDATE for the matchups; the rest is standings
+        # bookkeeping and savepoints, none of it per matchup
+        with self.assertNumQueries(13):
+            report = resolve_conflicts(self.tournament, decisions)
+
+        self.assertEqual(set(report.values()), {'updated'})
+        self.assertFalse(Matchup.objects.filter(conflict_flag=True).exists())
+        self.assertEqual(check_standings(self.tournament), [])
+
+    def test_bulk_form_resolves_selected_rows_only(self):
+        user = User.objects.create_user('admin', password='pw')
+        self.client.force_login(user)
+        first, second = self.matchups[:2]
+        response = self.client.post(reverse('conflict_resolution', args=[self.tournament.pk]), {
+            f'resolution_{first.pk}': 'team2',
+            f'resolution_{second.pk}': '',
+        })
+
+        self.assertRedirects(response, reverse('conflict_resolution', args=[self.tournament.pk]))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.result, 'TEAM2_WIN')
+        self.assertFalse(first.conflict_flag)
+        self.assertTrue(second.conflict_flag)
+
+
+class WagerTests(TestCase):
+    def make_team(self, num_games):
+        tournament = Tournament.objects.create(name=f"Wagers {num_games}")
+        team = Team.objects.create(tournament=tournament, name="Team", members='')
+        games = Game.objects.bulk_create([
+            Game(tournament=tournament, name=f"Game {i}") for i in range(num_games)
+        ])
+        return tournament, team, games
+
+    def spread(self, games):
+        points = {game.pk: 100 // len(games) for game in games}
+        points[games[0].pk] += 100 - sum(points.values())
+        return points
+
+    def test_saving_wagers_takes_constant_queries(self):
+        for num_games in (4, 40):
+            tournament, team, games = self.make_team(num_games)
+            points = self.spread(games)
+            self.assertEqual(wager_errors(points, list(points)), [])
+            with self.assertNumQueries(8):
+                save_wagers(tournament, team.pk, points)
+            self.assertEqual(team.standing.wager_points, 100)
+
+            # A second save updates the same rows in place
+            points = self.spread(games[::-1])
+            with self.assertNumQueries(8):
+                save_wagers(tournament, team.pk, points)
+            self.assertEqual(dict(team.wagers.values_list('game_id', 'points')), points)
+
+    def test_budget_is_validated_in_memory(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(wager_errors({1: 60, 2: 40}, [1, 2]), [])
+            self.assertEqual(len(wager_errors({1: 60, 2: 50}, [1, 2])), 1)
+            self.assertEqual(len(wager_errors({1: -10, 2: 110}, [1, 2])), 1)
+            self.assertEqual(len(wager_errors({1: 100, 3: 0}, [1, 2])), 1)
+
+    def test_clean_checks_the_team_budget(self):
+        tournament, team, games = self.make_team(3)
+        committed = Wager.objects.create(team=team, game=games[0], points=60)
+
+        with self.assertRaises(ValidationError):
+            Wager(team=team, game=games[1], points=50).full_clean()
+        Wager(team=team, game=games[1], points=40).full_clean()
+        # A wager is not counted against itself when it is edited
+        committed.points = 100
+        committed.full_clean()
+        with self.assertRaises(ValidationError):
+            Wager(team=team, game=games[2], points=-5).full_clean()
+        # A blank field is a field error, not a crash in clean()
+        with self.assertRaises(ValidationError) as error:
+            Wager(team=team, game=games[2], points=None).full_clean()
+        self.assertIn('points', error.exception.message_dict)
+
+    def test_csv_import_reports_bad_rows_and_keeps_going(self):
+        tournament, team, games = self.make_team(2)
+        other = Team.objects.create(tournament=tournament, name="Other", members='', team_number=7)
+        lines = [
+            "team,game,points\n",
+            "Team,Game 0,70\n",
+            "team,game 1,30\n",
+            "7,Game 0,90\n",
+            "Other,Horseshoes,10\n",
+            "Nobody,Game 0,10\n",
+            "Team,Game 1,abc\n",
+        ]
+        report = import_wagers(tournament, lines)
+
+        self.assertEqual((report['rows'], report['teams'], report['wagers']), (6, 1, 2))
+        self.assertEqual([line for line, _ in report['errors']], [4, 5, 6, 7])
+        self.assertEqual(dict(team.wagers.values_list('game__name', 'points')), {'Game 0': 70, 'Game 1': 30})
+        self.assertFalse(other.wagers.exists())
+
+
+class ScoringTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name="Scoring")
+        horseshoes, cornhole = Game.objects.bulk_create([
+            Game(tournament=self.tournament, name=name) for name in ("Horseshoes", "Cornhole")
+        ])
+        self.a, self.b, self.c = Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=name, members='', team_number=i)
+            for i, name in enumerate("ABC", start=1)
+        ])
+        Wager.objects.bulk_create([
+            Wager(team=self.a, game=horseshoes, points=60), Wager(team=self.a, game=cornhole, points=40),
+            Wager(team=self.b, game=horseshoes, points=30), Wager(team=self.b, game=cornhole, points=70),
+            Wager(team=self.c, game=horseshoes, points=100),
+        ])
+        first, second = (Round.objects.create(tournament=self.tournament, round_number=n) for n in (1, 2))
+        Matchup.objects.bulk_create([
+            Matchup(round=first, game=horseshoes, team1=self.a, team2=self.b, result='TEAM1_WIN'),
+            # C wagered nothing on cornhole, so its loss costs it nothing
+            Matchup(round=first, game=cornhole, team1=self.c, team2=self.b, result='TEAM2_WIN'),
+            Matchup(round=first, game=horseshoes, team1=self.a, team2=self.c, result='TEAM2_WIN'),
+            # Pending matchups and byes do not score
+            Matchup(round=second, game=cornhole, team1=self.a, team2=self.c),
+            Matchup(round=second, game=horseshoes, team1=self.b, is_bye=True, result='TEAM1_WIN'),
+        ])
+
+    def scores(self, rule=None):
+        scores = tournament_scores(self.tournament, rule)
+        return [scores[team.pk] for team in (self.a, self.b, self.c)]
+
+    def test_wins_only_counts_points_wagered_on_wins(self):
+        self.assertEqual(self.scores(Tournament.WINS_ONLY), [60, 70, 100])
+
+    def test_win_loss_subtracts_points_wagered_on_losses(self):
+        self.assertEqual(self.scores(Tournament.WIN_LOSS), [0, 40, 100])
+
+    def test_tournament_rule_is_the_default(self):
+        self.assertEqual(self.scores(), [60, 70, 100])
+        self.tournament.scoring_rule = Tournament.WIN_LOSS
+        self.tournament.save()
+        self.assertEqual(self.scores(), [0, 40, 100])
+
+
+class NotificationStreamTests(TestCase):
+    def test_team_stream_gets_its_own_and_broadcast_notifications(self):
+        tournament = Tournament.objects.create(name="Live")
+        team = Team.objects.create(tournament=tournament, name="Team", members='')
+        other = Team.objects.create(tournament=tournament, name="Other", members='')
+        with self.captureOnCommitCallbacks() as callbacks:
+            notifications = [
+                Notification.objects.create(tournament=tournament, team=other, title="Other only", message=''),
+                Notification.objects.create(tournament=tournament, title="Everyone", message=''),
+                Notification.objects.create(tournament=tournament, team=team, title="Team only", message=''),
+            ]
+        channel = tournament_channel(tournament.pk)
+
+        async def read_stream():
+            events = notification_events(tournament.pk, team.pk)
+            await anext(events)
+            # Saves happen in sync code on another thread
+            await asyncio.to_thread(lambda: [callback() for callback in callbacks])
+            received = [await anext(events) for _ in range(2)]
+            await events.aclose()
+            return received
+
+        received = asyncio.run(read_stream())
+
+        self.assertEqual(
+            [event.split('\n')[0] for event in received],
+            [f"id: {notifications[1].pk}", f"id: {notifications[2].pk}"]
+        )
+        self.assertEqual(get_broker().subscriber_count(channel), 0)
+
+
+    def test_streams_are_refused_without_asgi(self):
+        team = Team.objects.create(tournament=Tournament.objects.create(name="Live"), name="Team", members='')
+        url = f'/team-api/{team.access_token}/events/'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.streaming)
+
+        # Under ASGI the stream is returned unstarted; nothing is consumed here
+        response = asyncio.run(AsyncClient().get(url))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.is_async)
+
+    def test_broker_must_implement_the_interface(self):
+        class Incomplete(Broker):
+            def publish(self, channel, message):
+                pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+class NotificationReceiptTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name="Inbox")
+        self.team = Team.objects.create(tournament=self.tournament, name="Team", members='')
+        self.other = Team.objects.create(tournament=self.tournament, name="Other", members='')
+        self.notifications = [
+            Notification.objects.create(tournament=self.tournament, team=team, title=f"Notice {i}", message='')
+            for i, team in enumerate([None, self.team, None, self.other, None])
+        ]
+
+    def test_broadcast_read_by_one_team_stays_unread_for_others(self):
+        first, second, third = [n.pk for n in self.notifications if n.team_id != self.other.pk][:3]
+        mark_read(self.team, [third])
+        self.assertEqual(unread_count(self.team), 3)
+        self.assertEqual(unread_count(self.other), 4)
+
+        # Reading the gap below a receipt folds everything into the mark
+        mark_read(self.team, [first, second])
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.notifications_read_through, self.notifications[4].pk - 1)
+        self.assertFalse(NotificationReceipt.objects.filter(team=self.team).exists())
+        self.assertEqual(list(unread_notifications(self.team)), [self.notifications[4]])
+        self.assertEqual(unread_count(self.other), 4)
+
+        mark_all_read(self.other)
+        self.assertEqual(unread_count(self.other), 0)
+        self.assertEqual(unread_count(self.team), 1)
+
+
+class NotificationFeedTests(TestCase):
+    def test_pages_and_since_polling_cover_each_notification_once(self):
+        tournament = Tournament.objects.create(name="Feed")
+        team = Team.objects.create(tournament=tournament, name="Team", members='')
+        other = Team.objects.create(tournament=tournament, name="Other", members='')
+        notifications = [
+            Notification.objects.create(tournament=tournament, team=[None, team, other][i % 3], title=f"N{i}", message='')
+            for i in range(25)
+        ]
+        # Ties on created_at fall back to the id
+        Notification.objects.filter(pk__in=[n.pk for n in notifications[5:15]]).update(created_at=timezone.now())
+        visible = [n.pk for n in notifications if n.team_id != other.pk]
+        sources = feed_sources(tournament.pk, team.pk)
+
+        seen, before = [], None
+        while True:
+            page = notification_feed(sources, before=before, limit=4)
+            seen += [payload['id'] for payload in page['notifications']]
+            if page['next'] is None:
+                break
+            before = page['next']
+        self.assertEqual(sorted(seen), sorted(visible))
+        self.assertEqual(len(seen), len(set(seen)))
+
+        cursor = notification_feed(sources, limit=1)['cursor']
+        new = Notification.objects.create(tournament=tournament, title="New", message='')
+        Notification.objects.create(tournament=tournament, team=other, title="Not ours", message='')
+        delta = notification_feed(sources, since=cursor)
+        self.assertEqual([payload['id'] for payload in delta['notifications']], [new.pk])
+        self.assertEqual(notification_feed(sources, since=delta['cursor'])['notifications'], [])
+
+
+class PrintoutTests(TestCase):
+    def make_rounds(self, tournament, num_rounds):
+        game = Game.objects.create(tournament=tournament, name="Cornhole")
+        teams = Team.objects.bulk_create([
+            Team(tournament=tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, 7)
+        ])
+        for n in range(1, num_rounds + 1):
+            round_obj = Round.objects.create(tournament=tournament, round_number=n)
+            Matchup.objects.bulk_create([
+                Matchup(round=round_obj, game=game, team1=teams[i], team2=teams[i + 1]) for i in range(0, 6, 2)
+            ])
+
+    def test_print_grids_queries_do_not_grow_with_rounds(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        counts = []
+        for num_rounds in (2, 8):
+            tournament = Tournament.objects.create(name=f"Grids {num_rounds}")
+            self.make_rounds(tournament, num_rounds)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('print_grids', args=[tournament.pk]))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_round_digest_changes_only_for_the_changed_round(self):
+        tournament = Tournament.objects.create(name="Digests")
+        self.make_rounds(tournament, 3)
+        before = [grid['digest'] for grid in grid_data(tournament.rounds.all())]
+        Matchup.objects.filter(round__round_number=2).update(result='TEAM1_WIN')
+        after = [grid['digest'] for grid in grid_data(tournament.rounds.all())]
+
+        self.assertEqual([b == a for b, a in zip(before, after)], [True, False, True])
+
+    def test_print_grids_streams_a_pdf_with_a_page_per_round(self):
+        tournament = Tournament.objects.create(name="Printouts")
+        game = Game.objects.create(tournament=tournament, name="Cornhole")
+        teams = Team.objects.bulk_create([
+            Team(tournament=tournament, name=f"Team ({i})", members='', team_number=i) for i in range(1, 5)
+        ])
+        for n in range(1, 4):
+            round_obj = Round.objects.create(tournament=tournament, round_number=n)
+            Matchup.objects.create(round=round_obj, game=game, team1=teams[0], team2=teams[n])
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+
+        response = self.client.post(reverse('print_grids', args=[tournament.pk]), {'printouts': ['teams', 'grids']})
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.streaming)
+        pdf = b''.join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.endswith(b'%%EOF\n'))
+        # One team list page and one grid page per round
+        self.assertEqual(pdf.count(b'/Type /Page '), 4)
+        self.assertIn(b'/Count 4', pdf)
+
+
+class QRCodeTests(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.enterContext(override_settings(QR_CACHE_DIR=cache_dir.name))
+        self.tournament = Tournament.objects.create(name="Codes")
+        self.teams = Team.objects.bulk_create([
+            Team(tournament=self.tournament, name=f"Team {i}", members='', team_number=i) for i in range(1, 14)
+        ])
+
+    def test_code_is_served_from_the_cache_with_long_lived_headers(self):
+        token = self.teams[0].access_token
+        url = reverse('team_qr_code', args=[token])
+
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG\r\n\x1a\n'))
+        self.assertTrue(cache_path(code_digest(token, 8)).exists())
+
+        etag = response['ETag']
+        for header in (etag, f'"other", W/{etag}', '*'):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=header).status_code, 304, header)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"{etag[1:-1]}-gzip"').status_code, 200)
+        self.assertEqual(self.client.get(url, {'size': 'big'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('team_qr_code', args=[uuid.uuid4()])).status_code, 404)
+
+    def test_generate_codes_skips_cached_codes(self):
+        tokens = [str(team.access_token) for team in self.teams]
+        self.assertEqual(generate_codes(tokens[:5], workers=1), 5)
+        self.assertEqual(generate_codes(tokens, workers=1), 8)
+        self.assertEqual(generate_codes(tokens, workers=1), 0)
+
+    def test_code_sheet_fits_twelve_teams_a_page(self):
+        self.assertEqual(len(list(tournament_pages(self.tournament, ['codes']))), 2)
+
+
+def png_pixels(content):
+    """Pixels (True is light) of a 1-bit grayscale PNG as written by qr.png_bytes"""
+    position, width, height, data = 8, None, None, b''
+    while position < len(content):
+        length, kind = struct.unpack('>I4s', content[position:position + 8])
+        chunk = content[position + 8:position + 8 + length]
+        if kind == b'IHDR':
+            width, height = struct.unpack('>II', chunk[:8])
+        elif kind == b'IDAT':
+            data += chunk
+        position += 12 + length
+    rows = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(height, -1)
+    assert not rows[:, 0].any(), "expected filter type 0 on every row"
+    return np.unpackbits(rows[:, 1:], axis=1)[:, :width].astype(bool)
+
+
+class QREncoderTests(TestCase):
+    TEXT = "backyard olympics " * 12
+
+    def test_reed_solomon_matches_the_standard(self):
+        # Version 1-M examples: "01234567" (ISO/IEC 18004 Annex I) and "HELLO WORLD"
+        self.assertEqual(
+            _error_correction([16, 32, 12, 86, 97, 128, 236, 17, 236, 17, 236, 17, 236, 17, 236, 17], 10),
+            [165, 36, 212, 193, 237, 54, 199, 135, 44, 85],
+        )
+        self.assertEqual(
+            _error_correction([32, 91, 11, 120, 209, 114, 220, 77, 67, 64, 236, 17, 236, 17, 236, 17], 10),
+            [196, 35, 39, 119, 235, 215, 231, 226, 93, 23],
+        )
+
+    def test_format_and_version_information_match_the_standard(self):
+        # Level M for masks 0-7, and versions 7-10, as tabulated in the standard
+        format_bits = [
+            '101010000010010', '101000100100101', '101111001111100', '101101101001011',
+            '100010111111001', '100000011001110', '100111110010111', '100101010100000',
+        ]
+        self.assertEqual([format(_bch(mask, 0x537, 10) ^ 0x5412, '015b') for mask in range(8)], format_bits)
+        version_bits = {
+            7: '000111110010010100', 8: '001000010110111100', 9: '001001101010011001', 10: '001010010011010011',
+        }
+        self.assertEqual({version: format(_bch(version, 0x1F25, 12), '018b') for version in version_bits}, version_bits)
+
+    def test_version_1_matrix(self):
+        expected = [
+            '#######..#.#..#######',
+            '#.....#..##.#.#.....#',
+            '#.###.#.##..#.#.###.#',
+            '#.###.#.#.#.#.#.###.#',
+            '#.###.#.##..#.#.###.#',
+            '#.....#.#..#..#.....#',
+            '#######.#.#.#.#######',
+            '........##...........',
+            '#.#####..###..#####..',
+            '..###..#...###.##.#.#',
+            '#.#.#.###.#.#....###.',
+            '...###.##.###..####.#',
+            '##..#.#.#...#.##.....',
+            '........##..#...#.#.#',
+            '#######...##.....#.#.',
+            '#.....#.###..#...####',
+            '#.###.#.#.##..##....#',
+            '#.###.#.#.#.#####....',
+            '#.###.#.#...###..#...',
+            '#.....#...#.##...##..',
+            '#######.##.#..####.#.',
+        ]
+        matrix = qr_matrix(self.TEXT[:11])
+        self.assertEqual([''.join('#' if dark else '.' for dark in row) for row in matrix], expected)
+
+    def test_matrices_match_an_independent_encoder(self):
+        # SHA-256 of np.packbits(matrix) for the same text from python-qrcode
+        # (byte mode, level M), which picks the same mask for these inputs
+        expected = {
+            11: (1, '69be7392c848fef5caf18907cb103e4b7e118c2f72752ac98529c6ab0588e4d8'),
+            21: (2, '5b4f851523a42741fc43d48be178aed66a89f48d0fe5ee367a609712e09b6930'),
+            73: (5, '5b087969e4e0f62c6fc9559dcf9c202ff1a1c54b06df2f37dd4be4cf89c18cb0'),
+            113: (7, 'b48cddd82164c336042d31219009b20cbce642dd2faed356dc2a688ec2f46e7c'),
+            200: (10, 'bc9cdad19d106999544c7e518aca83cd18036e7683724be948075a4c5b38ce28'),
+        }
+        for length, (version, digest) in expected.items():
+            matrix = qr_matrix(self.TEXT[:length])
+            self.assertEqual(matrix.shape, (17 + 4 * version,) * 2)
+            self.assertEqual(hashlib.sha256(np.packbits(matrix).tobytes()).hexdigest(), digest, length)
+
+    def test_every_mask_matches_an_independent_encoder(self):
+        # The version 2 code above (automatic choice: mask 3) forced to each mask
+        expected = [
+            'c35362a3cde0f719b58b0a929e40bd43009404d928589b8eb7f862e2c8539f8f',
+            'de7ceb9f89c8219c74ed2cf7ddfc80c6a58d1d4dd9d996154bd86690f78e7d9a',
+            'b7ae2351edea5d9d3a74eaea888330f709e620259bbe6aa367fa60469748a90f',
+            '5b4f851523a42741fc43d48be178aed66a89f48d0fe5ee367a609712e09b6930',
+            '0d9f471d55b37a1463d6012fd3fd630fae540185c26b6c03104e361ff7ac43a2',
+            '08cc82ae2658487c6bed36ead6ca7c8a9a59b57629509383e174ac7aa265da95',
+            'ae94ca3ab7ecb61b84bed4f66cd7d7dae2dfa0a32cc5e5643024ffea8121a5c0',
+            'c7a8a6a3b1f4d4cbe488c81b5518f8d774a1ab2701f830de29d39a2661f6f93f',
+        ]
+        digests = [
+            hashlib.sha256(np.packbits(qr_matrix(self.TEXT[:21], mask=mask)).tobytes()).hexdigest()
+            for mask in range(8)
+        ]
+        self.assertEqual(digests, expected)
+
+    def test_png_draws_the_matrix_with_a_quiet_zone(self):
+        matrix = qr_matrix(self.TEXT[:73])
+        pixels = png_pixels(png_bytes(matrix, size=3))
+        self.assertEqual(pixels.shape, ((matrix.shape[0] + 2 * QUIET_ZONE) * 3,) * 2)
+        self.assertTrue((pixels[::3, ::3] == ~np.pad(matrix, QUIET_ZONE)).all())
+
+    @unittest.skipUnless(zxingcpp, "zxing-cpp is not installed")
+    def test_codes_decode_end_to_end(self):
+        for length in (11, 21, 73, 113, 200):
+            pixels = png_pixels(png_bytes(qr_matrix(self.TEXT[:length]), size=4))
+            results = zxingcpp.read_barcodes(pixels.astype(np.uint8) * 255)
+            self.assertEqual([(result.text, result.ec_level) for result in results], [(self.TEXT[:length], 'M')])
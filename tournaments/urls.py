@@ -9,6 +9,9 @@ urlpatterns = [
     path('add_games/<int:tournament_id>/', views.add_games, name='add_games'),
     path('tournament_review/<int:tournament_id>/', views.tournament_review, name='tournament_review'),
     path('team_list/<int:tournament_id>/', views.team_list, name='team_list'),
+    path('team/<int:tournament_id>/<int:team_id>/', views.team_detail, name='team_detail'),
+    path('team_qr/<int:tournament_id>/<int:team_id>/', views.team_qr_page, name='team_qr_page'),
+    path('team_qr_code/<uuid:token>/', views.team_qr_code, name='team_qr_code'),
     path('game_list/<int:tournament_id>/', views.game_list, name='game_list'),
     path('tournament_begins/<int:tournament_id>/', views.tournament_begins, name='tournament_begins'),
     path('review_entries/<int:tournament_id>/', views.review_entries, name='review_entries'),
@@ -16,6 +19,11 @@ urlpatterns = [
     path('input_results/<int:tournament_id>/', views.input_results, name='input_results'),
     path('finalize_tournament/<int:tournament_id>/', views.finalize_tournament, name='finalize_tournament'),
     path('generate_matchups/<int:tournament_id>/', views.generate_matchups, name='generate_matchups'),
+    path('schedule_preview/<int:tournament_id>/', views.schedule_preview, name='schedule_preview'),
+    path('standings_history/<int:tournament_id>/<int:round_number>/', views.standings_history, name='standings_history'),
+    path('submit_results/<int:tournament_id>/', views.submit_results, name='submit_results'),
+    path('import_wagers/<int:tournament_id>/', views.import_wagers_csv, name='import_wagers'),
+    path('cache_stats/', views.tournament_cache_stats, name='tournament_cache_stats'),
     path('reset_tournament/<int:tournament_id>/', views.reset_tournament, name='reset_tournament'),
     
     # New URLs for enhanced functionality
@@ -27,5 +35,8 @@ urlpatterns = [
     path('report_result/<int:tournament_id>/<int:matchup_id>/', views.report_result, name='report_result'),
     path('create_notification/<int:tournament_id>/', views.create_notification, name='create_notification'),
     path('mark_notification_read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/<int:tournament_id>/', views.notification_list, name='notification_list'),
+    path('notification_feed/<int:tournament_id>/', views.notification_feed_json, name='notification_feed'),
+    path('notification_stream/<int:tournament_id>/', views.notification_stream, name='notification_stream'),
     path('tournament_standings/<int:tournament_id>/', views.tournament_standings, name='tournament_standings'),
 ]
\ No newline at end of file
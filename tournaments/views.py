@@ -1,13 +1,39 @@
+import codecs
+import json
+
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse
 from django.db import transaction
 from django.db.models import Sum, Count
 from django.contrib import messages
 from django.utils import timezone
+from django.views.decorators.http import condition
 
 from .models import Tournament, Team, Game, Round, Matchup, Wager, Notification
 from .forms import TournamentForm, TeamForm, GameForm, RoundForm, MatchupForm, WagerForm, NotificationForm
+from .scheduling import (
+    ScheduleError, add_team_to_schedule, assign_team_numbers, build_round_plan, drop_team_from_schedule,
+    persist_plan, tournament_assigner,
+)
+from .caching import CACHE_TIMEOUT, cache_stats, cached_context, bump_version
+from .feed import FeedError, feed_arguments, feed_sources, notification_feed, older_page
+from .grids import grid_data, grid_index, with_lazy_matchups
+from .history import movers, snapshot_round, standings_after
+from .inbox import mark_read
+from .live import event_stream
+from .plans import preview_plan
+from .printing import PRINTOUTS, pdf_response
+from .qr import DEFAULT_SIZE, cached_code, clamp_size, code_digest, team_access_url
+from .results import INVALID_WINNER, UNKNOWN_MATCHUP, UPDATED, ingest_results, report_winner, resolve_conflicts
+from .tiebreakers import apply_tiebreakers
+from .standings import materialized_standings, rebuild_standings, with_standings
+from .swiss import build_swiss_round
+from .team_api import resolve_token
+from .wagers import import_wagers, save_wagers, wager_errors
+
+# Active notifications shown on the tournament dashboard
+DASHBOARD_NOTIFICATIONS = 10
 
 def home(request):
     return render(request, 'home.html')
@@ -64,18 +90,23 @@ def add_games(request, tournament_id):
 @login_required
 def tournament_review(request, tournament_id):
     tournament = get_object_or_404(Tournament, pk=tournament_id)
-    teams_with_numbers = tournament.teams.filter(team_number__isnull=False).exists()
     
-    # Get current round if it exists
-    current_round = tournament.current_round()
+    # Team and round state only change with the tournament's cache version
+    context = cached_context(tournament, 'review', lambda: {
+        'teams_with_numbers': tournament.teams.filter(team_number__isnull=False).exists(),
+        'current_round': tournament.current_round(),
+    })
     
-    # Get active notifications
-    notifications = Notification.objects.filter(tournament=tournament, is_read=False)
+    # Newest active notifications; the full history is paged in notification_list
+    notifications = (
+        Notification.objects.filter(tournament=tournament, is_read=False)
+        .order_by('-created_at', '-pk')[:DASHBOARD_NOTIFICATIONS]
+    )
 
     return render(request, 'tournament_review.html', {
         'tournament': tournament,
-        'teams_with_numbers': teams_with_numbers,
-        'current_round': current_round,
+        'teams_with_numbers': context['teams_with_numbers'],
+        'current_round': context['current_round'],
         'notifications': notifications
     })
 
@@ -98,12 +129,16 @@ def team_list(request, tournament_id):
                 team.members = ', '.join(member_names)  # Store members as a comma-separated string
 
                 team.save()
+                
+                # Late entries are fitted into the rounds that have not been played yet
+                if tournament.rounds.exists():
+                    add_team_to_schedule(team)
                 return redirect('team_list', tournament_id=tournament.pk)
         elif 'remove_team' in request.POST:
             team_id = request.POST.get('team_id')
             if team_id.isdigit():  # Ensure the ID is numeric
                 team = get_object_or_404(Team, pk=team_id, tournament=tournament)
-                team.delete()
+                drop_team_from_schedule(team)
                 return redirect('team_list', tournament_id=tournament.pk)
 
     else:
@@ -111,6 +146,53 @@ def team_list(request, tournament_id):
 
     return render(request, 'tournaments/team_list.html', {'tournament': tournament, 'teams': teams, 'form': form})
 
+@login_required
+def team_detail(request, tournament_id, team_id):
+    team = get_object_or_404(Team.objects.select_related('tournament'), pk=team_id, tournament_id=tournament_id)
+    return render(request, 'team_detail.html', {'team': team})
+
+@login_required
+def team_qr_page(request, tournament_id, team_id):
+    """Printable page with one team's QR code"""
+    team = get_object_or_404(Team.objects.select_related('tournament'), pk=team_id, tournament_id=tournament_id)
+    return render(request, 'team_qr_code.html', {
+        'team': team,
+        'access_url': team_access_url(team.access_token)
+    })
+
+def _qr_code_size(request):
+    """Pixels per module asked for with ``?size=``, or None when it is not a number"""
+    try:
+        return clamp_size(request.GET.get('size', DEFAULT_SIZE))
+    except ValueError:
+        return None
+
+def _qr_code_etag(request, token):
+    size = _qr_code_size(request)
+    if size is None or resolve_token(str(token)) is None:
+        return None
+    return code_digest(token, size)
+
+@condition(etag_func=_qr_code_etag)
+def team_qr_code(request, token):
+    """A team's QR code as a PNG, from the on-disk cache.
+    
+    Only someone holding the token can ask for its code, so no login is
+    needed, and a code never changes for a given URL: caches may keep it
+    for good, and a client revalidating with its ETag gets a 304.
+    """
+    if resolve_token(str(token)) is None:
+        raise Http404("Unknown team")
+    
+    size = _qr_code_size(request)
+    if size is None:
+        return HttpResponseBadRequest("size must be a whole number")
+    
+    path, _ = cached_code(token, size)
+    response = FileResponse(open(path, 'rb'), content_type='image/png')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @login_required
 def game_list(request, tournament_id):
     tournament = get_object_or_404(Tournament, pk=tournament_id)
@@ -145,34 +227,40 @@ def tournament_begins(request, tournament_id):
         return redirect('review_entries', tournament_id=tournament.pk)
     
     if request.method == 'POST':
-        # Assign team numbers
-        teams = list(tournament.teams.all())
-        for i, team in enumerate(teams):
-            team.team_number = i + 1
-            team.save()
-        
-        # Create rounds
-        num_teams = len(teams)
-        required_rounds = num_teams - 1 if num_teams % 2 == 0 else num_teams
-        
-        # Create first round as current
-        first_round = Round.objects.create(
-            tournament=tournament,
-            round_number=1,
-            start_time=timezone.now(),
-            is_current=True
-        )
-        
-        # Create remaining rounds
-        for i in range(2, required_rounds + 1):
-            Round.objects.create(
-                tournament=tournament,
-                round_number=i,
-                is_current=False
-            )
-            
-        # Generate matchups for first round
-        generate_matchups_for_round(tournament, first_round)
+        try:
+            with transaction.atomic():
+                # Assign team numbers
+                teams = list(tournament.teams.all())
+                for i, team in enumerate(teams):
+                    team.team_number = i + 1
+                Team.objects.bulk_update(teams, ['team_number'])
+                
+                # Create rounds; Swiss rounds are created one at a time by next_round
+                num_teams = len(teams)
+                if tournament.format == Tournament.SWISS:
+                    required_rounds = 1
+                else:
+                    required_rounds = num_teams - 1 if num_teams % 2 == 0 else num_teams
+                
+                # Create first round as current
+                first_round = Round.objects.create(
+                    tournament=tournament,
+                    round_number=1,
+                    start_time=timezone.now(),
+                    is_current=True
+                )
+                
+                # Create remaining rounds
+                Round.objects.bulk_create([
+                    Round(tournament=tournament, round_number=i, is_current=False)
+                    for i in range(2, required_rounds + 1)
+                ])
+                    
+                # Generate matchups for first round
+                generate_matchups_for_round(tournament, first_round)
+        except ScheduleError as e:
+            messages.error(request, str(e))
+            return redirect('tournament_begins', tournament_id=tournament.pk)
         
         messages.success(request, "Tournament has begun! First round is in progress.")
         return redirect('review_entries', tournament_id=tournament.pk)
@@ -212,192 +300,141 @@ def finalize_tournament(request, tournament_id):
     })
 
 def generate_matchups_for_round(tournament, round_obj):
-    """Generate matchups for a specific round using round-robin scheduling"""
-    teams = list(tournament.teams.all())
-    games = list(tournament.games.all())
-    
-    # If odd number of teams, add a bye (None)
-    if len(teams) % 2 != 0:
-        teams.append(None)
-    
-    # Round-robin algorithm
-    n = len(teams)
-    matchups = []
-    
-    # For the given round_number, calculate the matchups
-    round_num = round_obj.round_number
-    
-    # Fixed position team
-    fixed = teams[0]
-    
-    # Rotating teams
-    rotating = teams[1:]
-    
-    # Rotate (round_num - 1) times to get current round matchups
-    for _ in range(round_num - 1):
-        rotating.insert(0, rotating.pop())
-    
-    # Create matchups for this round
-    half = n // 2
-    
-    # Assign games in a round-robin fashion
-    game_index = 0
-    num_games = len(games)
+    """Generate matchups for a specific round using the tournament's format"""
+    if tournament.format == Tournament.SWISS:
+        plan = build_swiss_round(tournament, round_obj.round_number)
+    else:
+        teams = list(tournament.teams.order_by('team_number', 'pk').values_list('pk', flat=True))
+        # Seeded with the rounds so far, so exposure evens out across rounds
+        plan = build_round_plan(teams, tournament_assigner(tournament), round_obj.round_number)
     
-    # Fixed team vs first rotating
-    if fixed and rotating[0]:  # Both are actual teams (not None for bye)
-        game = games[game_index % num_games]
-        game_index += 1
-        Matchup.objects.create(
-            game=game,
-            round=round_obj,
-            team1=fixed,
-            team2=rotating[0],
-            is_bye=False
-        )
-    elif fixed:  # rotating[0] is None, fixed team gets a bye
-        game = games[game_index % num_games]
-        game_index += 1
-        Matchup.objects.create(
-            game=game,
+    Matchup.objects.bulk_create([
+        Matchup(
+            game_id=game_id,
             round=round_obj,
-            team1=fixed,
-            team2=None,
-            is_bye=True
+            team1_id=team1_id,
+            team2_id=team2_id,
+            is_bye=team2_id is None
         )
-    
-    # Rest of the teams
-    for i in range(1, half):
-        team1 = rotating[i]
-        team2 = rotating[n-1-i]
-        
-        if team1 and team2:  # Both are actual teams
-            game = games[game_index % num_games]
-            game_index += 1
-            Matchup.objects.create(
-                game=game,
-                round=round_obj,
-                team1=team1,
-                team2=team2,
-                is_bye=False
-            )
-        elif team1:  # team2 is None, team1 gets a bye
-            game = games[game_index % num_games]
-            game_index += 1
-            Matchup.objects.create(
-                game=game,
-                round=round_obj,
-                team1=team1,
-                team2=None,
-                is_bye=True
-            )
-        elif team2:  # team1 is None, team2 gets a bye
-            game = games[game_index % num_games]
-            game_index += 1
-            Matchup.objects.create(
-                game=game,
-                round=round_obj,
-                team1=team2,
-                team2=None,
-                is_bye=True
-            )
+        for team1_id, team2_id, game_id in plan
+    ])
+    bump_version(tournament.pk)
 
 @login_required
 def generate_matchups(request, tournament_id):
     tournament = get_object_or_404(Tournament, pk=tournament_id)
     
     if request.method == 'POST':
-        # Clear existing matchups and rounds
-        tournament.rounds.all().delete()
-        
-        teams = list(tournament.teams.all())
-        games = list(tournament.games.all())
+        teams = list(tournament.teams.order_by('team_number', 'pk'))
         
         # Check if there are enough teams and games
-        if len(teams) < 2 or len(games) == 0:
+        if len(teams) < 2 or not tournament.games.exists():
             messages.error(request, "Need at least 2 teams and 1 game to create matchups")
             return redirect('review_entries', tournament_id=tournament.pk)
         
-        # Create rounds
-        num_teams = len(teams)
-        required_rounds = num_teams - 1 if num_teams % 2 == 0 else num_teams
+        # A previewed plan is reused as long as the teams and games are unchanged
+        try:
+            plan_key, plan, cached = preview_plan(tournament)
+        except ScheduleError as e:
+            messages.error(request, str(e))
+            return redirect('review_entries', tournament_id=tournament.pk)
         
-        # Create first round as current
-        first_round = Round.objects.create(
-            tournament=tournament,
-            round_number=1,
-            start_time=timezone.now(),
-            is_current=True
-        )
+        if request.POST.get('plan_key') not in (None, plan_key):
+            messages.warning(request, "Teams or games changed since the preview, so the schedule was rebuilt")
         
-        # Create remaining rounds
-        for i in range(2, required_rounds + 1):
-            Round.objects.create(
-                tournament=tournament,
-                round_number=i,
-                is_current=False
-            )
-            
-        # Generate matchups for all rounds
-        rounds = tournament.rounds.all().order_by('round_number')
-        for round_obj in rounds:
-            generate_matchups_for_round(tournament, round_obj)
+        # Replace the old schedule in one transaction
+        with transaction.atomic():
+            assign_team_numbers(teams)
+            tournament.rounds.all().delete()
+            persist_plan(tournament, plan)
+            rebuild_standings(tournament)
+        required_rounds = len(plan)
         
         messages.success(request, f"Generated matchups for {required_rounds} rounds")
         
     return redirect('review_entries', tournament_id=tournament.pk)
 
 @login_required
-def review_entries(request, tournament_id):
+def schedule_preview(request, tournament_id):
+    """Dry-run the schedule and return it as JSON without saving anything"""
     tournament = get_object_or_404(Tournament, pk=tournament_id)
-    teams = tournament.teams.all().order_by('team_number')
     
-    # Get current round and its matchups
-    current_round = tournament.current_round()
+    if tournament.teams.count() < 2:
+        return JsonResponse({'error': "Need at least 2 teams and 1 game to create matchups"}, status=400)
+    
+    try:
+        plan_key, plan, cached = preview_plan(tournament)
+    except ScheduleError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'plan_key': plan_key,
+        'cached': cached,
+        'rounds': [
+            {
+                'round_number': round_number,
+                'matchups': [
+                    {'team1': team1_id, 'team2': team2_id, 'game': game_id}
+                    for team1_id, team2_id, game_id in round_plan
+                ]
+            }
+            for round_number, round_plan in enumerate(plan, start=1)
+        ]
+    })
+
+@login_required
+def review_entries(request, tournament_id):
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
     
-    if current_round:
-        matchups = current_round.matchups.all()
-        games = tournament.games.all()
-        rounds = tournament.rounds.all().order_by('round_number')
-    else:
-        matchups = []
-        games = tournament.games.all()
-        rounds = []
+    def build():
+        # Current round with its matchups, games and teams in one plan
+        current = grid_data(tournament.rounds.filter(is_current=True).order_by('round_number')[:1])
+        current = current[0] if current else None
+        return {
+            'teams': list(with_standings(tournament.teams.all()).order_by('team_number')),
+            'games': list(tournament.games.all()),
+            'current_round': current and current['round'],
+            'matchups': current['matchups'] if current else [],
+            'grid_digest': current and current['digest'],
+            'has_rounds': current is not None or tournament.rounds.exists(),
+        }
 
+    context = cached_context(tournament, 'review_entries', build)
     return render(request, 'review_entries.html', {
         'tournament': tournament,
-        'teams': teams,
-        'games': games,
-        'current_round': current_round,
-        'matchups': matchups,
-        'rounds': rounds
+        'fragment_timeout': CACHE_TIMEOUT,
+        **context
     })
 
 @login_required
 def print_grids(request, tournament_id):
     tournament = get_object_or_404(Tournament, pk=tournament_id)
-    rounds = tournament.rounds.all().order_by('round_number')
-    teams = tournament.teams.all().order_by('team_number')
     
-    # Generate grid data
-    grid_data = []
-    for round_obj in rounds:
-        matchups = round_obj.matchups.all()
-        round_data = {
-            'round': round_obj,
-            'matchups': matchups
+    if request.method == 'POST':
+        # Stream the chosen printouts as a PDF, page by page
+        chosen = request.POST.getlist('printouts')
+        return pdf_response(tournament, [kind for kind in PRINTOUTS if kind in chosen] or PRINTOUTS)
+    
+    loaded = {}
+    
+    def build():
+        # Every round with its matchups, games and teams: two queries in all
+        grids = grid_data(tournament.rounds.all().order_by('round_number'))
+        loaded.update((grid['round'].pk, grid['matchups']) for grid in grids)
+        return {
+            'grid_index': grid_index(grids),
+            'teams': list(tournament.teams.all().order_by('team_number'))
         }
-        grid_data.append(round_data)
     
-    if request.method == 'POST':
-        # This would be where you generate a PDF or printable version
-        # For now, we'll just return the same template
-        messages.info(request, "Grid printing functionality will be implemented in a future update")
+    context = cached_context(tournament, 'print_grids', build)
     
+    # Each round's grid is a cached fragment keyed by its digest; matchups
+    # are only loaded if some fragment has to be rendered
     return render(request, 'print_grids.html', {
         'tournament': tournament,
-        'grid_data': grid_data,
-        'teams': teams
+        'grid_data': with_lazy_matchups(context['grid_index'], loaded or None),
+        'teams': context['teams'],
+        'fragment_timeout': CACHE_TIMEOUT
     })
 
 @login_required
@@ -412,18 +449,18 @@ def input_results(request, tournament_id):
     matchups = current_round.matchups.all()
     
     if request.method == 'POST':
-        for matchup in matchups:
-            winner_key = f'winner_{matchup.id}'
-            if winner_key in request.POST:
-                winner_id = request.POST.get(winner_key)
-                if winner_id:
-                    if int(winner_id) == matchup.team1.id:
-                        matchup.result = 'TEAM1_WIN'
-                    elif matchup.team2 and int(winner_id) == matchup.team2.id:
-                        matchup.result = 'TEAM2_WIN'
-                    matchup.save()
-        
-        messages.success(request, "Results saved successfully")
+        # Only matchups whose result changes are written, in one batch
+        winners = {}
+        for key, winner_id in request.POST.items():
+            if key.startswith('winner_') and key[7:].isdigit() and winner_id.isdigit():
+                winners[int(key[7:])] = int(winner_id)
+        report = ingest_results(tournament, current_round, winners)
+        
+        updated = sum(1 for outcome in report.values() if outcome == UPDATED)
+        rejected = sum(1 for outcome in report.values() if outcome in (UNKNOWN_MATCHUP, INVALID_WINNER))
+        if rejected:
+            messages.warning(request, f"{rejected} results did not match their matchups and were skipped")
+        messages.success(request, f"Results saved successfully ({updated} changed)")
         return redirect('review_entries', tournament_id=tournament.pk)
     
     return render(request, 'input_results.html', {
@@ -437,14 +474,17 @@ def reset_tournament(request, tournament_id):
     tournament = get_object_or_404(Tournament, pk=tournament_id)
     
     if request.method == 'POST':
-        # Remove all matchups and rounds
-        tournament.rounds.all().delete()
-        
-        # Reset team numbers
-        teams = tournament.teams.all()
-        for team in teams:
-            team.team_number = None
-            team.save()
+        with transaction.atomic():
+            # Remove all matchups and rounds
+            tournament.rounds.all().delete()
+            
+            # Reset team numbers
+            teams = tournament.teams.all()
+            for team in teams:
+                team.team_number = None
+                team.save()
+            
+            rebuild_standings(tournament)
         
         messages.success(request, "Tournament has been reset")
     
@@ -468,10 +508,26 @@ def next_round(request, tournament_id):
         round_number__gt=current_round.round_number
     ).order_by('round_number').first()
     
+    # Swiss rounds are paired from the standings when they are reached
+    if not next_round and tournament.format == Tournament.SWISS and current_round.round_number < tournament.swiss_round_count():
+        try:
+            with transaction.atomic():
+                next_round = Round.objects.create(
+                    tournament=tournament,
+                    round_number=current_round.round_number + 1
+                )
+                generate_matchups_for_round(tournament, next_round)
+        except ScheduleError as e:
+            messages.error(request, str(e))
+            return redirect('review_entries', tournament_id=tournament.pk)
+    
     if not next_round:
         messages.info(request, "This is already the last round")
         return redirect('review_entries', tournament_id=tournament.pk)
     
+    # The current round is closing; record the standings as they stand now
+    snapshot_round(tournament, current_round)
+    
     # Update current round flag
     with transaction.atomic():
         current_round.is_current = False
@@ -522,55 +578,38 @@ def manage_wagers(request, tournament_id, team_id=None):
     
     if team_id:
         team = get_object_or_404(Team, pk=team_id, tournament=tournament)
-        games = tournament.games.all()
+        games = list(tournament.games.all())
         
         # Get existing wagers
-        wagers = Wager.objects.filter(team=team)
-        wager_dict = {w.game.id: w for w in wagers}
+        wager_dict = dict(Wager.objects.filter(team=team).values_list('game_id', 'points'))
         
         if request.method == 'POST':
             # Process wager form
-            total_points = 0
             wager_data = {}
-            
-            # Validate total points = 100
             for game in games:
                 points_key = f'points_{game.id}'
                 if points_key in request.POST:
                     try:
-                        points = int(request.POST[points_key])
-                        if points < 0:
-                            messages.error(request, f"Points for {game.name} cannot be negative")
-                            return redirect('manage_wagers', tournament_id=tournament.pk, team_id=team.pk)
-                        
-                        total_points += points
-                        wager_data[game.id] = points
+                        wager_data[game.id] = int(request.POST[points_key])
                     except ValueError:
                         messages.error(request, f"Invalid points value for {game.name}")
                         return redirect('manage_wagers', tournament_id=tournament.pk, team_id=team.pk)
             
-            if total_points != 100:
-                messages.error(request, f"Total points must equal 100 (got {total_points})")
+            # Validate the whole set at once: no negatives, total = 100
+            errors = wager_errors(wager_data, [game.id for game in games])
+            if errors:
+                for error in errors:
+                    messages.error(request, error)
                 return redirect('manage_wagers', tournament_id=tournament.pk, team_id=team.pk)
             
-            # Save wagers
-            with transaction.atomic():
-                for game_id, points in wager_data.items():
-                    game = Game.objects.get(pk=game_id)
-                    if game_id in wager_dict:
-                        # Update existing wager
-                        wager = wager_dict[game_id]
-                        wager.points = points
-                        wager.save()
-                    else:
-                        # Create new wager
-                        Wager.objects.create(team=team, game_id=game_id, points=points)
+            # Save wagers in one upsert
+            save_wagers(tournament, team.pk, wager_data)
             
             messages.success(request, "Wagers saved successfully")
             return redirect('review_entries', tournament_id=tournament.pk)
         
         # Create a dict of game_id -> points for the form
-        game_points = {g.id: wager_dict.get(g.id).points if g.id in wager_dict else 0 for g in games}
+        game_points = {g.id: wager_dict.get(g.id, 0) for g in games}
         
         return render(request, 'manage_wagers.html', {
             'tournament': tournament,
@@ -592,31 +631,31 @@ def conflict_resolution(request, tournament_id):
     """View and resolve matchup conflicts"""
     tournament = get_object_or_404(Tournament, pk=tournament_id)
     
+    if request.method == 'POST':
+        # Collect every decision in the submission; resolution_<id> fields come
+        # from the bulk form, matchup_id + resolution from single-row buttons
+        decisions = {}
+        for key, resolution in request.POST.items():
+            if key.startswith('resolution_') and key[11:].isdigit() and resolution:
+                decisions[int(key[11:])] = resolution
+        matchup_id = request.POST.get('matchup_id')
+        if matchup_id and matchup_id.isdigit() and request.POST.get('resolution'):
+            decisions[int(matchup_id)] = request.POST['resolution']
+        
+        if decisions:
+            report = resolve_conflicts(tournament, decisions)
+            resolved = sum(1 for outcome in report.values() if outcome == UPDATED)
+            skipped = len(report) - resolved
+            if skipped:
+                messages.warning(request, f"{skipped} conflicts could not be resolved")
+            messages.success(request, f"{resolved} conflicts resolved successfully")
+        return redirect('conflict_resolution', tournament_id=tournament.pk)
+    
     # Get all matchups with conflicts
     conflict_matchups = Matchup.objects.filter(
         round__tournament=tournament,
         conflict_flag=True
-    ).order_by('round__round_number')
-    
-    if request.method == 'POST':
-        # Process conflict resolution
-        matchup_id = request.POST.get('matchup_id')
-        resolution = request.POST.get('resolution')
-        
-        if matchup_id and resolution:
-            matchup = get_object_or_404(Matchup, pk=matchup_id, round__tournament=tournament)
-            
-            if resolution == 'team1':
-                matchup.result = 'TEAM1_WIN'
-            elif resolution == 'team2':
-                matchup.result = 'TEAM2_WIN'
-            
-            matchup.conflict_flag = False
-            matchup.conflict_notes = f"Resolved by admin on {timezone.now()}"
-            matchup.save()
-            
-            messages.success(request, "Conflict resolved successfully")
-            return redirect('conflict_resolution', tournament_id=tournament.pk)
+    ).select_related('round', 'game', 'team1', 'team2').order_by('round__round_number')
     
     return render(request, 'conflict_resolution.html', {
         'tournament': tournament,
@@ -640,27 +679,16 @@ def report_result(request, tournament_id, matchup_id):
             messages.error(request, "Missing required information")
             return redirect('report_result', tournament_id=tournament.pk, matchup_id=matchup.pk)
         
-        # Process the result
-        if team_reporting == 'team1':
-            matchup.team1_reported_win = (winner_id == str(matchup.team1.id))
-        elif team_reporting == 'team2' and matchup.team2:
-            matchup.team2_reported_win = (winner_id == str(matchup.team2.id))
-        
-        # Check if results match
-        if matchup.team1_reported_win is not None and matchup.team2_reported_win is not None:
-            if matchup.team1_reported_win == matchup.team2_reported_win:
-                # Both teams agree
-                if matchup.team1_reported_win:
-                    matchup.result = 'TEAM1_WIN'
-                else:
-                    matchup.result = 'TEAM2_WIN'
-                matchup.conflict_flag = False
-            else:
-                # Conflict - teams disagree
-                matchup.conflict_flag = True
-                matchup.conflict_notes = "Teams reported different winners"
+        if team_reporting not in ('team1', 'team2') or not winner_id.isdigit():
+            messages.error(request, "Invalid report")
+            return redirect('report_result', tournament_id=tournament.pk, matchup_id=matchup.pk)
         
-        matchup.save()
+        # Agreement and conflicts are settled in the database, so
+        # simultaneous reports from both teams are never lost
+        matchup = report_winner(tournament, matchup.pk, team_reporting, int(winner_id))
+        if matchup is None:
+            messages.error(request, "That team did not play in this matchup")
+            return redirect('report_result', tournament_id=tournament.pk, matchup_id=matchup_id)
         
         if matchup.conflict_flag:
             messages.warning(request, "Result conflict detected. An admin will review.")
@@ -703,49 +731,174 @@ def create_notification(request, tournament_id):
         'teams': teams
     })
 
+@login_required
+def notification_list(request, tournament_id):
+    """Page through the tournament's notifications, newest first"""
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    sources = [queryset.select_related('team') for queryset in feed_sources(tournament.pk)]
+    
+    try:
+        notifications, next_cursor = older_page(sources, request.GET.get('before') or None)
+    except FeedError:
+        return HttpResponseBadRequest("Invalid cursor")
+    
+    return render(request, 'notifications.html', {
+        'tournament': tournament,
+        'notifications': notifications,
+        'next_cursor': next_cursor,
+    })
+
+@login_required
+def notification_feed_json(request, tournament_id):
+    """JSON feed of every notification; ``?since=<cursor>`` returns only new ones"""
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    
+    try:
+        feed = notification_feed(feed_sources(tournament.pk), **feed_arguments(request.GET))
+    except FeedError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(feed)
+
 @login_required
 def mark_notification_read(request, notification_id):
     """Mark a notification as read"""
     notification = get_object_or_404(Notification, pk=notification_id)
     tournament_id = notification.tournament.id
     
-    notification.is_read = True
-    notification.save()
+    # Read state is per team; a broadcast read by one team stays unread for the rest
+    team_id = notification.team_id or request.POST.get('team')
+    if team_id:
+        team = get_object_or_404(Team, pk=team_id, tournament_id=tournament_id)
+        mark_read(team, [notification.pk])
+    
+    # is_read only dismisses it from the organiser dashboard
+    if notification.team_id or not team_id:
+        notification.is_read = True
+        notification.save(update_fields=['is_read'])
     
     return redirect('review_entries', tournament_id=tournament_id)
 
+@login_required
+async def notification_stream(request, tournament_id):
+    """Stream every new notification of the tournament as Server-Sent Events"""
+    tournament = await aget_object_or_404(Tournament, pk=tournament_id)
+    
+    # Served from the event loop under ASGI; each client is a coroutine
+    return event_stream(request, tournament.pk)
+
 @login_required
 def tournament_standings(request, tournament_id):
     """View the current tournament standings"""
     tournament = get_object_or_404(Tournament, pk=tournament_id)
-    teams = tournament.teams.all().order_by('team_number')
     
-    # Get win counts for each team
-    team_stats = []
-    for team in teams:
-        # Get wins from traditional games (for backward compatibility)
-        old_wins = team.games_won.count()
-        
-        # Get wins from matchups
-        matchup_wins_as_team1 = team.matchups_as_team1.filter(result='TEAM1_WIN').count()
-        matchup_wins_as_team2 = team.matchups_as_team2.filter(result='TEAM2_WIN').count()
-        
-        # Total wins
-        total_wins = old_wins + matchup_wins_as_team1 + matchup_wins_as_team2
-        
-        # Get wager total (for tie-breaking)
-        wager_points = Wager.objects.filter(team=team).aggregate(total=Sum('points'))['total'] or 0
-        
-        team_stats.append({
-            'team': team,
-            'wins': total_wins,
-            'wager_points': wager_points
-        })
-    
-    # Sort by wins (descending), then by wager points (descending)
-    team_stats.sort(key=lambda x: (-x['wins'], -x['wager_points']))
+    # Read from the precomputed standings table; results keep it up to date
+    team_stats = cached_context(
+        tournament, 'standings',
+        lambda: apply_tiebreakers(tournament, materialized_standings(tournament))
+    )
     
     return render(request, 'tournament_standings.html', {
         'tournament': tournament,
         'team_stats': team_stats
-    })
\ No newline at end of file
+    })
+
+@login_required
+def standings_history(request, tournament_id, round_number):
+    """Standings as they were after a round, with each team's movement"""
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    
+    data = standings_after(tournament, round_number)
+    if data is None:
+        return JsonResponse({'error': f"Round {round_number} does not exist"}, status=404)
+    
+    movement = movers(tournament, round_number)
+    names = dict(tournament.teams.values_list('pk', 'name'))
+    rows = sorted(
+        (int(team_id), values) for team_id, values in data.items() if int(team_id) in names
+    )
+    rows.sort(key=lambda row: row[1][-1])
+    
+    return JsonResponse({
+        'round_number': round_number,
+        'standings': [
+            {
+                'team': team_id,
+                'name': names[team_id],
+                'wins': wins,
+                'losses': losses,
+                'byes': byes,
+                'games_played': games_played,
+                'rank': rank,
+                'movement': movement.get(team_id, 0),
+            }
+            for team_id, (wins, losses, byes, games_played, rank) in rows
+        ]
+    })
+
+@login_required
+def submit_results(request, tournament_id):
+    """Record a batch of results from JSON and report what happened to each.
+
+    Expects ``{"round": <number, optional>, "results": [{"matchup": <id>,
+    "winner": <team id>}, ...]}``; the current round is used by default.
+    """
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required"}, status=405)
+    
+    try:
+        payload = json.loads(request.body)
+        winners = {int(item['matchup']): int(item['winner']) for item in payload['results']}
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': "Expected a list of results with matchup and winner ids"}, status=400)
+    
+    try:
+        round_number = int(payload['round']) if payload.get('round') is not None else None
+    except (ValueError, TypeError):
+        return JsonResponse({'error': "Round must be a round number"}, status=400)
+    
+    if round_number is not None:
+        round_obj = tournament.rounds.filter(round_number=round_number).first()
+    else:
+        round_obj = tournament.current_round()
+    if not round_obj:
+        return JsonResponse({'error': "Round not found"}, status=404)
+    
+    report = ingest_results(tournament, round_obj, winners)
+    return JsonResponse({
+        'round': round_obj.round_number,
+        'results': [{'matchup': matchup_id, 'outcome': outcome} for matchup_id, outcome in report.items()],
+    })
+
+@login_required
+def import_wagers_csv(request, tournament_id):
+    """Import team,game,points rows for every team from an uploaded CSV.
+
+    Accepts a ``file`` upload or a raw text/csv body and answers with the
+    import report; bad rows are listed rather than failing the import.
+    """
+    tournament = get_object_or_404(Tournament, pk=tournament_id)
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required"}, status=405)
+    
+    # Both uploads and the request itself iterate as byte lines
+    source = request.FILES.get('file') or request
+    try:
+        report = import_wagers(tournament, codecs.iterdecode(source, 'utf-8-sig'))
+    except UnicodeDecodeError:
+        return JsonResponse({'error': "The file must be UTF-8 text"}, status=400)
+    
+    return JsonResponse({
+        'rows': report['rows'],
+        'teams': report['teams'],
+        'wagers': report['wagers'],
+        'errors': [{'line': line, 'error': error} for line, error in report['errors']],
+    })
+
+@login_required
+def tournament_cache_stats(request):
+    """Hit and miss counters for the tournament page cache"""
+    return JsonResponse(cache_stats())
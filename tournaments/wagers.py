@@ -0,0 +1,147 @@
+"""Wager validation and storage.
+
+A team's wagers are validated as a whole, in memory, against the set being
+submitted, and then written with one upsert keyed on ``(team, game)``, so
+saving costs the same handful of queries however many games there are.
+Bulk imports stream a CSV, resolve names through lookup dicts built once
+and write every accepted team in ``bulk_create`` batches.
+"""
+import csv
+
+from django.db import transaction
+
+from .caching import bump_version
+from .models import Wager
+from .standings import refresh_wager_points
+
+# Points every team must spread across the games
+WAGER_TOTAL = 100
+
+# Wagers written per INSERT during an import
+IMPORT_BATCH_SIZE = 1000
+
+
+def wager_errors(points, game_ids):
+    """Problems with a team's submitted ``{game_id: points}``, as messages.
+
+    This stands in for ``Wager.clean`` on the bulk paths: ``bulk_create``
+    does not call it, and checking the whole set here avoids its budget
+    query per wager.
+    """
+    errors = []
+    unknown = set(points) - set(game_ids)
+    if unknown:
+        errors.append(f"Unknown games: {', '.join(str(game_id) for game_id in sorted(unknown))}")
+    if any(value < 0 for value in points.values()):
+        errors.append("Points cannot be negative")
+    total = sum(points.values())
+    if total != WAGER_TOTAL:
+        errors.append(f"Total points must equal {WAGER_TOTAL} (got {total})")
+    return errors
+
+
+def save_wagers(tournament, team_id, points):
+    """Upsert a team's wagers from ``{game_id: points}``.
+
+    Callers validate with ``wager_errors`` first and pass every game (0 for
+    no wager) when replacing a whole set.
+    """
+    with transaction.atomic():
+        Wager.objects.bulk_create(
+            [Wager(team_id=team_id, game_id=game_id, points=value) for game_id, value in points.items()],
+            update_conflicts=True,
+            unique_fields=['team', 'game'],
+            update_fields=['points'],
+        )
+        refresh_wager_points(tournament, [team_id])
+        # Bulk writes skip the save signals
+        bump_version(tournament.pk)
+
+
+def _wager_lookups(tournament):
+    """Name (and team number) -> id dicts for resolving imported rows"""
+    teams = {}
+    for pk, name, number in tournament.teams.values_list('pk', 'name', 'team_number'):
+        teams[name.strip().casefold()] = pk
+        if number is not None:
+            teams.setdefault(str(number), pk)
+    games = {name.strip().casefold(): pk for pk, name in tournament.games.values_list('pk', 'name')}
+    return teams, games
+
+
+def import_wagers(tournament, lines, batch_size=IMPORT_BATCH_SIZE):
+    """Import ``team,game,points`` CSV rows for many teams at once.
+
+    ``lines`` is any iterable of text lines, read once as a stream; a
+    leading header row is skipped.  Teams and games are matched by name
+    (case-insensitive), teams also by number.  Each team's rows replace its
+    wagers (games it leaves out get 0) once its set passes ``wager_errors``;
+    bad rows and teams failing the budget are reported and skipped without
+    stopping the import.  Returns a dict with ``rows``, ``teams``,
+    ``wagers`` and ``errors``, a list of ``(line number, message)``.
+    """
+    teams, games = _wager_lookups(tournament)
+    submitted, first_line, errors = {}, {}, []
+    rows = 0
+
+    for line_number, row in enumerate(csv.reader(lines), start=1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if line_number == 1 and [cell.strip().casefold() for cell in row[:3]] == ['team', 'game', 'points']:
+            continue
+        rows += 1
+        if len(row) != 3:
+            errors.append((line_number, f"Expected team, game, points; got {len(row)} columns"))
+            continue
+
+        team, game, points = (cell.strip() for cell in row)
+        team_id = teams.get(team.casefold())
+        game_id = games.get(game.casefold())
+        if team_id is None:
+            errors.append((line_number, f"Unknown team '{team}'"))
+            continue
+        if game_id is None:
+            errors.append((line_number, f"Unknown game '{game}'"))
+            continue
+        try:
+            points = int(points)
+        except ValueError:
+            errors.append((line_number, f"Points must be a whole number, got '{points}'"))
+            continue
+
+        team_points = submitted.setdefault(team_id, {})
+        first_line.setdefault(team_id, line_number)
+        if game_id in team_points:
+            errors.append((line_number, f"Duplicate wager for '{team}' on '{game}'"))
+            continue
+        team_points[game_id] = points
+
+    # Budgets are checked per team once its whole set has been read
+    game_ids = list(games.values())
+    accepted = {}
+    for team_id, points in submitted.items():
+        problems = wager_errors(points, game_ids)
+        if problems:
+            errors.append((first_line[team_id], f"Team skipped: {'; '.join(problems)}"))
+        else:
+            accepted[team_id] = points
+
+    wagers = [
+        Wager(team_id=team_id, game_id=game_id, points=points.get(game_id, 0))
+        for team_id, points in accepted.items()
+        for game_id in game_ids
+    ]
+    if wagers:
+        with transaction.atomic():
+            Wager.objects.bulk_create(
+                wagers,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['team', 'game'],
+                update_fields=['points'],
+            )
+            refresh_wager_points(tournament, list(accepted))
+            bump_version(tournament.pk)
+
+    errors.sort()
+    return {'rows': rows, 'teams': len(accepted), 'wagers': len(wagers), 'errors': errors}